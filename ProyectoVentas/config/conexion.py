@@ -1,10 +1,10 @@
-import mysql.connector
-
-conexion=mysql.connector.connect(
-    host="localhost",
-user="root",
-password="1234",
-database="bdventas")
-
-if conexion.is_connected():
+import mysql.connector
+
+conexion=mysql.connector.connect(
+    host="localhost",
+user="root",
+password="1234",
+database="bdventas")
+
+if conexion.is_connected():
     print("Conexion Exitosa")
\ No newline at end of file
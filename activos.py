@@ -0,0 +1,135 @@
+"""
+Activos estáticos con huella de contenido y precomprimidos.
+
+`flask --app app construir-activos` copia cada archivo de static/ a
+static/dist/ como `nombre.<hash>.ext`, junto con sus variantes .gz y .br
+(si está instalado brotli), y escribe `manifiesto.json` con la
+correspondencia. Las plantillas piden la URL con `activo('estilos.css')`.
+
+Como el nombre cambia con el contenido, /activos/ responde con
+`Cache-Control: immutable` de un año: una vez descargado, el navegador no
+vuelve a pedirlo y las visitas siguientes sólo traen el HTML. La variante
+comprimida se elige por Accept-Encoding sin comprimir nada en la petición.
+
+Sin manifiesto (desarrollo, o no se corrió la construcción) las plantillas
+usan los archivos de static/ como siempre.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+
+from flask import Response, send_file, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFIESTO = 'manifiesto.json'
+UN_ANO = 365 * 24 * 3600
+# Por debajo de este tamaño la variante comprimida no compensa
+MIN_COMPRIMIR = int(os.environ.get('ACTIVOS_MIN_COMPRIMIR', 256))
+
+# (extensión, Content-Encoding), en orden de preferencia
+VARIANTES = (('.br', 'br'), ('.gz', 'gzip'))
+SUFIJOS = {codificacion: sufijo for sufijo, codificacion in VARIANTES}
+
+
+def _comprimir(datos, codificacion):
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=11)
+    # mtime=0: la misma entrada da siempre el mismo .gz
+    return gzip.compress(datos, compresslevel=9, mtime=0)
+
+
+class Activos:
+
+    def __init__(self, fuente, salida=None):
+        self.fuente = fuente
+        self.salida = salida or os.path.join(fuente, 'dist')
+        self.manifiesto = {}
+        self._servibles = {}
+
+    def construir(self):
+        """Generar los archivos con huella y sus variantes; devuelve el manifiesto"""
+        os.makedirs(self.salida, exist_ok=True)
+        manifiesto = {}
+        for nombre in sorted(os.listdir(self.fuente)):
+            ruta = os.path.join(self.fuente, nombre)
+            if not os.path.isfile(ruta):
+                continue
+            with open(ruta, 'rb') as archivo:
+                datos = archivo.read()
+            base, extension = os.path.splitext(nombre)
+            con_huella = f'{base}.{hashlib.sha256(datos).hexdigest()[:12]}{extension}'
+            self._escribir(con_huella, datos)
+            for sufijo, codificacion in VARIANTES:
+                if len(datos) < MIN_COMPRIMIR or (codificacion == 'br' and brotli is None):
+                    continue
+                comprimido = _comprimir(datos, codificacion)
+                if len(comprimido) < len(datos):
+                    self._escribir(con_huella + sufijo, comprimido)
+            manifiesto[nombre] = con_huella
+        # Los archivos de construcciones anteriores se dejan: páginas ya cacheadas pueden pedirlos
+        self._escribir(MANIFIESTO, json.dumps(manifiesto, indent=2, sort_keys=True).encode('utf-8'))
+        if brotli is None:
+            logger.warning("brotli no está instalado: sólo se generan variantes .gz")
+        self._usar(manifiesto)
+        return manifiesto
+
+    def _escribir(self, nombre, datos):
+        temporal = os.path.join(self.salida, f'.{nombre}.tmp')
+        with open(temporal, 'wb') as archivo:
+            archivo.write(datos)
+        os.replace(temporal, os.path.join(self.salida, nombre))
+
+    def cargar(self):
+        try:
+            with open(os.path.join(self.salida, MANIFIESTO), encoding='utf-8') as archivo:
+                self._usar(json.load(archivo))
+        except FileNotFoundError:
+            logger.info("Sin manifiesto de activos: se sirven los archivos de static/ sin huella")
+        return self.manifiesto
+
+    def _usar(self, manifiesto):
+        self.manifiesto = manifiesto
+        # Qué variantes existen de cada archivo, para no tocar el disco en cada petición
+        self._servibles = {
+            con_huella: tuple(codificacion for sufijo, codificacion in VARIANTES
+                              if os.path.exists(os.path.join(self.salida, con_huella + sufijo)))
+            for con_huella in manifiesto.values()
+        }
+
+    @property
+    def huella(self):
+        """Cambia si cambia cualquier activo: entra en los ETag de las páginas que los enlazan"""
+        return hashlib.sha1(json.dumps(self.manifiesto, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+    def url(self, nombre):
+        con_huella = self.manifiesto.get(nombre)
+        if con_huella is None:
+            return url_for('static', filename=nombre)
+        return url_for('servir_activo', nombre=con_huella)
+
+    def servir(self, nombre, aceptadas):
+        """Respuesta para /activos/<nombre> según el Accept-Encoding del cliente (`aceptadas`)"""
+        variantes = self._servibles.get(nombre)
+        if variantes is None:
+            # Sin pasar por el 404 de la aplicación, que redirige a una página HTML
+            return Response('Activo no encontrado\n', status=404, mimetype='text/plain')
+        codificacion = next((c for c in variantes if aceptadas[c]), None)
+        archivo = nombre + SUFIJOS[codificacion] if codificacion else nombre
+        tipo = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+        respuesta = send_file(os.path.join(self.salida, archivo), mimetype=tipo, max_age=UN_ANO,
+                              conditional=True, etag=True)
+        if codificacion:
+            respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.vary.add('Accept-Encoding')
+        respuesta.cache_control.public = True
+        respuesta.cache_control.immutable = True
+        return respuesta
@@ -1,503 +1,1213 @@
-from flask import Flask, render_template, request, redirect, session, url_for, flash, make_response
-from functools import wraps
-from fpdf import FPDF
-from config.conexion import conexion
-import logging
-
-app = Flask(__name__)
-app.secret_key = 'clave_secreta_segura_cambiar_en_produccion'
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'usuario' not in session:
-            flash('Debes iniciar sesión para acceder', 'warning')
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    if request.method == 'POST':
-        usuario = request.form.get('usuario', '').strip()
-        contraseña = request.form.get('contraseña', '').strip()
-        
-        # Validación básica
-        if not usuario or not contraseña:
-            flash('Usuario y contraseña son obligatorios', 'warning')
-            return render_template('login.html')
-            
-        # TODO: Implementar hash de contraseñas y validación en BD
-        if usuario == 'admin' and contraseña == '1234':
-            session['usuario'] = usuario
-            flash(f'Bienvenido {usuario}', 'success')
-            return redirect(url_for('index'))
-        else:
-            flash('Usuario o contraseña incorrectos', 'danger')
-            
-    return render_template('login.html')
-
-@app.route('/logout')
-@login_required
-def logout():
-    usuario = session.get('usuario', 'Usuario')
-    session.clear()  # Limpiar toda la sesión
-    flash(f'Hasta luego {usuario}', 'info')
-    return redirect(url_for('login'))
-
-
-def ejecutar_consulta(query, params=None, fetch=True):
-    """
-    Función centralizada para ejecutar consultas de manera segura
-    """
-    try:
-        with conexion.cursor() as cursor:
-            cursor.execute(query, params or ())
-            if fetch:
-                return cursor.fetchall()
-            conexion.commit()
-            return True
-    except Exception as e:
-        logger.error(f"Error en consulta DB: {e}")
-        conexion.rollback()
-        raise e
-
-def obtener_clientes():
-    """Obtener todos los clientes de la base de datos"""
-    try:
-        return ejecutar_consulta('SELECT * FROM tbcliente ORDER BY nombre')
-    except Exception as e:
-        flash(f'Error al obtener clientes: {str(e)}', 'danger')
-        return []
-
-def obtener_cliente_por_id(id_cliente):
-    """Obtener un cliente específico por ID"""
-    try:
-        resultado = ejecutar_consulta(
-            "SELECT * FROM tbcliente WHERE id_cliente = %s", 
-            (id_cliente,)
-        )
-        return resultado[0] if resultado else None
-    except Exception as e:
-        logger.error(f"Error al obtener cliente {id_cliente}: {e}")
-        return None
-
-
-@app.route('/')
-@login_required
-def index():
-    clientes = obtener_clientes()
-    return render_template('registrar.html', 
-                         mensaje='Clientes Registrados', 
-                         clientes=clientes)
-
-@app.route('/buscar')
-@login_required
-def buscar():
-    texto = request.args.get('txtbuscar', '').strip()
-    
-    if not texto:
-        flash('Debes escribir algo para buscar.', 'warning')
-        return redirect(url_for('index'))
-
-    try:
-        query = """
-            SELECT id_cliente, nombre, nit 
-            FROM tbcliente 
-            WHERE LOWER(nombre) LIKE LOWER(%s) OR nit LIKE %s
-            ORDER BY nombre
-        """
-        like_texto = f"%{texto}%"
-        clientes = ejecutar_consulta(query, (like_texto, like_texto))
-        
-        if not clientes:
-            flash(f'No se encontraron resultados para: "{texto}"', 'info')
-            
-    except Exception as e:
-        flash(f'Error al buscar: {str(e)}', 'danger')
-        return redirect(url_for('index'))
-
-    mensaje = f'Resultados para: "{texto}" ({len(clientes)} encontrados)'
-    return render_template('registrar.html', 
-                         clientes=clientes, 
-                         mensaje=mensaje)
-
-@app.route('/insertar', methods=['POST'])
-@login_required
-def insertar():
-    nombre = request.form.get('txtnombre', '').strip()
-    nit = request.form.get('txtnit', '').strip()
-
-    # Validaciones
-    if not nombre or not nit:
-        flash('Nombre y NIT son obligatorios', 'warning')
-        return redirect(url_for('index'))
-    
-    if len(nombre) < 2:
-        flash('El nombre debe tener al menos 2 caracteres', 'warning')
-        return redirect(url_for('index'))
-
-    try:
-        # Verificar si el NIT ya existe
-        existe = ejecutar_consulta(
-            "SELECT COUNT(*) as count FROM tbcliente WHERE nit = %s", 
-            (nit,)
-        )
-        
-        if existe and existe[0]['count'] > 0:
-            flash(f'Ya existe un cliente con el NIT: {nit}', 'warning')
-            return redirect(url_for('index'))
-        
-        # Insertar nuevo cliente
-        ejecutar_consulta(
-            "INSERT INTO tbcliente (nombre, nit) VALUES (%s, %s)", 
-            (nombre, nit), 
-            fetch=False
-        )
-        
-        flash(f'Cliente "{nombre}" registrado exitosamente', 'success')
-        
-    except Exception as e:
-        flash(f'Error al insertar cliente: {str(e)}', 'danger')
-
-    return redirect(url_for('index'))
-
-@app.route('/actualizar/<int:id>')
-@login_required
-def actualizar(id):
-    cliente = obtener_cliente_por_id(id)
-    
-    if not cliente:
-        flash('Cliente no encontrado', 'danger')
-        return redirect(url_for('index'))
-
-    return render_template('actualizar.html', datos=cliente)
-
-@app.route('/actualizar_cliente', methods=['POST'])
-@login_required
-def actualizar_cliente():
-    """Nueva ruta para procesar la actualización"""
-    id_cliente = request.form.get('id_cliente')
-    nombre = request.form.get('txtnombre', '').strip()
-    nit = request.form.get('txtnit', '').strip()
-
-    if not all([id_cliente, nombre, nit]):
-        flash('Todos los campos son obligatorios', 'warning')
-        return redirect(url_for('index'))
-
-    try:
-        # Verificar que el cliente existe
-        cliente_actual = obtener_cliente_por_id(id_cliente)
-        if not cliente_actual:
-            flash('Cliente no encontrado', 'danger')
-            return redirect(url_for('index'))
-
-        # Verificar NIT duplicado (excepto el actual)
-        existe = ejecutar_consulta(
-            "SELECT COUNT(*) as count FROM tbcliente WHERE nit = %s AND id_cliente != %s", 
-            (nit, id_cliente)
-        )
-        
-        if existe and existe[0]['count'] > 0:
-            flash(f'Ya existe otro cliente con el NIT: {nit}', 'warning')
-            return redirect(url_for('actualizar', id=id_cliente))
-
-        # Actualizar cliente
-        ejecutar_consulta(
-            "UPDATE tbcliente SET nombre = %s, nit = %s WHERE id_cliente = %s",
-            (nombre, nit, id_cliente),
-            fetch=False
-        )
-        
-        flash(f'Cliente "{nombre}" actualizado correctamente', 'success')
-        
-    except Exception as e:
-        flash(f'Error al actualizar cliente: {str(e)}', 'danger')
-
-    return redirect(url_for('index'))
-
-@app.route('/eliminar/<int:id>')
-@login_required
-def eliminar(id):
-    try:
-        # Verificar que el cliente existe
-        cliente = obtener_cliente_por_id(id)
-        if not cliente:
-            flash('Cliente no encontrado', 'danger')
-            return redirect(url_for('index'))
-
-        # Verificar si tiene compras asociadas
-        compras = ejecutar_consulta(
-            "SELECT COUNT(*) as count FROM tbcompra WHERE id_cliente = %s", 
-            (id,)
-        )
-        
-        if compras and compras[0]['count'] > 0:
-            flash('No se puede eliminar el cliente porque tiene compras registradas', 'warning')
-            return redirect(url_for('index'))
-
-        # Eliminar cliente
-        ejecutar_consulta(
-            "DELETE FROM tbcliente WHERE id_cliente = %s", 
-            (id,), 
-            fetch=False
-        )
-        
-        flash(f'Cliente "{cliente["nombre"]}" eliminado correctamente', 'info')
-        
-    except Exception as e:
-        flash(f'Error al eliminar cliente: {str(e)}', 'danger')
-
-    return redirect(url_for('index'))
-
-# ------------------ Catálogo de Álbumes ------------------
-
-CATALOGO_ALBUMES = [
-    {'id': 1, 'nombre': 'Álbum: HAUTE COUTURE', 'artista': 'MiSaMo', 'precio': 30.00, 'stock': 10},
-    {'id': 2, 'nombre': 'Song: Baby Good Night', 'artista': 'GD&TOP', 'precio': 14.99, 'stock': 5},
-    {'id': 3, 'nombre': 'Álbum: Formula of Love', 'artista': 'TWICE', 'precio': 25.00, 'stock': 8},
-    {'id': 4, 'nombre': 'Song: Dynamite', 'artista': 'BTS', 'precio': 12.99, 'stock': 15},
-    {'id': 5, 'nombre': 'Álbum: The Album', 'artista': 'BLACKPINK', 'precio': 28.00, 'stock': 7},
-    {'id': 5, 'nombre': 'Song: FXXk IT ', 'artista': 'BIGBANG', 'precio': 20.00, 'stock': 10},
-    {'id': 5, 'nombre': 'Song: LETS NOT FALL IN LOVE ', 'artista': 'BIGBANG', 'precio': 20.00, 'stock': 2},
-]
-
-def obtener_album_por_id(id_album):
-    """Obtener álbum por ID"""
-    return next((a for a in CATALOGO_ALBUMES if a['id'] == id_album), None)
-
-@app.route('/comprar/<int:id>')
-@login_required
-def comprar(id):
-    # Verificar que el cliente existe
-    cliente = obtener_cliente_por_id(id)
-    if not cliente:
-        flash('Cliente no encontrado', 'danger')
-        return redirect(url_for('index'))
-
-    carrito = session.get('carrito', [])
-    total_carrito = sum(item['precio'] * item.get('cantidad', 1) for item in carrito)
-    
-    return render_template('catalogo.html', 
-                         catalogo=CATALOGO_ALBUMES, 
-                         carrito=carrito,
-                         total_carrito=total_carrito,
-                         cliente=cliente)
-
-@app.route('/agregar_carrito', methods=['POST'])
-@login_required
-def agregar_carrito():
-    id_album = int(request.form.get('id'))
-    cantidad = int(request.form.get('cantidad', 1))
-    
-    album = obtener_album_por_id(id_album)
-    if not album:
-        flash('Álbum no encontrado', 'danger')
-        return redirect(request.referrer or url_for('index'))
-    
-    if cantidad > album['stock']:
-        flash(f'Solo hay {album["stock"]} unidades disponibles', 'warning')
-        return redirect(request.referrer)
-
-    carrito = session.get('carrito', [])
-    
-    # Buscar si el álbum ya está en el carrito
-    item_existente = next((item for item in carrito if item['id'] == id_album), None)
-    
-    if item_existente:
-        nueva_cantidad = item_existente.get('cantidad', 1) + cantidad
-        if nueva_cantidad > album['stock']:
-            flash(f'No hay suficiente stock. Máximo: {album["stock"]}', 'warning')
-        else:
-            item_existente['cantidad'] = nueva_cantidad
-            flash(f'Cantidad actualizada para "{album["nombre"]}"', 'success')
-    else:
-        album_carrito = album.copy()
-        album_carrito['cantidad'] = cantidad
-        carrito.append(album_carrito)
-        flash(f'"{album["nombre"]}" agregado al carrito', 'success')
-    
-    session['carrito'] = carrito
-    return redirect(request.referrer or url_for('index'))
-
-@app.route('/quitar_carrito', methods=['POST'])
-@login_required
-def quitar_carrito():
-    id_album = int(request.form.get('id'))
-    carrito = session.get('carrito', [])
-    
-    # Encontrar el nombre del álbum antes de eliminarlo
-    album_eliminado = next((a for a in carrito if a['id'] == id_album), None)
-    
-    session['carrito'] = [a for a in carrito if a['id'] != id_album]
-    
-    if album_eliminado:
-        flash(f'"{album_eliminado["nombre"]}" eliminado del carrito', 'info')
-    
-    return redirect(request.referrer or url_for('index'))
-
-@app.route('/limpiar_carrito')
-@login_required
-def limpiar_carrito():
-    """Nueva función para limpiar todo el carrito"""
-    session['carrito'] = []
-    flash('Carrito vaciado completamente', 'info')
-    return redirect(request.referrer or url_for('index'))
-
-@app.route('/finalizar_compra/<int:id_cliente>', methods=['POST'])
-@login_required
-def finalizar_compra(id_cliente):
-    """Nueva función para procesar la compra"""
-    carrito = session.get('carrito', [])
-    
-    if not carrito:
-        flash('El carrito está vacío', 'warning')
-        return redirect(url_for('comprar', id=id_cliente))
-
-    try:
-        # Procesar cada item del carrito
-        for item in carrito:
-            ejecutar_consulta(
-                "INSERT INTO tbcompra (id_cliente, producto, cantidad, costo) VALUES (%s, %s, %s, %s)",
-                (id_cliente, f"{item['nombre']} - {item['artista']}", 
-                 item.get('cantidad', 1), item['precio']),
-                fetch=False
-            )
-        
-        # Limpiar carrito después de la compra
-        session['carrito'] = []
-        flash('Compra realizada exitosamente', 'success')
-        
-    except Exception as e:
-        flash(f'Error al procesar la compra: {str(e)}', 'danger')
-    
-    return redirect(url_for('vercompras', id=id_cliente))
-
-# ------------------ Compras ------------------
-
-@app.route('/vercompras/<int:id>')
-@login_required
-def vercompras(id):
-    cliente = obtener_cliente_por_id(id)
-    if not cliente:
-        flash('Cliente no encontrado', 'danger')
-        return redirect(url_for('index'))
-
-    try:
-        compras = ejecutar_consulta(
-            "SELECT * FROM tbcompra WHERE id_cliente = %s ORDER BY id_compra DESC", 
-            (id,)
-        )
-        
-        # Calcular total de compras
-        total_compras = sum(float(compra['cantidad']) * float(compra['costo']) 
-                          for compra in compras)
-        
-        return render_template('vercompras.html', 
-                             datos=compras, 
-                             cliente=cliente,
-                             total_compras=total_compras)
-                             
-    except Exception as e:
-        flash(f'Error al obtener compras: {str(e)}', 'danger')
-        return redirect(url_for('index'))
-
-# ------------------ Reportes PDF ------------------
-
-@app.route('/reporte/<int:id>')
-@login_required
-def generar_pdf(id):
-    try:
-        # Consulta mejorada con JOIN
-        sql = """
-            SELECT c.nombre, c.nit, co.producto, co.cantidad, co.costo, co.id_compra
-            FROM tbcompra co
-            INNER JOIN tbcliente c ON co.id_cliente = c.id_cliente
-            WHERE co.id_cliente = %s
-            ORDER BY co.id_compra DESC
-        """
-        datos = ejecutar_consulta(sql, (id,))
-        
-    except Exception as e:
-        logger.error(f"Error al generar reporte para cliente {id}: {e}")
-        return f"Error al generar reporte: {str(e)}", 500
-
-    if not datos:
-        return "No se encontraron compras para este cliente", 404
-
-    nombre_cliente, nit_cliente = datos[0]['nombre'], datos[0]['nit']
-
-    pdf = FPDF()
-    pdf.add_page()
-    
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(0, 15, "REPORTE DE COMPRAS", ln=True, align="C")
-    pdf.ln(5)
-    
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, f"Cliente: {nombre_cliente}", ln=True)
-    pdf.cell(0, 10, f"NIT: {nit_cliente}", ln=True)
-    pdf.ln(5)
-
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(10, 10, "#", 1, 0, 'C')
-    pdf.cell(80, 10, "Producto", 1, 0, 'C')
-    pdf.cell(25, 10, "Cantidad", 1, 0, 'C')
-    pdf.cell(25, 10, "Precio Unit.", 1, 0, 'C')
-    pdf.cell(25, 10, "Total", 1, 0, 'C')
-    pdf.ln()
-
-    pdf.set_font("Arial", '', 9)
-    total_general = 0
-    
-    for i, compra in enumerate(datos, 1):
-        cantidad = float(compra['cantidad'])
-        costo = float(compra['costo'])
-        total_linea = cantidad * costo
-        total_general += total_linea
-        
-        pdf.cell(10, 8, str(i), 1, 0, 'C')
-        pdf.cell(80, 8, str(compra['producto'])[:40], 1)  
-        pdf.cell(25, 8, str(int(cantidad)), 1, 0, 'C')
-        pdf.cell(25, 8, f"${costo:.2f}", 1, 0, 'R')
-        pdf.cell(25, 8, f"${total_linea:.2f}", 1, 0, 'R')
-        pdf.ln()
-
-    pdf.ln(2)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(140, 10, "TOTAL GENERAL:", 0, 0, 'R')
-    pdf.cell(25, 10, f"${total_general:.2f}", 1, 0, 'R')
-
-    try:
-        pdf_output = pdf.output(dest='S')
-        response = make_response(pdf_output)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'inline; filename=reporte_{nombre_cliente.replace(" ", "_")}.pdf'
-        return response
-    except Exception as e:
-        logger.error(f"Error al generar PDF: {e}")
-        return f"Error al generar PDF: {str(e)}", 500
-
-
-@app.errorhandler(404)
-def page_not_found(e):
-    flash('Página no encontrada', 'warning')
-    return redirect(url_for('index'))
-
-@app.errorhandler(500)
-def internal_error(e):
-    flash('Error interno del servidor', 'danger')
-    return redirect(url_for('index'))
-
-@app.route('/usuarios')
-def usuarios():
-    return render_template('usuarios.html')
-
-if __name__ == '__main__':
-    logger.info("Iniciando aplicación Flask...")
-    app.run(debug=True, host='0.0.0.0', port=5000)
-
+from flask import Flask, render_template, request, redirect, session, url_for, flash, make_response, jsonify, Response, stream_with_context, send_file, has_request_context
+from functools import wraps
+from contextlib import contextmanager
+from config.conexion import obtener_conexion, verificar_db, es_duplicado, pool
+from busqueda import buscar_clientes, normalizar_nit
+from autocompletar import IndiceTrigramas, LIMITE_SUGERENCIAS
+from reportes import (CacheReportes, SQL_REPORTE, construir_pdf, etag_reporte, generar_pdf_en_streaming,
+                      nombre_archivo)
+from reportes_masivos import ColaReportes, FORMATOS, leer_estado
+from catalogo import CatalogoIndexado
+from carrito import crear_almacen, sumar_linea, quitar_linea
+from reservas import ReservasStock, StockInsuficiente
+from clientes_csv import (EXPORTACIONES, generar_csv, importar_clientes, mensaje_error_cliente,
+                          validar_cliente)
+from metricas_db import RegistroConsultas, CursorMedido
+from metricas_http import TiemposRutas
+from cache_clientes import crear_cache_clientes
+from fragmentos import (CacheFragmentos, VersionClientes, calcular_etag, huella_plantillas,
+                        no_modificada)
+from usuarios import LARGO_MINIMO_CLAVE, ROLES, DemasiadosIntentos, Usuarios
+from permisos import Autorizacion, mascara_de
+from activos import Activos
+from markupsafe import Markup
+from werkzeug.middleware.proxy_fix import ProxyFix
+from decimal import Decimal
+import base64
+import click
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import time
+import uuid
+
+app = Flask(__name__)
+app.secret_key = 'clave_secreta_segura_cambiar_en_produccion'
+
+# Detrás de un proxy (balanceador de Clever Cloud, nginx) la IP del cliente llega en
+# X-Forwarded-For: PROXY_SALTOS es cuántos proxies de confianza hay delante. Sin
+# proxy debe quedar en 0, o cualquiera podría inventarse la IP (y el límite de login)
+PROXY_SALTOS = int(os.environ.get('PROXY_SALTOS', 0))
+if PROXY_SALTOS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_SALTOS, x_proto=PROXY_SALTOS,
+                            x_host=PROXY_SALTOS)
+app.config['CLIENTES_POR_PAGINA'] = int(os.environ.get('CLIENTES_POR_PAGINA', 50))
+app.config['CLIENTES_POR_PAGINA_MAX'] = 200
+app.config['COMPRAS_POR_PAGINA'] = int(os.environ.get('COMPRAS_POR_PAGINA', 50))
+# A partir de cuántas compras el reporte PDF se genera y envía en streaming
+app.config['REPORTE_STREAMING_DESDE'] = int(os.environ.get('REPORTE_STREAMING_DESDE', 2000))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tiempos por ruta (total, DB, plantilla) y cabecera Server-Timing
+tiempos_rutas = TiemposRutas()
+if os.environ.get('TIEMPOS_RUTAS', '1') != '0':
+    tiempos_rutas.instalar(app)
+
+
+def requiere_permiso(*nombres):
+    """
+    Exigir sesión iniciada y todos los permisos `nombres` (permisos.py).
+    Los permisos salen del reclamo de la sesión: no se consulta la base
+    salvo cuando cambió la versión de roles.
+    """
+    necesarios = mascara_de(*nombres)
+
+    def decorador(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            bits = autorizacion.permisos(session)
+            if bits is None:
+                # Sin reclamo (sesión vieja o usuario borrado): volver a iniciar sesión
+                session.clear()
+                flash('Debes iniciar sesión para acceder', 'warning')
+                return redirect(url_for('login'))
+            if bits & necesarios != necesarios:
+                return Response('No tienes permiso para ver esta página\n', status=403,
+                                mimetype='text/plain')
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorador
+
+# Sólo sesión iniciada, cualquier rol
+login_required = requiere_permiso()
+
+
+def tiene_permiso(*nombres):
+    """Para las plantillas: la sesión tiene todos los permisos `nombres`"""
+    necesarios = mascara_de(*nombres)
+    bits = autorizacion.permisos(session)
+    return bits is not None and bits & necesarios == necesarios
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        usuario = request.form.get('usuario', '').strip()
+        # La contraseña se compara tal cual, sin recortar espacios
+        contraseña = request.form.get('contraseña', '')
+        
+        # Validación básica
+        if not usuario or not contraseña:
+            flash('Usuario y contraseña son obligatorios', 'warning')
+            return render_template('login.html')
+            
+        try:
+            cuenta = usuarios.autenticar(usuario, contraseña, request.remote_addr or '')
+        except DemasiadosIntentos as e:
+            flash(str(e), 'danger')
+            respuesta = make_response(render_template('login.html'), 429)
+            respuesta.headers['Retry-After'] = str(e.reintentar)
+            return respuesta
+
+        if cuenta:
+            session['usuario'] = cuenta['usuario']
+            session['rol'] = cuenta['rol']
+            session['permisos'] = autorizacion.reclamo(cuenta['id_usuario'], cuenta['rol'])
+            flash(f'Bienvenido {usuario}', 'success')
+            return redirect(url_for('index'))
+        else:
+            flash('Usuario o contraseña incorrectos', 'danger')
+            
+    return render_template('login.html')
+
+@app.route('/logout')
+@login_required
+def logout():
+    usuario = session.get('usuario', 'Usuario')
+    session.clear()  # Limpiar toda la sesión
+    flash(f'Hasta luego {usuario}', 'info')
+    return redirect(url_for('login'))
+
+
+# Latencia, filas y errores de cada sentencia, expuestos en /metrics
+registro_consultas = RegistroConsultas(al_registrar=TiemposRutas.sumar_db)
+
+def ruta_actual():
+    return request.endpoint if has_request_context() else None
+
+@contextmanager
+def conexion_medida():
+    """Prestar una conexión del pool registrando cuánto se esperó por ella"""
+    inicio = time.perf_counter()
+    with obtener_conexion() as conexion:
+        registro_consultas.registrar_espera_pool(time.perf_counter() - inicio)
+        yield conexion
+
+def ejecutar_consulta(query, params=None, fetch=True):
+    """
+    Función centralizada para ejecutar consultas de manera segura.
+    Cada llamada toma una conexión del pool y la devuelve al terminar.
+    Con fetch=False devuelve el id generado por un INSERT (o True).
+    """
+    with conexion_medida() as conexion:
+        inicio = time.perf_counter()
+        filas, error = 0, False
+        try:
+            with conexion.cursor(dictionary=True) as cursor:
+                cursor.execute(query, params or ())
+                if fetch:
+                    resultado = cursor.fetchall()
+                    filas = len(resultado)
+                    return resultado
+                conexion.commit()
+                filas = cursor.rowcount
+                return cursor.lastrowid or True
+        except Exception as e:
+            error = True
+            logger.error(f"Error en consulta DB: {e}")
+            conexion.rollback()
+            raise e
+        finally:
+            registro_consultas.registrar(query, params, time.perf_counter() - inicio,
+                                         filas, error, ruta_actual())
+
+def ejecutar_modificacion(query, params=None):
+    """UPDATE/DELETE en un solo viaje: devuelve cuántas filas coincidieron"""
+    with conexion_medida() as conexion:
+        inicio = time.perf_counter()
+        filas, error = 0, False
+        try:
+            with conexion.cursor() as cursor:
+                cursor.execute(query, params or ())
+                conexion.commit()
+                filas = cursor.rowcount
+                return filas
+        except Exception as e:
+            error = True
+            logger.error(f"Error en consulta DB: {e}")
+            conexion.rollback()
+            raise e
+        finally:
+            registro_consultas.registrar(query, params, time.perf_counter() - inicio,
+                                         filas, error, ruta_actual())
+
+# Deshacen la transacción pero no son fallos de la base: quien la abrió los maneja
+ERRORES_DE_NEGOCIO = (StockInsuficiente,)
+
+@contextmanager
+def transaccion():
+    """
+    Ejecutar varias sentencias en una sola transacción con un único commit.
+    Si algo falla dentro del bloque se hace rollback de todo.
+    """
+    with conexion_medida() as conexion:
+        conexion.start_transaction()
+        try:
+            with conexion.cursor(dictionary=True) as cursor:
+                yield CursorMedido(cursor, registro_consultas, ruta_actual())
+            conexion.commit()
+        except Exception as e:
+            # Las claves duplicadas son esperadas (token de compra repetido, NIT ya registrado)
+            if not isinstance(e, ERRORES_DE_NEGOCIO) and not es_duplicado(e):
+                logger.error(f"Error en transacción DB: {e}")
+            conexion.rollback()
+            raise
+
+def iterar_consulta(query, params=None, lote=500):
+    """
+    Recorrer las filas de una consulta con un cursor sin buffer (del lado
+    del servidor), leyendo de `lote` en `lote` sin cargar todo el resultado
+    """
+    with conexion_medida() as conexion:
+        with conexion.cursor(dictionary=True, buffered=False) as cursor:
+            # Sólo se mide la ejecución: el resto del tiempo lo marca quien consume las filas
+            CursorMedido(cursor, registro_consultas, ruta_actual()).execute(query, params or ())
+            while True:
+                filas = cursor.fetchmany(lote)
+                if not filas:
+                    break
+                yield from filas
+
+def codificar_cursor(nombre, id_cliente):
+    """Cursor opaco para la URL a partir de la clave (nombre, id_cliente)"""
+    crudo = json.dumps([nombre, id_cliente], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+def decodificar_cursor(valor):
+    """Devuelve (nombre, id_cliente) o None si el cursor no es válido"""
+    if not valor:
+        return None
+    try:
+        crudo = base64.urlsafe_b64decode(valor + '=' * (-len(valor) % 4))
+        nombre, id_cliente = json.loads(crudo.decode('utf-8'))
+        return str(nombre), int(id_cliente)
+    except (ValueError, TypeError):
+        return None
+
+def obtener_clientes(despues=None, antes=None, limite=None):
+    """
+    Obtener una página de clientes ordenada por (nombre, id_cliente).
+    Paginación por clave (keyset): `despues`/`antes` son la clave de la
+    última/primera fila de la página vecina. Devuelve
+    (clientes, cursor_siguiente, cursor_anterior). Los errores de la base
+    de datos se propagan.
+    """
+    limite = limite or app.config['CLIENTES_POR_PAGINA']
+    if antes:
+        # Página anterior: se recorre el índice hacia atrás y se invierte
+        query = """
+            SELECT id_cliente, nombre, nit
+            FROM tbcliente
+            WHERE nombre < %s OR (nombre = %s AND id_cliente < %s)
+            ORDER BY nombre DESC, id_cliente DESC
+            LIMIT %s
+        """
+        params = (antes[0], antes[0], antes[1], limite + 1)
+    elif despues:
+        query = """
+            SELECT id_cliente, nombre, nit
+            FROM tbcliente
+            WHERE nombre > %s OR (nombre = %s AND id_cliente > %s)
+            ORDER BY nombre, id_cliente
+            LIMIT %s
+        """
+        params = (despues[0], despues[0], despues[1], limite + 1)
+    else:
+        query = """
+            SELECT id_cliente, nombre, nit
+            FROM tbcliente
+            ORDER BY nombre, id_cliente
+            LIMIT %s
+        """
+        params = (limite + 1,)
+
+    clientes = list(iterar_consulta(query, params))
+    hay_mas = len(clientes) > limite
+    clientes = clientes[:limite]
+    if antes:
+        clientes.reverse()
+    if not clientes:
+        return [], None, None
+
+    primero, ultimo = clientes[0], clientes[-1]
+    hay_siguiente = True if antes else hay_mas
+    hay_anterior = hay_mas if antes else despues is not None
+    siguiente = codificar_cursor(ultimo['nombre'], ultimo['id_cliente']) if hay_siguiente else None
+    anterior = codificar_cursor(primero['nombre'], primero['id_cliente']) if hay_anterior else None
+    return clientes, siguiente, anterior
+
+def cargar_cliente(id_cliente):
+    resultado = ejecutar_consulta(
+        "SELECT * FROM tbcliente WHERE id_cliente = %s", 
+        (id_cliente,)
+    )
+    return resultado[0] if resultado else None
+
+# Filas de clientes: memo por petición + LRU con TTL (invalidada en cada escritura)
+cache_clientes = crear_cache_clientes(cargar_cliente)
+
+def obtener_cliente_por_id(id_cliente):
+    """Obtener un cliente específico por ID"""
+    try:
+        return cache_clientes.obtener(id_cliente)
+    except Exception as e:
+        logger.error(f"Error al obtener cliente {id_cliente}: {e}")
+        return None
+
+
+# ------------------ Fragmentos ------------------
+
+# Tabla de clientes y lista de álbumes ya renderizadas, por versión de los datos
+fragmentos = CacheFragmentos()
+version_clientes = VersionClientes(ejecutar_consulta)
+
+# Usuarios con clave scrypt, cache de verificaciones y límite de intentos por IP
+usuarios = Usuarios(ejecutar_consulta)
+# Permisos por rol guardados en la sesión, con la versión de roles
+autorizacion = Autorizacion(ejecutar_consulta)
+
+# ------------------ Activos estáticos ------------------
+
+# CSS con huella en el nombre y variantes .gz/.br (flask --app app construir-activos)
+activos = Activos(app.static_folder)
+activos.cargar()
+app.jinja_env.globals['activo'] = activos.url
+app.jinja_env.globals['tiene_permiso'] = tiene_permiso
+
+# Plantillas y URLs de los activos que enlazan: si cambian, cambia el ETag de /
+HUELLA_REGISTRAR = huella_plantillas(app, 'registrar.html', 'tabla_clientes.html') + activos.huella
+
+
+# ------------------ Autocompletar ------------------
+
+indice_clientes = IndiceTrigramas()
+
+def asegurar_indice_clientes():
+    """
+    Construir el índice de autocompletar en segundo plano la primera vez que
+    se necesita, y reconstruirlo cuando otro worker cambió los clientes
+    """
+    try:
+        version = version_clientes.actual()
+    except Exception as e:
+        logger.error(f"Error al leer la versión de clientes: {e}")
+        version = None
+    indice_clientes.construir_en_segundo_plano(
+        lambda: iterar_consulta('SELECT id_cliente, nombre, nit FROM tbcliente'),
+        version=version, logger=logger
+    )
+
+@app.route('/autocompletar')
+@requiere_permiso('ver_clientes')
+def autocompletar():
+    texto = request.args.get('q', '').strip()
+    try:
+        limite = min(int(request.args.get('limite', LIMITE_SUGERENCIAS)), 50)
+    except ValueError:
+        limite = LIMITE_SUGERENCIAS
+    if not texto:
+        return jsonify(resultados=[])
+
+    asegurar_indice_clientes()
+    if indice_clientes.listo:
+        return jsonify(resultados=indice_clientes.buscar(texto, limite))
+
+    # Mientras se construye el índice se responde desde la base de datos
+    try:
+        resultados = buscar_clientes(texto, ejecutar_consulta, limite)
+    except Exception as e:
+        logger.error(f"Error en autocompletar: {e}")
+        resultados = []
+    return jsonify(resultados=[
+        {'id_cliente': c['id_cliente'], 'nombre': c['nombre'], 'nit': c['nit']} for c in resultados
+    ])
+
+@app.route('/')
+@requiere_permiso('ver_clientes')
+def index():
+    asegurar_indice_clientes()
+    try:
+        limite = int(request.args.get('tamano', app.config['CLIENTES_POR_PAGINA']))
+    except ValueError:
+        limite = app.config['CLIENTES_POR_PAGINA']
+    limite = max(1, min(limite, app.config['CLIENTES_POR_PAGINA_MAX']))
+
+    despues = decodificar_cursor(request.args.get('despues'))
+    antes = decodificar_cursor(request.args.get('antes'))
+
+    def renderizar_tabla():
+        clientes, siguiente, anterior = obtener_clientes(despues=despues, antes=antes, limite=limite)
+        return render_template('tabla_clientes.html',
+                               clientes=clientes,
+                               siguiente=siguiente,
+                               anterior=anterior,
+                               tamano=limite)
+
+    etag = None
+    try:
+        version = version_clientes.actual()
+        # Sin mensajes pendientes la página sólo depende de la versión de los datos, de la URL
+        # y de los permisos (los enlaces que muestra)
+        if '_flashes' not in session:
+            etag = calcular_etag(HUELLA_REGISTRAR, version, despues, antes, limite,
+                                 autorizacion.permisos(session))
+            if request.if_none_match.contains_weak(etag):
+                return no_modificada(etag)
+        tabla = fragmentos.obtener(('clientes', version, despues, antes, limite), renderizar_tabla)
+    except Exception as e:
+        flash(f'Error al obtener clientes: {str(e)}', 'danger')
+        etag = None
+        tabla = Markup(render_template('tabla_clientes.html', clientes=[]))
+
+    respuesta = make_response(render_template('registrar.html', 
+                                              mensaje='Clientes Registrados', 
+                                              tabla_clientes=tabla))
+    if etag:
+        respuesta.set_etag(etag)
+        respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+@app.route('/buscar')
+@requiere_permiso('ver_clientes')
+def buscar():
+    texto = request.args.get('txtbuscar', '').strip()
+    
+    if not texto:
+        flash('Debes escribir algo para buscar.', 'warning')
+        return redirect(url_for('index'))
+
+    try:
+        clientes = buscar_clientes(texto, ejecutar_consulta)
+        
+        if not clientes:
+            flash(f'No se encontraron resultados para: "{texto}"', 'info')
+            
+    except Exception as e:
+        flash(f'Error al buscar: {str(e)}', 'danger')
+        return redirect(url_for('index'))
+
+    mensaje = f'Resultados para: "{texto}" ({len(clientes)} encontrados)'
+    return render_template('registrar.html', 
+                         clientes=clientes, 
+                         mensaje=mensaje)
+
+@app.route('/insertar', methods=['POST'])
+@requiere_permiso('editar_clientes')
+def insertar():
+    nombre = request.form.get('txtnombre', '').strip()
+    nit = normalizar_nit(request.form.get('txtnit', '').strip())
+
+    # Validaciones (las mismas que la importación masiva)
+    problema = validar_cliente(nombre, nit)
+    if problema:
+        flash(problema, 'warning')
+        return redirect(url_for('index'))
+
+    try:
+        # El índice UNIQUE sobre nit rechaza duplicados (sin SELECT previo);
+        # la versión de clientes se confirma en la misma transacción
+        with transaccion() as cursor:
+            cursor.execute("INSERT INTO tbcliente (nombre, nit) VALUES (%s, %s)", (nombre, nit))
+            id_cliente = cursor.lastrowid
+            version = version_clientes.incrementar(cursor)
+        indice_clientes.agregar(id_cliente, nombre, nit)
+        indice_clientes.marcar_version(version)
+        cache_clientes.invalidar(id_cliente)
+        
+        flash(f'Cliente "{nombre}" registrado exitosamente', 'success')
+        
+    except Exception as e:
+        mensaje = mensaje_error_cliente(e, nit)
+        if mensaje:
+            flash(mensaje, 'warning')
+        else:
+            flash(f'Error al insertar cliente: {str(e)}', 'danger')
+
+    return redirect(url_for('index'))
+
+@app.route('/importar', methods=['POST'])
+@requiere_permiso('editar_clientes')
+def importar():
+    """Alta masiva de clientes desde un CSV (columnas nombre,nit)"""
+    archivo = request.files.get('archivo')
+    if not archivo or not archivo.filename:
+        flash('Selecciona un archivo CSV', 'warning')
+        return redirect(url_for('index'))
+
+    def indexar(insertadas, versiones):
+        for id_cliente, nombre, nit in insertadas:
+            indice_clientes.agregar(id_cliente, nombre, nit)
+        for version in versiones:
+            indice_clientes.marcar_version(version)
+
+    try:
+        # La versión sube dentro de la transacción de cada lote: una importación
+        # que falla a medias también deja la tabla al día
+        resultado = importar_clientes(archivo.stream, transaccion, al_insertar=indexar,
+                                      al_escribir=version_clientes.incrementar)
+    except Exception as e:
+        logger.error(f"Error en importación masiva: {e}")
+        if request.args.get('formato') == 'json':
+            return jsonify(error=str(e)), 500
+        flash(f'Error al importar: {str(e)}', 'danger')
+        return redirect(url_for('index'))
+
+    if request.args.get('formato') == 'json':
+        return jsonify(resultado)
+    flash(f"Importación: {resultado['insertados']} clientes registrados de {resultado['leidas']} filas",
+          'success' if not resultado['total_errores'] else 'warning')
+    for error in resultado['errores'][:10]:
+        flash(f"Línea {error['linea']}: {error['error']}", 'warning')
+    if resultado['total_errores'] > 10:
+        flash(f"... y {resultado['total_errores'] - 10} errores más", 'warning')
+    return redirect(url_for('index'))
+
+@app.route('/exportar/<tabla>.csv')
+@requiere_permiso('reportes')
+def exportar(tabla):
+    if tabla not in EXPORTACIONES:
+        flash('Exportación no disponible', 'warning')
+        return redirect(url_for('index'))
+    columnas, query = EXPORTACIONES[tabla]
+    # Las filas se leen por lotes mientras se envía la respuesta
+    return Response(
+        stream_with_context(generar_csv(columnas, iterar_consulta(query))),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={tabla}.csv'}
+    )
+
+@app.route('/actualizar/<int:id>')
+@requiere_permiso('editar_clientes')
+def actualizar(id):
+    cliente = obtener_cliente_por_id(id)
+    
+    if not cliente:
+        flash('Cliente no encontrado', 'danger')
+        return redirect(url_for('index'))
+
+    return render_template('actualizar.html', datos=cliente)
+
+@app.route('/actualizar_cliente', methods=['POST'])
+@requiere_permiso('editar_clientes')
+def actualizar_cliente():
+    """Nueva ruta para procesar la actualización"""
+    id_cliente = request.form.get('id_cliente', type=int)
+    nombre = request.form.get('txtnombre', '').strip()
+    nit = normalizar_nit(request.form.get('txtnit', '').strip())
+
+    if not all([id_cliente, nombre, nit]):
+        flash('Todos los campos son obligatorios', 'warning')
+        return redirect(url_for('index'))
+
+    try:
+        # Un solo UPDATE: 0 filas = el cliente no existe; NIT repetido = error 1062
+        with transaccion() as cursor:
+            cursor.execute(
+                "UPDATE tbcliente SET nombre = %s, nit = %s WHERE id_cliente = %s",
+                (nombre, nit, id_cliente)
+            )
+            encontradas = cursor.rowcount
+            version = version_clientes.incrementar(cursor) if encontradas else None
+        if not encontradas:
+            flash('Cliente no encontrado', 'danger')
+            return redirect(url_for('index'))
+
+        indice_clientes.actualizar(id_cliente, nombre, nit)
+        indice_clientes.marcar_version(version)
+        cache_clientes.invalidar(id_cliente)
+        # El nombre y el NIT aparecen en el reporte
+        cache_reportes.invalidar(id_cliente)
+        
+        flash(f'Cliente "{nombre}" actualizado correctamente', 'success')
+        
+    except Exception as e:
+        mensaje = mensaje_error_cliente(e, nit)
+        if mensaje:
+            flash(mensaje, 'warning')
+            return redirect(url_for('actualizar', id=id_cliente))
+        flash(f'Error al actualizar cliente: {str(e)}', 'danger')
+
+    return redirect(url_for('index'))
+
+@app.route('/eliminar/<int:id>')
+@requiere_permiso('editar_clientes')
+def eliminar(id):
+    try:
+        # Verificar que el cliente existe
+        cliente = obtener_cliente_por_id(id)
+        if not cliente:
+            flash('Cliente no encontrado', 'danger')
+            return redirect(url_for('index'))
+
+        # Verificar si tiene compras asociadas
+        compras = ejecutar_consulta(
+            "SELECT COUNT(*) as count FROM tbcompra WHERE id_cliente = %s", 
+            (id,)
+        )
+        
+        if compras and compras[0]['count'] > 0:
+            flash('No se puede eliminar el cliente porque tiene compras registradas', 'warning')
+            return redirect(url_for('index'))
+
+        # Eliminar cliente (y subir la versión en la misma transacción)
+        with transaccion() as cursor:
+            cursor.execute("DELETE FROM tbcliente WHERE id_cliente = %s", (id,))
+            version = version_clientes.incrementar(cursor)
+        indice_clientes.quitar(id)
+        indice_clientes.marcar_version(version)
+        cache_clientes.invalidar(id)
+        
+        flash(f'Cliente "{cliente["nombre"]}" eliminado correctamente', 'info')
+        
+    except Exception as e:
+        flash(f'Error al eliminar cliente: {str(e)}', 'danger')
+
+    return redirect(url_for('index'))
+
+# ------------------ Catálogo de Álbumes ------------------
+
+catalogo = CatalogoIndexado(
+    ejecutar_consulta,
+    ttl=int(os.environ.get('CATALOGO_TTL', 300)),
+    intervalo_version=int(os.environ.get('CATALOGO_VERIFICAR_VERSION', 5)),
+    logger=logger
+)
+
+def obtener_album_por_id(id_album):
+    """Obtener álbum por ID desde el índice en memoria"""
+    try:
+        return catalogo.obtener(id_album)
+    except Exception as e:
+        logger.error(f"Error al cargar el catálogo: {e}")
+        return None
+
+# ------------------ Carrito ------------------
+
+almacen_carritos = crear_almacen()
+reservas = ReservasStock(transaccion)
+
+def id_carrito_sesion():
+    """Id del carrito de esta sesión, creándolo si todavía no existe"""
+    if 'carrito_id' not in session:
+        session['carrito_id'] = uuid.uuid4().hex
+    return session['carrito_id']
+
+def leer_lineas_carrito():
+    """Líneas (id_album, cantidad) del carrito de esta sesión"""
+    id_carrito = session.get('carrito_id')
+    return almacen_carritos.obtener(id_carrito) if id_carrito else []
+
+def guardar_lineas_carrito(lineas):
+    id_carrito = session.get('carrito_id')
+    if not id_carrito:
+        if not lineas:
+            return
+        id_carrito = id_carrito_sesion()
+    if lineas:
+        almacen_carritos.guardar(id_carrito, lineas)
+    else:
+        almacen_carritos.borrar(id_carrito)
+
+def resolver_carrito(lineas):
+    """Completar cada línea con los datos del álbum desde el catálogo"""
+    carrito = []
+    for id_album, cantidad in lineas:
+        album = obtener_album_por_id(id_album)
+        if album:
+            carrito.append(dict(album, cantidad=cantidad))
+    return carrito
+
+@app.route('/comprar/<int:id>')
+@requiere_permiso('comprar')
+def comprar(id):
+    # Verificar que el cliente existe
+    cliente = obtener_cliente_por_id(id)
+    if not cliente:
+        flash('Cliente no encontrado', 'danger')
+        return redirect(url_for('index'))
+
+    carrito = resolver_carrito(leer_lineas_carrito())
+    total_carrito = sum(item['precio'] * item.get('cantidad', 1) for item in carrito)
+
+    artista = request.args.get('artista', '').strip()
+    tipo = request.args.get('tipo', '').strip()
+    try:
+        # La versión se lee antes que los álbumes: el fragmento nunca es más viejo que su clave
+        version = catalogo.version()
+        if artista:
+            albumes, clave = catalogo.por_artista(artista), ('artista', artista.lower())
+        elif tipo:
+            albumes, clave = catalogo.por_tipo(tipo), ('tipo', tipo.lower())
+        else:
+            albumes, clave = catalogo.todos(), ('todos',)
+        artistas, tipos = catalogo.artistas(), catalogo.tipos()
+        lista = fragmentos.obtener(('albumes', version) + clave,
+                                   lambda: render_template('lista_albumes.html', catalogo=albumes))
+    except Exception as e:
+        flash(f'Error al cargar el catálogo: {str(e)}', 'danger')
+        artistas, tipos = [], []
+        lista = Markup(render_template('lista_albumes.html', catalogo=[]))
+    
+    # Sin ETag: la página lleva un token de compra nuevo en cada visita
+    return render_template('catalogo.html', 
+                         lista_albumes=lista, 
+                         artistas=artistas,
+                         tipos=tipos,
+                         carrito=carrito,
+                         total_carrito=total_carrito,
+                         cliente=cliente,
+                         token_compra=uuid.uuid4().hex)
+
+@app.route('/agregar_carrito', methods=['POST'])
+@requiere_permiso('comprar')
+def agregar_carrito():
+    id_album = int(request.form.get('id'))
+    cantidad = int(request.form.get('cantidad', 1))
+    
+    album = obtener_album_por_id(id_album)
+    if not album:
+        flash('Álbum no encontrado', 'danger')
+        return redirect(request.referrer or url_for('index'))
+
+    if cantidad < 1:
+        flash('La cantidad debe ser al menos 1', 'warning')
+        return redirect(request.referrer or url_for('index'))
+
+    lineas = leer_lineas_carrito()
+    
+    # Buscar si el álbum ya está en el carrito
+    cantidad_actual = next((c for a, c in lineas if a == id_album), None)
+
+    # La reserva cubre el total del carrito para este álbum
+    try:
+        reservas.reservar(id_carrito_sesion(), id_album, (cantidad_actual or 0) + cantidad)
+    except StockInsuficiente as e:
+        if cantidad_actual is not None:
+            flash(f'No hay suficiente stock. Máximo: {e.disponible}', 'warning')
+        else:
+            flash(str(e), 'warning')
+        return redirect(request.referrer or url_for('index'))
+    except Exception as e:
+        flash(f'Error al reservar el álbum: {str(e)}', 'danger')
+        return redirect(request.referrer or url_for('index'))
+
+    guardar_lineas_carrito(sumar_linea(lineas, id_album, cantidad))
+    if cantidad_actual is not None:
+        flash(f'Cantidad actualizada para "{album["nombre"]}"', 'success')
+    else:
+        flash(f'"{album["nombre"]}" agregado al carrito', 'success')
+    
+    return redirect(request.referrer or url_for('index'))
+
+@app.route('/quitar_carrito', methods=['POST'])
+@requiere_permiso('comprar')
+def quitar_carrito():
+    id_album = int(request.form.get('id'))
+    lineas = leer_lineas_carrito()
+    
+    # Encontrar el nombre del álbum antes de eliminarlo
+    album_eliminado = obtener_album_por_id(id_album) if any(a == id_album for a, _ in lineas) else None
+    
+    guardar_lineas_carrito(quitar_linea(lineas, id_album))
+    if 'carrito_id' in session:
+        reservas.liberar(session['carrito_id'], id_album)
+    
+    if album_eliminado:
+        flash(f'"{album_eliminado["nombre"]}" eliminado del carrito', 'info')
+    
+    return redirect(request.referrer or url_for('index'))
+
+@app.route('/limpiar_carrito')
+@requiere_permiso('comprar')
+def limpiar_carrito():
+    """Nueva función para limpiar todo el carrito"""
+    guardar_lineas_carrito([])
+    if 'carrito_id' in session:
+        reservas.liberar(session['carrito_id'])
+    flash('Carrito vaciado completamente', 'info')
+    return redirect(request.referrer or url_for('index'))
+
+def registrar_compra(id_cliente, carrito, token, id_carrito=None):
+    """
+    Registrar todo el carrito en una sola transacción:
+    - el token de idempotencia evita que un doble envío del formulario duplique la compra
+    - el stock se descuenta con un UPDATE condicional (nunca queda negativo
+      ni invade las reservas de otros carritos) y se consumen las reservas
+    - las líneas se insertan en una sola sentencia multi-fila
+    Devuelve False si el token ya estaba registrado.
+    """
+    cantidades = {}
+    for item in carrito:
+        cantidades[item['id']] = cantidades.get(item['id'], 0) + item.get('cantidad', 1)
+
+    filas = [
+        (id_cliente, f"{item['nombre']} - {item['artista']}", item.get('cantidad', 1), item['precio'])
+        for item in carrito
+    ]
+
+    try:
+        with transaccion() as cursor:
+            cursor.execute(
+                "INSERT INTO tbpedido (token, id_cliente) VALUES (%s, %s)",
+                (token, id_cliente)
+            )
+            reservas.descontar(cursor, id_carrito, cantidades)
+            cursor.executemany(
+                "INSERT INTO tbcompra (id_cliente, producto, cantidad, costo) VALUES (%s, %s, %s, %s)",
+                filas
+            )
+    except Exception as e:
+        if es_duplicado(e):
+            return False
+        raise
+    return True
+
+@app.route('/finalizar_compra/<int:id_cliente>', methods=['POST'])
+@requiere_permiso('comprar')
+def finalizar_compra(id_cliente):
+    """Nueva función para procesar la compra"""
+    carrito = resolver_carrito(leer_lineas_carrito())
+    
+    if not carrito:
+        flash('El carrito está vacío', 'warning')
+        return redirect(url_for('comprar', id=id_cliente))
+
+    token = request.form.get('token_compra', '').strip()[:64] or uuid.uuid4().hex
+
+    try:
+        if registrar_compra(id_cliente, carrito, token, session.get('carrito_id')):
+            cache_reportes.invalidar(id_cliente)
+            flash('Compra realizada exitosamente', 'success')
+        else:
+            # Doble envío: el carrito se vacía igual y sus reservas ya no deben frenar a otros
+            if session.get('carrito_id'):
+                reservas.liberar(session['carrito_id'])
+            flash('Esta compra ya había sido registrada', 'info')
+
+        # Limpiar carrito después de la compra
+        guardar_lineas_carrito([])
+        
+    except StockInsuficiente as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('comprar', id=id_cliente))
+    except Exception as e:
+        flash(f'Error al procesar la compra: {str(e)}', 'danger')
+    
+    return redirect(url_for('vercompras', id=id_cliente))
+
+# ------------------ Compras ------------------
+
+CENTAVOS = Decimal('0.01')
+
+
+def a_decimal(valor):
+    """
+    Importe DECIMAL(12, 2) como Decimal. MySQL ya lo devuelve así; el
+    sustituto SQLite no tiene DECIMAL y entrega float, que se lleva a centavos.
+    """
+    if valor is None or isinstance(valor, Decimal):
+        return valor
+    return Decimal(str(valor)).quantize(CENTAVOS)
+
+
+def obtener_resumen_compras(id_cliente, antes=None, limite=None):
+    """
+    Resumen y una página de detalle de las compras de un cliente en una sola consulta.
+    Los totales se calculan en SQL con DECIMAL (sin pasar por float).
+    La página se pide por clave: `antes` es el último id_compra ya mostrado.
+    Devuelve (resumen, por_producto, detalle, siguiente).
+    """
+    limite = limite or app.config['COMPRAS_POR_PAGINA']
+    query = """
+        SELECT 0 AS orden, NULL AS id_compra, NULL AS producto,
+               COALESCE(SUM(cantidad), 0) AS cantidad, NULL AS costo,
+               COALESCE(SUM(cantidad * CAST(costo AS DECIMAL(12, 2))), 0) AS subtotal,
+               COUNT(*) AS num_compras
+        FROM tbcompra
+        WHERE id_cliente = %s
+        UNION ALL
+        SELECT 1, NULL, producto, SUM(cantidad), NULL,
+               SUM(cantidad * CAST(costo AS DECIMAL(12, 2))), COUNT(*)
+        FROM tbcompra
+        WHERE id_cliente = %s
+        GROUP BY producto
+        UNION ALL
+        SELECT * FROM (
+            SELECT 2, id_compra, producto, cantidad, CAST(costo AS DECIMAL(12, 2)),
+                   cantidad * CAST(costo AS DECIMAL(12, 2)), 1
+            FROM tbcompra
+            WHERE id_cliente = %s AND id_compra < %s
+            ORDER BY id_compra DESC
+            LIMIT %s
+        ) AS pagina
+        ORDER BY orden, id_compra DESC, subtotal DESC
+    """
+    # Sin cursor se empieza por la compra más reciente
+    tope = antes if antes is not None else 2 ** 31 - 1
+    filas = ejecutar_consulta(query, (id_cliente, id_cliente, id_cliente, tope, limite + 1))
+
+    resumen = {'num_compras': 0, 'cantidad': 0, 'total': Decimal('0.00')}
+    por_producto, detalle = [], []
+    for fila in filas:
+        fila['subtotal'], fila['costo'] = a_decimal(fila['subtotal']), a_decimal(fila['costo'])
+        if fila['orden'] == 0:
+            resumen = {'num_compras': fila['num_compras'], 'cantidad': fila['cantidad'],
+                       'total': fila['subtotal']}
+        elif fila['orden'] == 1:
+            por_producto.append(fila)
+        else:
+            detalle.append(fila)
+
+    siguiente = None
+    if len(detalle) > limite:
+        detalle = detalle[:limite]
+        siguiente = detalle[-1]['id_compra']
+    return resumen, por_producto, detalle, siguiente
+
+@app.route('/vercompras/<int:id>')
+@requiere_permiso('ver_compras')
+def vercompras(id):
+    cliente = obtener_cliente_por_id(id)
+    if not cliente:
+        flash('Cliente no encontrado', 'danger')
+        return redirect(url_for('index'))
+
+    antes = request.args.get('antes', type=int)
+    try:
+        resumen, por_producto, compras, siguiente = obtener_resumen_compras(id, antes=antes)
+        
+        return render_template('vercompras.html', 
+                             datos=compras, 
+                             cliente=cliente,
+                             resumen=resumen,
+                             por_producto=por_producto,
+                             total_compras=resumen['total'],
+                             siguiente=siguiente,
+                             es_primera_pagina=antes is None)
+                             
+    except Exception as e:
+        flash(f'Error al obtener compras: {str(e)}', 'danger')
+        return redirect(url_for('index'))
+
+# ------------------ Reportes PDF ------------------
+
+cache_reportes = CacheReportes(
+    max_entradas=int(os.environ.get('REPORTES_CACHE_ENTRADAS', 256)),
+    max_bytes=int(os.environ.get('REPORTES_CACHE_BYTES', 64 * 1024 * 1024))
+)
+
+def obtener_huella_compras(id_cliente):
+    """
+    (número de compras, último id_compra, nombre, NIT): cambia con cada compra
+    y con cada cambio del cliente, aunque lo haya hecho otro worker
+    """
+    resultado = ejecutar_consulta(
+        """
+        SELECT COUNT(co.id_compra) AS filas, MAX(co.id_compra) AS ultima, c.nombre, c.nit
+        FROM tbcliente c
+        LEFT JOIN tbcompra co ON co.id_cliente = c.id_cliente
+        WHERE c.id_cliente = %s
+        GROUP BY c.nombre, c.nit
+        """,
+        (id_cliente,)
+    )
+    if not resultado:
+        return 0, None, None, None
+    fila = resultado[0]
+    return fila['filas'], fila['ultima'], fila['nombre'], fila['nit']
+
+def responder_pdf(entrada):
+    response = make_response(entrada['pdf'])
+    response.headers['Content-Type'] = 'application/pdf'
+    response.headers['Content-Disposition'] = f"inline; filename={entrada['archivo']}"
+    # El navegador guarda el PDF pero lo revalida siempre con If-None-Match
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.set_etag(entrada['etag'], weak=True)
+    return response.make_conditional(request)
+
+def responder_pdf_en_streaming(id_cliente, huella):
+    """
+    Reporte para historiales grandes: las filas salen de un cursor del servidor
+    y cada página del PDF se envía en cuanto se completa. No pasa por la cache;
+    el ETag es el mismo que el del reporte en cache (etag_reporte).
+    """
+    _, _, nombre_cliente, nit_cliente = huella
+    filas = iterar_consulta(
+        "SELECT producto, cantidad, costo FROM tbcompra WHERE id_cliente = %s ORDER BY id_compra DESC",
+        (id_cliente,)
+    )
+    cuerpo = generar_pdf_en_streaming(nombre_cliente, nit_cliente, filas)
+    response = Response(stream_with_context(cuerpo), mimetype='application/pdf')
+    response.headers['Content-Disposition'] = f"inline; filename={nombre_archivo(nombre_cliente)}"
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.set_etag(etag_reporte(id_cliente, huella), weak=True)
+    return response.make_conditional(request)
+
+@app.route('/reporte/<int:id>')
+@requiere_permiso('reportes')
+def generar_pdf(id):
+    try:
+        huella = obtener_huella_compras(id)
+        if huella[0] == 0:
+            return "No se encontraron compras para este cliente", 404
+
+        # El ETag sale de la huella: el 304 no necesita el PDF, ni que lo tenga este worker
+        etag = etag_reporte(id, huella)
+        if request.if_none_match.contains_weak(etag):
+            return no_modificada(etag, debil=True)
+
+        if (huella[0] >= app.config['REPORTE_STREAMING_DESDE']
+                or request.args.get('modo') == 'streaming'):
+            return responder_pdf_en_streaming(id, huella)
+
+        entrada = cache_reportes.obtener(id, huella)
+        if entrada is not None:
+            return responder_pdf(entrada)
+
+        datos = ejecutar_consulta(SQL_REPORTE, (id,))
+        
+    except Exception as e:
+        logger.error(f"Error al generar reporte para cliente {id}: {e}")
+        return f"Error al generar reporte: {str(e)}", 500
+
+    if not datos:
+        return "No se encontraron compras para este cliente", 404
+
+    nombre_cliente, nit_cliente = datos[0]['nombre'], datos[0]['nit']
+
+    try:
+        pdf = construir_pdf(nombre_cliente, nit_cliente, datos)
+    except Exception as e:
+        logger.error(f"Error al generar PDF: {e}")
+        return f"Error al generar PDF: {str(e)}", 500
+
+    # La huella se toma de las filas usadas, por si cambiaron tras la primera consulta
+    huella = (len(datos), max(compra['id_compra'] for compra in datos), nombre_cliente, nit_cliente)
+    entrada = cache_reportes.guardar(id, huella, pdf, nombre_cliente)
+    return responder_pdf(entrada)
+
+
+@app.errorhandler(404)
+def page_not_found(e):
+    flash('Página no encontrada', 'warning')
+    return redirect(url_for('index'))
+
+@app.errorhandler(500)
+def internal_error(e):
+    flash('Error interno del servidor', 'danger')
+    return redirect(url_for('index'))
+
+# ------------------ Reportes masivos ------------------
+
+cola_reportes = ColaReportes()
+
+@app.route('/reportes/masivo', methods=['POST'])
+@requiere_permiso('reportes')
+def reporte_masivo():
+    """Encolar la generación de los reportes de todos los clientes con compras"""
+    formato = request.form.get('formato', 'zip')
+    if formato not in FORMATOS:
+        return jsonify(error=f'Formato no válido: {formato}'), 400
+    procesos = request.form.get('procesos')
+    if procesos:
+        if not procesos.isdigit() or int(procesos) < 1:
+            return jsonify(error=f'Número de procesos no válido: {procesos}'), 400
+        procesos = int(procesos)
+    estado = cola_reportes.encolar(formato=formato, procesos=procesos or None)
+    return jsonify(dict(estado, url=url_for('estado_reporte_masivo', id_trabajo=estado['id']))), 202
+
+@app.route('/reportes/masivo/<id_trabajo>')
+@requiere_permiso('reportes')
+def estado_reporte_masivo(id_trabajo):
+    estado = leer_estado(id_trabajo, cola_reportes.directorio_base)
+    if estado is None:
+        return jsonify(error='Trabajo no encontrado'), 404
+    if estado['total']:
+        estado['progreso'] = round(100 * (estado['generados'] + len(estado['errores'])) / estado['total'], 1)
+    if estado['estado'] == 'terminado' and estado['formato'] == 'zip':
+        estado['descarga'] = url_for('descargar_reporte_masivo', id_trabajo=id_trabajo)
+    return jsonify(estado)
+
+@app.route('/reportes/masivo/<id_trabajo>/descarga')
+@requiere_permiso('reportes')
+def descargar_reporte_masivo(id_trabajo):
+    estado = leer_estado(id_trabajo, cola_reportes.directorio_base)
+    if not estado or estado['estado'] != 'terminado' or estado['formato'] != 'zip':
+        return jsonify(error='El archivo no está disponible'), 404
+    return send_file(os.path.abspath(estado['archivo']), mimetype='application/zip',
+                     as_attachment=True, download_name=f'reportes_{id_trabajo}.zip')
+
+# ------------------ Salud ------------------
+
+@app.route('/salud')
+def salud():
+    """Liveness: el proceso responde, sin tocar la base de datos"""
+    return jsonify(estado='ok')
+
+@app.route('/listo')
+def listo():
+    """Readiness: la base de datos acepta consultas"""
+    ok, detalle = verificar_db()
+    if not ok:
+        # El detalle del driver puede traer el host y el usuario: sólo al log
+        logger.warning(f"/listo: la base de datos no responde: {detalle}")
+        return jsonify(estado='error', db='error'), 503
+    return jsonify(estado='ok', db='ok'), 200
+
+def metricas_permitidas():
+    """
+    Con METRICAS_TOKEN, sólo con `Authorization: Bearer <token>`. Sin token,
+    sólo desde la propia máquina y sin pasar por un proxy (un colector local):
+    las métricas muestran consultas SQL y el estado del pool.
+    """
+    token = os.environ.get('METRICAS_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if 'X-Forwarded-For' in request.headers:
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+@app.route('/metrics')
+def metrics():
+    """Métricas de este proceso en formato Prometheus"""
+    if not metricas_permitidas():
+        return Response('No autorizado\n', status=401, mimetype='text/plain')
+    return Response(registro_consultas.exportar_prometheus(pool.metricas())
+                    + tiempos_rutas.exportar_prometheus()
+                    + cache_clientes.exportar_prometheus()
+                    + fragmentos.exportar_prometheus()
+                    + usuarios.exportar_prometheus(),
+                    mimetype='text/plain; version=0.0.4')
+
+@app.route('/usuarios', methods=['GET', 'POST'])
+@requiere_permiso('usuarios')
+def gestionar_usuarios():
+    if request.method == 'POST':
+        usuario = request.form.get('txtusuario', '').strip()
+        clave = request.form.get('txtclave', '')
+        rol = request.form.get('txtrol', '')
+
+        if not usuario or len(usuario) > 50:
+            flash('El usuario es obligatorio y de hasta 50 caracteres', 'warning')
+        elif len(clave) < LARGO_MINIMO_CLAVE:
+            flash(f'La clave debe tener al menos {LARGO_MINIMO_CLAVE} caracteres', 'warning')
+        elif rol not in ROLES:
+            flash('Selecciona un rol válido', 'warning')
+        else:
+            try:
+                usuarios.crear(usuario, clave, rol)
+                flash(f'Usuario "{usuario}" creado como {rol}', 'success')
+            except DemasiadosIntentos as e:
+                flash(str(e), 'danger')
+            except Exception as e:
+                if es_duplicado(e):
+                    flash(f'Ya existe el usuario "{usuario}"', 'warning')
+                else:
+                    flash(f'Error al crear usuario: {str(e)}', 'danger')
+        return redirect(url_for('gestionar_usuarios'))
+
+    return render_template('usuarios.html', roles=ROLES, largo_minimo_clave=LARGO_MINIMO_CLAVE)
+
+@app.route('/activos/<path:nombre>')
+def servir_activo(nombre):
+    return activos.servir(nombre, request.accept_encodings)
+
+@app.cli.command('construir-activos')
+def construir_activos():
+    """Generar static/dist/ con huella, .gz y .br: parte del despliegue, antes de arrancar gunicorn"""
+    for nombre, con_huella in activos.construir().items():
+        click.echo(f'{nombre} -> {con_huella}')
+
+@app.cli.command('crear-usuario')
+@click.argument('usuario')
+@click.argument('rol', type=click.Choice(ROLES))
+@click.password_option('--clave', prompt='Clave')
+def crear_usuario(usuario, rol, clave):
+    """Crear un usuario desde la consola (el primer administrador: flask --app app crear-usuario admin administrador)"""
+    try:
+        id_usuario = usuarios.crear(usuario, clave, rol)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Usuario "{usuario}" creado con id {id_usuario}')
+
+@app.cli.command('cambiar-rol')
+@click.argument('usuario')
+@click.argument('rol', type=click.Choice(ROLES))
+def cambiar_rol(usuario, rol):
+    """Cambiar el rol de un usuario; sus sesiones abiertas lo ven en la próxima petición"""
+    if not usuarios.cambiar_rol(usuario, rol):
+        raise click.ClickException(f'No existe el usuario "{usuario}"')
+    autorizacion.rol_cambiado()
+    click.echo(f'Usuario "{usuario}" ahora es {rol}')
+
+if __name__ == '__main__':
+    # Sólo para desarrollo; en producción: gunicorn app:app (configuración en gunicorn.conf.py)
+    logger.info("Iniciando aplicación Flask...")
+    app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
+
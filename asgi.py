@@ -0,0 +1,144 @@
+"""
+Modo de servicio asíncrono (ASGI):
+
+    uvicorn asgi:aplicacion --host 0.0.0.0 --port 8000
+
+Sirve las mismas rutas y plantillas de app.py. Cada petición corre en un
+greenlet sobre el bucle de asyncio (config/conexion_async.py) y las
+consultas van por un pool asíncrono de DB_ASYNC_POOL_SIZE conexiones, así
+que un proceso atiende cientos de peticiones en vuelo mientras esperan a
+MySQL. Las que no consiguen conexión esperan en el pool (DB_POOL_TIMEOUT).
+
+Lo que sigue siendo síncrono (plantillas, PDF, carritos y cache de
+clientes en SQLite local) es trabajo local y corto; ese tiempo sí ocupa
+el bucle. Las respuestas en streaming (CSV, PDF) también se envían desde
+el greenlet, sin hilos.
+"""
+import asyncio
+import io
+import os
+import sys
+
+from config.conexion import calentar_pool, usar_pool_async
+
+# Antes de importar la aplicación: app toma el pool de config.conexion al importarse
+pool = usar_pool_async()
+
+from app import app, usuarios
+from config.conexion_async import en_greenlet, esperar, fijar_bucle, fuera_del_bucle
+
+# scrypt tarda decenas de ms por login: se calcula en un hilo, no en el bucle
+usuarios.ejecutor = fuera_del_bucle
+
+# El cuerpo de la petición se lee entero antes de llamar a la vista
+MAX_CUERPO = int(os.environ.get('ASGI_MAX_CUERPO', 64 * 1024 * 1024))
+
+
+def construir_environ(scope, cuerpo):
+    """Entorno WSGI equivalente a una petición HTTP de ASGI"""
+    raiz = scope.get('root_path', '')
+    ruta = scope['path']
+    if raiz and ruta.startswith(raiz):
+        ruta = ruta[len(raiz):]
+    servidor = scope.get('server') or ('localhost', 80)
+    cliente = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI usa cadenas latin-1 con los bytes de la URL
+        'SCRIPT_NAME': raiz.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': ruta.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': cliente[0],
+        'REMOTE_PORT': str(cliente[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(cuerpo),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for nombre, valor in scope.get('headers', []):
+        nombre = nombre.decode('latin-1').upper().replace('-', '_')
+        valor = valor.decode('latin-1')
+        if nombre in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[nombre] = valor
+            continue
+        clave = f'HTTP_{nombre}'
+        environ[clave] = f'{environ[clave]},{valor}' if clave in environ else valor
+    return environ
+
+
+def atender(environ, enviar):
+    """Corre en el greenlet de la petición: la vista y el envío del cuerpo"""
+    inicio = {}
+
+    def start_response(estado, cabeceras, exc_info=None):
+        inicio['estado'] = int(estado.split(' ', 1)[0])
+        inicio['cabeceras'] = [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                               for k, v in cabeceras]
+        return lambda datos: None
+
+    cuerpo = app(environ, start_response)
+    try:
+        esperar(enviar({'type': 'http.response.start', 'status': inicio['estado'],
+                        'headers': inicio['cabeceras']}))
+        for trozo in cuerpo:
+            if trozo:
+                esperar(enviar({'type': 'http.response.body', 'body': trozo, 'more_body': True}))
+        esperar(enviar({'type': 'http.response.body', 'body': b''}))
+    finally:
+        if hasattr(cuerpo, 'close'):
+            cuerpo.close()
+
+
+async def leer_cuerpo(recibir):
+    """Cuerpo completo de la petición, o None si el cliente se desconectó"""
+    partes, total = [], 0
+    while True:
+        mensaje = await recibir()
+        if mensaje['type'] == 'http.disconnect':
+            return None
+        parte = mensaje.get('body', b'')
+        total += len(parte)
+        if total > MAX_CUERPO:
+            raise ValueError(f'Cuerpo de más de {MAX_CUERPO} bytes')
+        partes.append(parte)
+        if not mensaje.get('more_body'):
+            return b''.join(partes)
+
+
+async def ciclo_de_vida(recibir, enviar):
+    while True:
+        mensaje = await recibir()
+        if mensaje['type'] == 'lifespan.startup':
+            fijar_bucle(asyncio.get_running_loop())
+            # Conexiones abiertas por adelantado (DB_WARMUP), igual que tras el fork en gunicorn
+            await en_greenlet(calentar_pool)
+            await enviar({'type': 'lifespan.startup.complete'})
+        elif mensaje['type'] == 'lifespan.shutdown':
+            await en_greenlet(pool.cerrar_todas)
+            await enviar({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def aplicacion(scope, recibir, enviar):
+    if scope['type'] == 'lifespan':
+        return await ciclo_de_vida(recibir, enviar)
+    if scope['type'] != 'http':
+        raise ValueError(f"Tipo de conexión no soportado: {scope['type']}")
+
+    fijar_bucle(asyncio.get_running_loop())
+    try:
+        cuerpo = await leer_cuerpo(recibir)
+    except ValueError:
+        await enviar({'type': 'http.response.start', 'status': 413,
+                      'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+        await enviar({'type': 'http.response.body', 'body': 'Petición demasiado grande'.encode('utf-8')})
+        return
+    if cuerpo is None:
+        return
+    await en_greenlet(atender, construir_environ(scope, cuerpo), enviar)
@@ -0,0 +1,268 @@
+"""
+Índice de trigramas en memoria para autocompletar clientes por nombre o NIT.
+
+Cada trigrama apunta a una lista de ids ordenada guardada en un
+`array('I')` (4 bytes por entrada, sin objetos por id). Las palabras se
+indexan con dos espacios delante, así "  a" y " an" marcan inicio de
+palabra: cada palabra de la consulta se busca como prefijo de alguna
+palabra del nombre o del NIT ("juan al" encuentra "Juan Alberto", no
+"Juana Salas").
+
+El índice es de cada proceso. Recuerda la versión de `tbcliente_version`
+con la que se construyó y la adelanta con las escrituras del propio
+proceso; si la versión de la base avanza por escrituras de otro worker,
+se reconstruye en segundo plano (como mucho cada
+AUTOCOMPLETAR_RECONSTRUIR_CADA segundos) mientras sigue respondiendo el
+índice anterior.
+"""
+import os
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+LIMITE_SUGERENCIAS = 10
+# Candidatos a ordenar como máximo: con prefijos muy comunes se corta antes de
+# recorrer listas enormes (se prefieren los ids más antiguos)
+MAX_CANDIDATOS = 200
+# Separación mínima entre reconstrucciones por cambios de otros workers
+INTERVALO_RECONSTRUCCION = float(os.environ.get('AUTOCOMPLETAR_RECONSTRUIR_CADA', 10))
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'José' -> 'jose'"""
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def trigramas_documento(texto):
+    trigramas = set()
+    for palabra in texto.split():
+        relleno = f'  {palabra} '
+        for i in range(len(relleno) - 2):
+            trigramas.add(relleno[i:i + 3])
+    return trigramas
+
+
+def trigramas_consulta(palabra):
+    """Trigramas de `palabra` como prefijo: incluyen los de inicio de palabra"""
+    relleno = f'  {palabra}'
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class IndiceTrigramas:
+    """Índice incremental y seguro entre hilos"""
+
+    def __init__(self, intervalo_reconstruccion=INTERVALO_RECONSTRUCCION):
+        self._listas = {}
+        self._documentos = {}
+        self._lock = threading.RLock()
+        self.listo = False
+        self._construyendo = False
+        # Cambios hechos mientras se construye: id -> (nombre, nit), o None si se quitó.
+        # Se repiten sobre el índice nuevo, así el recorrido no los pisa
+        self._tocados = {}
+        # Versión de tbcliente_version que refleja el índice y versiones propias aún no alcanzadas
+        self.version = None
+        self._propias = set()
+        self.intervalo_reconstruccion = intervalo_reconstruccion
+        self._proxima_reconstruccion = 0.0
+        self.construcciones = 0
+
+    # ---- mantenimiento ----
+
+    def _agregar_trigrama(self, trigrama, id_cliente):
+        lista = self._listas.get(trigrama)
+        if lista is None:
+            self._listas[trigrama] = array('I', [id_cliente])
+            return
+        # Los ids son autoincrementales: casi siempre se añaden al final
+        if not lista or lista[-1] < id_cliente:
+            lista.append(id_cliente)
+            return
+        i = bisect_left(lista, id_cliente)
+        if i == len(lista) or lista[i] != id_cliente:
+            lista.insert(i, id_cliente)
+
+    def _quitar_trigrama(self, trigrama, id_cliente):
+        lista = self._listas.get(trigrama)
+        if lista is None:
+            return
+        i = bisect_left(lista, id_cliente)
+        if i < len(lista) and lista[i] == id_cliente:
+            del lista[i]
+            if not lista:
+                del self._listas[trigrama]
+
+    def _indexar(self, id_cliente, nombre, nit):
+        clave = normalizar(f'{nombre} {nit}')
+        self._documentos[id_cliente] = (nombre, nit, clave)
+        for trigrama in trigramas_documento(clave):
+            self._agregar_trigrama(trigrama, id_cliente)
+
+    def _desindexar(self, id_cliente):
+        documento = self._documentos.pop(id_cliente, None)
+        if documento:
+            for trigrama in trigramas_documento(documento[2]):
+                self._quitar_trigrama(trigrama, id_cliente)
+
+    def agregar(self, id_cliente, nombre, nit):
+        with self._lock:
+            if self._construyendo:
+                self._tocados[id_cliente] = (nombre, nit)
+            self._desindexar(id_cliente)
+            self._indexar(id_cliente, nombre, nit)
+
+    def actualizar(self, id_cliente, nombre, nit):
+        self.agregar(id_cliente, nombre, nit)
+
+    def quitar(self, id_cliente):
+        with self._lock:
+            if self._construyendo:
+                self._tocados[id_cliente] = None
+            self._desindexar(id_cliente)
+
+    def marcar_version(self, version):
+        """Versión a la que llevó tbcliente_version una escritura de este proceso, ya aplicada"""
+        if version is None:
+            return
+        with self._lock:
+            self._propias.add(version)
+            self._avanzar_version()
+
+    def _avanzar_version(self):
+        # Sólo se avanza por versiones consecutivas: un hueco es una escritura de otro worker
+        while self.version is not None and self.version + 1 in self._propias:
+            self.version += 1
+        self._propias = {v for v in self._propias if self.version is None or v > self.version}
+
+    def desactualizado(self, version):
+        """Falta construirlo, o la base va por otra versión (`version` None: no se sabe)"""
+        with self._lock:
+            return not self.listo or (version is not None and version != self.version)
+
+    def _empezar_construccion(self):
+        with self._lock:
+            if self._construyendo:
+                return False
+            self._construyendo = True
+            self._tocados = {}
+            self._proxima_reconstruccion = time.monotonic() + self.intervalo_reconstruccion
+            return True
+
+    def construir(self, filas, version=None):
+        """Llenar el índice desde un iterador de filas (id_cliente, nombre, nit)"""
+        if self._empezar_construccion():
+            self._recorrer(filas, version)
+
+    def _recorrer(self, filas, version=None):
+        """Construir un índice nuevo aparte y cambiarlo por el actual, que sigue respondiendo"""
+        nuevo = IndiceTrigramas()
+        try:
+            for fila in filas:
+                nuevo._indexar(fila['id_cliente'], fila['nombre'], fila['nit'])
+            with self._lock:
+                for id_cliente, documento in self._tocados.items():
+                    nuevo._desindexar(id_cliente)
+                    if documento is not None:
+                        nuevo._indexar(id_cliente, *documento)
+                self._listas, self._documentos = nuevo._listas, nuevo._documentos
+                self.version = version
+                self._avanzar_version()
+                self.construcciones += 1
+                self.listo = True
+        finally:
+            with self._lock:
+                self._construyendo = False
+                self._tocados = {}
+
+    def construir_en_segundo_plano(self, cargar_filas, version=None, logger=None):
+        """
+        Construir el índice si falta, o reconstruirlo si `version` (la de
+        tbcliente_version leída antes del recorrido) no es la del índice.
+        `cargar_filas()` devuelve el iterador de filas.
+        """
+        with self._lock:
+            if self.listo and (not self.desactualizado(version)
+                               or time.monotonic() < self._proxima_reconstruccion):
+                return None
+        if not self._empezar_construccion():
+            return None
+
+        def tarea():
+            try:
+                self._recorrer(cargar_filas(), version)
+                if logger:
+                    logger.info(f"Índice de autocompletar listo: {len(self._documentos)} clientes")
+            except Exception as e:
+                if logger:
+                    logger.error(f"Error al construir el índice de autocompletar: {e}")
+
+        hilo = threading.Thread(target=tarea, daemon=True)
+        hilo.start()
+        return hilo
+
+    # ---- consulta ----
+
+    def buscar(self, texto, limite=LIMITE_SUGERENCIAS):
+        palabras = normalizar(texto).split()
+        if not palabras:
+            return []
+        trigramas = set()
+        for palabra in palabras:
+            trigramas |= trigramas_consulta(palabra)
+
+        with self._lock:
+            listas = [self._listas.get(t) for t in trigramas]
+            if any(lista is None for lista in listas):
+                return []
+            # Se cruzan todas, de la más corta a la más larga; la comprobación
+            # de prefijos de abajo descarta lo que los trigramas no distinguen
+            listas.sort(key=len)
+            base, resto = listas[0], listas[1:]
+
+            # Intersección por saltos: cada lista avanza con bisect desde su
+            # última posición, sin volver a recorrer lo ya descartado
+            documentos = self._documentos
+            posiciones = [0] * len(resto)
+            candidatos = []
+            for id_cliente in base:
+                coincide = True
+                for n, lista in enumerate(resto):
+                    i = bisect_left(lista, id_cliente, posiciones[n])
+                    posiciones[n] = i
+                    if i == len(lista) or lista[i] != id_cliente:
+                        coincide = False
+                        break
+                if not coincide:
+                    continue
+                nombre, nit, clave = documentos[id_cliente]
+                # Los trigramas pueden coincidir sin que la palabra sea un prefijo
+                clave_palabras = clave.split()
+                if all(any(w.startswith(p) for w in clave_palabras) for p in palabras):
+                    candidatos.append((id_cliente, nombre, nit, clave))
+                    if len(candidatos) >= MAX_CANDIDATOS:
+                        break
+
+        def orden(candidato):
+            return (not candidato[3].startswith(palabras[0]), len(candidato[3]), candidato[1])
+
+        candidatos.sort(key=orden)
+        return [
+            {'id_cliente': id_cliente, 'nombre': nombre, 'nit': nit}
+            for id_cliente, nombre, nit, _ in candidatos[:limite]
+        ]
+
+    def estadisticas(self):
+        with self._lock:
+            entradas = sum(len(lista) for lista in self._listas.values())
+            return {
+                'listo': self.listo,
+                'version': self.version,
+                'construcciones': self.construcciones,
+                'clientes': len(self._documentos),
+                'trigramas': len(self._listas),
+                'entradas': entradas,
+                'bytes_listas': entradas * array('I').itemsize,
+            }
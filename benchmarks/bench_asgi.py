@@ -0,0 +1,155 @@
+"""
+Benchmark: modo ASGI (uvicorn asgi:aplicacion) contra gunicorn síncrono
+(app:app con --workers x --threads) a concurrencia creciente.
+
+Ambos servidores usan la misma base sembrada del sustituto SQLite con una
+latencia simulada por sentencia (--latencia-ms), que hace de la ida y vuelta
+a MySQL remoto: en modo síncrono la espera ocupa un hilo, en modo ASGI
+sólo una conexión del pool asíncrono. Por defecto se pide /vercompras,
+que es casi todo espera a la base: /buscar en el sustituto es CPU (el
+FULLTEXT se emula en Python) y / sale de la cache de fragmentos.
+
+    python benchmarks/bench_asgi.py --concurrencias 10 50 100 200 400 --latencia-ms 20
+
+Imprime una línea JSON por (modo, concurrencia) y un resumen al final.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_carga import (ClienteHTTP, MEZCLA, Mediciones, cookie_de_sesion, ejecutar_escenario,
+                         escenario, sembrar)
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def comando(modo, puerto, args):
+    if modo == 'asgi':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:aplicacion', '--host', '127.0.0.1',
+                '--port', str(puerto), '--workers', str(args.procesos_asgi),
+                '--log-level', 'warning', '--no-access-log']
+    return [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{puerto}',
+            '--workers', str(args.workers), '--threads', str(args.threads),
+            '--log-level', 'warning', 'app:app']
+
+
+def esperar_servidor(puerto, proceso, limite=30):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if proceso.poll() is not None:
+            raise RuntimeError(f'El servidor terminó con código {proceso.returncode}')
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=2)
+            conexion.request('GET', '/salud')
+            if conexion.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('El servidor no respondió a tiempo')
+
+
+def medir(puerto, cookie, concurrencia, args):
+    pesos = [(nombre, MEZCLA[nombre]) for nombre in args.escenarios]
+    mediciones = Mediciones()
+    fin = time.perf_counter() + args.duracion
+
+    def usuario_virtual(numero):
+        aleatorio = random.Random(args.semilla + numero)
+        cliente = ClienteHTTP(puerto, cookie)
+        try:
+            while time.perf_counter() < fin:
+                nombre = aleatorio.choices([n for n, _ in pesos], [p for _, p in pesos])[0]
+                ejecutar_escenario(cliente, escenario(nombre, aleatorio, args.clientes), mediciones)
+        finally:
+            cliente.cerrar()
+
+    usuarios = [threading.Thread(target=usuario_virtual, args=(i,)) for i in range(concurrencia)]
+    inicio = time.perf_counter()
+    for usuario in usuarios:
+        usuario.start()
+    for usuario in usuarios:
+        usuario.join()
+    resumen = mediciones.resumen(time.perf_counter() - inicio)
+
+    todas = sorted(l for latencias in mediciones.latencias.values() for l in latencias)
+    errores = sum(mediciones.errores.values())
+
+    def percentil(p):
+        return round(todas[min(len(todas) - 1, int(p * len(todas)))] * 1000, 1) if todas else None
+
+    return {'por_segundo': resumen['por_segundo'], 'peticiones': resumen['peticiones'],
+            'errores': errores, 'p50_ms': percentil(0.5), 'p95_ms': percentil(0.95),
+            'p99_ms': percentil(0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ASGI contra gunicorn síncrono a concurrencia creciente')
+    parser.add_argument('--concurrencias', type=int, nargs='+', default=[10, 50, 100, 200, 400])
+    parser.add_argument('--duracion', type=float, default=10, help='segundos por concurrencia')
+    parser.add_argument('--latencia-ms', type=float, default=20, help='latencia simulada por sentencia')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn, por worker')
+    parser.add_argument('--procesos-asgi', type=int, default=1, help='uvicorn --workers')
+    parser.add_argument('--pool-async', type=int, default=100, help='DB_ASYNC_POOL_SIZE por proceso')
+    parser.add_argument('--modos', nargs='+', choices=['sync', 'asgi'], default=['sync', 'asgi'])
+    parser.add_argument('--escenarios', nargs='+', choices=sorted(MEZCLA),
+                        default=['vercompras'])
+    parser.add_argument('--clientes', type=int, default=2000)
+    parser.add_argument('--compras', type=int, default=20000)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    ruta = os.path.join(tempfile.mkdtemp(), 'asgi.db')
+    sembrar(ruta, args.clientes, args.compras, args.semilla)
+    entorno = dict(os.environ, DB_MOTOR='sqlite', DB_SQLITE_RUTA=ruta,
+                   DB_SQLITE_LATENCIA_MS=str(args.latencia_ms),
+                   DB_POOL_SIZE=str(args.threads), DB_ASYNC_POOL_SIZE=str(args.pool_async),
+                   CARRITO_ALMACEN='memoria', TIEMPOS_RUTAS='0')
+    os.environ.update(DB_MOTOR='sqlite', DB_SQLITE_RUTA=ruta)
+    from app import app
+    cookie = cookie_de_sesion(app)
+
+    resultados = {}
+    for modo in args.modos:
+        puerto = puerto_libre()
+        proceso = subprocess.Popen(comando(modo, puerto, args), cwd=RAIZ, env=entorno,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            esperar_servidor(puerto, proceso)
+            for concurrencia in args.concurrencias:
+                resultado = medir(puerto, cookie, concurrencia, args)
+                resultados[(modo, concurrencia)] = resultado
+                print(json.dumps(dict(modo=modo, concurrencia=concurrencia, **resultado)), flush=True)
+        finally:
+            proceso.terminate()
+            proceso.wait()
+
+    if set(args.modos) == {'sync', 'asgi'}:
+        print(json.dumps({'resumen': [
+            {'concurrencia': c,
+             'sync_por_segundo': resultados[('sync', c)]['por_segundo'],
+             'asgi_por_segundo': resultados[('asgi', c)]['por_segundo'],
+             'mejora': round(resultados[('asgi', c)]['por_segundo']
+                             / max(resultados[('sync', c)]['por_segundo'], 0.1), 2)}
+            for c in args.concurrencias
+        ], 'hilos_sync': args.workers * args.threads, 'pool_asgi': args.pool_async}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: búsqueda con LIKE '%x%' (consulta original) contra busqueda.py.
+
+Necesita un MySQL de pruebas (NUNCA la base de producción). Crea y llena
+la tabla `tbcliente` en la base indicada con --base:
+
+    DB_HOST=127.0.0.1 DB_USER=root DB_PASSWORD=... \
+        python benchmarks/bench_busqueda.py --base bench_ventas --tamanos 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+
+from config.conexion import CONFIG_DB
+from busqueda import buscar_clientes
+
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Carlos', 'Lucía', 'Pedro', 'Sofía',
+           'Jorge', 'Elena', 'Miguel', 'Valeria', 'Andrés', 'Camila', 'Diego']
+APELLIDOS = ['García', 'López', 'Pérez', 'Gómez', 'Martínez', 'Rodríguez', 'Hernández',
+             'Morales', 'Castillo', 'Ramírez', 'Flores', 'Vásquez', 'Reyes', 'Cruz']
+
+CONSULTA_LIKE = """
+    SELECT id_cliente, nombre, nit
+    FROM tbcliente
+    WHERE LOWER(nombre) LIKE LOWER(%s) OR nit LIKE %s
+    ORDER BY nombre
+"""
+
+
+def conectar(base):
+    config = dict(CONFIG_DB, database=base)
+    return mysql.connector.connect(autocommit=True, **config)
+
+
+def crear_tabla(conexion, cantidad, lote=5000):
+    cursor = conexion.cursor()
+    cursor.execute('DROP TABLE IF EXISTS tbcliente')
+    cursor.execute("""
+        CREATE TABLE tbcliente (
+            id_cliente INT AUTO_INCREMENT PRIMARY KEY,
+            nombre VARCHAR(100) NOT NULL,
+            nit VARCHAR(20) NOT NULL
+        )
+    """)
+    aleatorio = random.Random(42)
+    for inicio in range(0, cantidad, lote):
+        filas = []
+        for i in range(inicio, min(inicio + lote, cantidad)):
+            nombre = (f"{aleatorio.choice(NOMBRES)} {aleatorio.choice(APELLIDOS)} "
+                      f"{''.join(aleatorio.choices(string.ascii_lowercase, k=5))}")
+            filas.append((nombre, str(1000000 + i)))
+        cursor.executemany('INSERT INTO tbcliente (nombre, nit) VALUES (%s, %s)', filas)
+    for linea in open(os.path.join(os.path.dirname(__file__), '..', 'config', 'esquema.sql')):
+        linea = linea.strip()
+        if linea.upper().startswith('CREATE') and 'tbcliente' in linea:
+            cursor.execute(linea.rstrip(';'))
+    cursor.close()
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        'mediana_ms': round(statistics.median(tiempos), 3),
+        'p95_ms': round(tiempos[int(len(tiempos) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--base', required=True, help='Base de datos de pruebas')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    conexion = conectar(args.base)
+
+    def ejecutar(query, params):
+        with conexion.cursor(dictionary=True) as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    textos = ['garcía', 'mar', 'luis pérez', '1000123', '10005']
+    resultados = []
+    for cantidad in args.tamanos:
+        crear_tabla(conexion, cantidad)
+        for texto in textos:
+            like = f'%{texto}%'
+            resultados.append({
+                'clientes': cantidad,
+                'texto': texto,
+                'like': medir(lambda: ejecutar(CONSULTA_LIKE, (like, like)), args.repeticiones),
+                'indice': medir(lambda: buscar_clientes(texto, ejecutar), args.repeticiones),
+            })
+            print(json.dumps(resultados[-1], ensure_ascii=False), flush=True)
+    conexion.close()
+
+
+if __name__ == '__main__':
+    main()
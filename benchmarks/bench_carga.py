@@ -0,0 +1,350 @@
+"""
+Prueba de carga reproducible de las rutas principales contra el sustituto
+SQLite (config/sqlite_local.py), sin tocar la base de Clever Cloud.
+
+1. Siembra una base local con --clientes clientes y --compras compras
+   (misma --semilla, mismos datos).
+2. Fase `test_client`: --peticiones peticiones secuenciales por ruta con el
+   cliente de pruebas de Flask (costo de la ruta sin red).
+3. Fase `http`: servidor WSGI con hilos en un puerto local y --hilos
+   usuarios virtuales con conexiones keep-alive durante --duracion segundos,
+   con una mezcla de rutas.
+
+El resultado es JSON (rendimiento y percentiles de latencia por ruta). Con
+--comparar se contrasta con una ejecución anterior y se sale con código 1
+si alguna ruta empeoró más que --tolerancia por ciento:
+
+    python benchmarks/bench_carga.py --clientes 5000 --compras 50000 --salida base.json
+    python benchmarks/bench_carga.py --clientes 5000 --compras 50000 --comparar base.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Carlos', 'Lucía', 'Pedro', 'Sofía',
+           'Jorge', 'Elena', 'Miguel', 'Valeria', 'Andrés', 'Camila', 'Diego']
+APELLIDOS = ['García', 'López', 'Pérez', 'Gómez', 'Martínez', 'Rodríguez', 'Hernández',
+             'Morales', 'Castillo', 'Ramírez', 'Flores', 'Vásquez', 'Reyes', 'Cruz']
+
+# Peso de cada escenario en la fase http
+MEZCLA = {
+    'index': 30,
+    'buscar': 25,
+    'vercompras': 20,
+    'reporte': 5,
+    'compra': 20,
+}
+
+
+# ------------------ Datos ------------------
+
+def sembrar(ruta, clientes, compras, semilla):
+    from config import sqlite_local
+
+    sqlite_local.inicializar(ruta)
+    aleatorio = random.Random(semilla)
+    conexion = sqlite3.connect(ruta)
+    conexion.execute('DELETE FROM tbcompra')
+    conexion.execute('DELETE FROM tbcliente')
+    conexion.executemany(
+        'INSERT INTO tbcliente (id_cliente, nombre, nit) VALUES (?, ?, ?)',
+        ((i, f'{aleatorio.choice(NOMBRES)} {aleatorio.choice(APELLIDOS)} {aleatorio.choice(APELLIDOS)}',
+          str(1000000 + i)) for i in range(1, clientes + 1))
+    )
+    albumes = conexion.execute('SELECT nombre, artista, precio FROM tbalbum').fetchall()
+    conexion.executemany(
+        'INSERT INTO tbcompra (id_cliente, producto, cantidad, costo) VALUES (?, ?, ?, ?)',
+        ((aleatorio.randint(1, clientes), f'{a[0]} - {a[1]}', aleatorio.randint(1, 3), a[2])
+         for a in (aleatorio.choice(albumes) for _ in range(compras)))
+    )
+    # Stock de sobra: la prueba mide rendimiento, no agotamiento
+    conexion.execute('UPDATE tbalbum SET stock = 1000000000')
+    conexion.commit()
+    conexion.close()
+
+
+# ------------------ Clientes ------------------
+
+class ClienteFlask:
+    """Peticiones en proceso con el cliente de pruebas de Flask"""
+
+    def __init__(self, app):
+        self._cliente = app.test_client()
+        with self._cliente.session_transaction() as sesion:
+            iniciar_sesion_admin(sesion)
+
+    def pedir(self, metodo, ruta, datos=None):
+        respuesta = self._cliente.open(ruta, method=metodo, data=datos)
+        cuerpo = respuesta.get_data()
+        return respuesta.status_code, len(cuerpo)
+
+
+class ClienteHTTP:
+    """Conexión keep-alive propia, con la cookie de sesión del usuario virtual"""
+
+    def __init__(self, puerto, cookie):
+        self._conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=30)
+        self._cookie = cookie
+
+    def pedir(self, metodo, ruta, datos=None):
+        cabeceras = {'Cookie': f'session={self._cookie}'}
+        cuerpo = None
+        if datos:
+            cuerpo = urlencode(datos)
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            self._conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+            respuesta = self._conexion.getresponse()
+            contenido = respuesta.read()
+        except Exception:
+            # Una conexión a medias no sirve para la siguiente petición: se reabre
+            self._conexion.close()
+            raise
+        for cabecera in respuesta.headers.get_all('Set-Cookie') or []:
+            if cabecera.startswith('session='):
+                self._cookie = cabecera.split(';', 1)[0][len('session='):]
+        return respuesta.status, len(contenido)
+
+    def cerrar(self):
+        self._conexion.close()
+
+
+def cookie_de_sesion(app):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        iniciar_sesion_admin(sesion)
+    return cliente.get_cookie('session').value
+
+
+def iniciar_sesion_admin(sesion):
+    """Sesión de administrador sin pasar por /login (no calcula scrypt en cada prueba)"""
+    from app import autorizacion
+
+    sesion['usuario'] = 'admin'
+    sesion['rol'] = 'administrador'
+    sesion['permisos'] = autorizacion.reclamo(1, 'administrador')
+
+
+# ------------------ Escenarios ------------------
+
+def escenario(nombre, aleatorio, clientes):
+    """Peticiones (ruta_registrada, método, url, datos, estados_esperados) de un escenario"""
+    id_cliente = aleatorio.randint(1, clientes)
+    if nombre == 'index':
+        return [('index', 'GET', '/', None, (200,))]
+    if nombre == 'buscar':
+        texto = aleatorio.choice([aleatorio.choice(APELLIDOS), str(1000000 + id_cliente)[:5]])
+        return [('buscar', 'GET', '/buscar?' + urlencode({'txtbuscar': texto}), None, (200,))]
+    if nombre == 'vercompras':
+        return [('vercompras', 'GET', f'/vercompras/{id_cliente}', None, (200,))]
+    if nombre == 'reporte':
+        # 404: el cliente sorteado no tiene compras
+        return [('reporte', 'GET', f'/reporte/{id_cliente}', None, (200, 404))]
+    if nombre == 'compra':
+        return [
+            ('agregar_carrito', 'POST', '/agregar_carrito',
+             {'id': str(aleatorio.randint(1, 7)), 'cantidad': '1'}, (302,)),
+            ('finalizar_compra', 'POST', f'/finalizar_compra/{id_cliente}',
+             {'token_compra': uuid.uuid4().hex}, (302,)),
+        ]
+    raise ValueError(f'Escenario desconocido: {nombre}')
+
+
+class Mediciones:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}
+        self.errores = {}
+        self.bytes = {}
+
+    def registrar(self, ruta, segundos, error, tamano):
+        with self._lock:
+            self.latencias.setdefault(ruta, []).append(segundos)
+            self.errores[ruta] = self.errores.get(ruta, 0) + (1 if error else 0)
+            self.bytes[ruta] = self.bytes.get(ruta, 0) + tamano
+
+    def resumen(self, duracion):
+        rutas = {}
+        for ruta, latencias in sorted(self.latencias.items()):
+            ordenadas = sorted(latencias)
+
+            def percentil(p):
+                return round(ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))] * 1000, 3)
+
+            rutas[ruta] = {
+                'peticiones': len(ordenadas),
+                'errores': self.errores[ruta],
+                'por_segundo': round(len(ordenadas) / duracion, 1),
+                'media_ms': round(sum(ordenadas) / len(ordenadas) * 1000, 3),
+                'p50_ms': percentil(0.5),
+                'p95_ms': percentil(0.95),
+                'p99_ms': percentil(0.99),
+                'max_ms': round(ordenadas[-1] * 1000, 3),
+                'bytes_medios': self.bytes[ruta] // len(ordenadas),
+            }
+        total = sum(len(v) for v in self.latencias.values())
+        return {'duracion_s': round(duracion, 2), 'peticiones': total,
+                'por_segundo': round(total / duracion, 1), 'rutas': rutas}
+
+
+def ejecutar_escenario(cliente, pasos, mediciones):
+    for ruta, metodo, url, datos, esperados in pasos:
+        inicio = time.perf_counter()
+        try:
+            estado, tamano = cliente.pedir(metodo, url, datos)
+            error = estado not in esperados
+        except Exception:
+            estado, tamano, error = None, 0, True
+        mediciones.registrar(ruta, time.perf_counter() - inicio, error, tamano)
+
+
+# ------------------ Fases ------------------
+
+def fase_test_client(app, args):
+    mediciones = Mediciones()
+    cliente = ClienteFlask(app)
+    aleatorio = random.Random(args.semilla)
+    inicio = time.perf_counter()
+    for nombre in args.escenarios:
+        for _ in range(args.peticiones):
+            ejecutar_escenario(cliente, escenario(nombre, aleatorio, args.clientes), mediciones)
+    return mediciones.resumen(time.perf_counter() - inicio)
+
+
+def fase_http(app, args):
+    from werkzeug.serving import make_server
+
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    hilo_servidor = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo_servidor.start()
+
+    pesos = [(nombre, MEZCLA[nombre]) for nombre in args.escenarios]
+    mediciones = Mediciones()
+    fin = time.perf_counter() + args.duracion
+
+    def usuario_virtual(numero):
+        aleatorio = random.Random(args.semilla + numero)
+        cliente = ClienteHTTP(servidor.server_port, cookie_de_sesion(app))
+        try:
+            while time.perf_counter() < fin:
+                nombre = aleatorio.choices([n for n, _ in pesos], [p for _, p in pesos])[0]
+                ejecutar_escenario(cliente, escenario(nombre, aleatorio, args.clientes), mediciones)
+        finally:
+            cliente.cerrar()
+
+    usuarios = [threading.Thread(target=usuario_virtual, args=(i,)) for i in range(args.hilos)]
+    inicio = time.perf_counter()
+    for usuario in usuarios:
+        usuario.start()
+    for usuario in usuarios:
+        usuario.join()
+    duracion = time.perf_counter() - inicio
+    servidor.shutdown()
+    resultado = mediciones.resumen(duracion)
+    resultado['hilos'] = args.hilos
+    return resultado
+
+
+# ------------------ Comparación ------------------
+
+def comparar(actual, base, tolerancia):
+    """Rutas que empeoraron: p95 más alto o rendimiento más bajo que la tolerancia"""
+    regresiones = []
+    for fase in ('test_client', 'http'):
+        rutas_base = base.get(fase, {}).get('rutas', {})
+        for ruta, medida in actual.get(fase, {}).get('rutas', {}).items():
+            referencia = rutas_base.get(ruta)
+            if not referencia:
+                continue
+            if medida['p95_ms'] > referencia['p95_ms'] * (1 + tolerancia / 100):
+                regresiones.append(f"{fase}/{ruta}: p95 {referencia['p95_ms']} -> {medida['p95_ms']} ms")
+            if fase == 'http' and medida['por_segundo'] < referencia['por_segundo'] * (1 - tolerancia / 100):
+                regresiones.append(
+                    f"{fase}/{ruta}: {referencia['por_segundo']} -> {medida['por_segundo']} peticiones/s"
+                )
+    return regresiones
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga contra el sustituto SQLite')
+    parser.add_argument('--clientes', type=int, default=2000)
+    parser.add_argument('--compras', type=int, default=20000)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--peticiones', type=int, default=200, help='por ruta en la fase test_client')
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--duracion', type=float, default=10, help='segundos de la fase http')
+    parser.add_argument('--escenarios', nargs='+', choices=sorted(MEZCLA), default=list(MEZCLA))
+    parser.add_argument('--fases', nargs='+', choices=['test_client', 'http'], default=['test_client', 'http'])
+    parser.add_argument('--base', help='archivo SQLite a usar (por defecto uno temporal)')
+    parser.add_argument('--salida', help='guardar el resultado JSON en este archivo')
+    parser.add_argument('--comparar', help='resultado JSON anterior con el que comparar')
+    parser.add_argument('--tolerancia', type=float, default=20, help='porcentaje de empeoramiento aceptado')
+    args = parser.parse_args()
+
+    ruta = args.base or os.path.join(tempfile.mkdtemp(), 'carga.db')
+    os.environ['DB_MOTOR'] = 'sqlite'
+    os.environ['DB_SQLITE_RUTA'] = ruta
+    os.environ['DB_POOL_SIZE'] = str(args.hilos + 2)
+    os.environ.setdefault('CARRITO_ALMACEN', 'memoria')
+    os.environ.setdefault('REPORTES_DIRECTORIO', os.path.join(tempfile.mkdtemp(), 'reportes'))
+
+    inicio = time.perf_counter()
+    sembrar(ruta, args.clientes, args.compras, args.semilla)
+    siembra = time.perf_counter() - inicio
+
+    from app import app
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    resultado = {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit_actual(),
+        'python': platform.python_version(),
+        'parametros': {k: v for k, v in vars(args).items() if k not in ('salida', 'comparar')},
+        'siembra_s': round(siembra, 2),
+    }
+    if 'test_client' in args.fases:
+        resultado['test_client'] = fase_test_client(app, args)
+    if 'http' in args.fases:
+        resultado['http'] = fase_http(app, args)
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regresiones = comparar(resultado, json.load(f), args.tolerancia)
+        for regresion in regresiones:
+            print(f'REGRESIÓN {regresion}', file=sys.stderr)
+        sys.exit(1 if regresiones else 0)
+
+
+if __name__ == '__main__':
+    main()
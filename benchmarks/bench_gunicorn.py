@@ -0,0 +1,103 @@
+"""
+Benchmark de humo: servidor de desarrollo (python app.py) contra gunicorn
+con gunicorn.conf.py (gunicorn app:app), a unas pocas concurrencias.
+
+Misma base sembrada del sustituto SQLite con latencia simulada por
+sentencia (--latencia-ms) y la misma mezcla de escenarios que
+bench_carga.py. El servidor de desarrollo corre con el recargador de
+Flask, tal como se arranca a mano; gunicorn lee toda su configuración del
+archivo (workers y hilos salen de los núcleos salvo GUNICORN_*).
+
+    python benchmarks/bench_gunicorn.py --concurrencias 1 8 32 --duracion 10
+    python benchmarks/bench_gunicorn.py --escenarios vercompras --latencia-ms 20
+
+Con un solo núcleo la mezcla completa queda limitada por CPU (/buscar) y
+los dos servidores rinden parecido; con rutas que esperan a la base los
+hilos de gunicorn se notan.
+
+Imprime una línea JSON por (servidor, concurrencia) y un resumen al final.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_asgi import esperar_servidor, medir, puerto_libre
+from bench_carga import MEZCLA, cookie_de_sesion, sembrar
+
+
+def comando(servidor):
+    if servidor == 'desarrollo':
+        return [sys.executable, 'app.py']
+    return [sys.executable, '-m', 'gunicorn', 'app:app']
+
+
+def entorno_de(servidor, puerto, base):
+    entorno = dict(base, PORT=str(puerto))
+    if servidor == 'gunicorn':
+        entorno.update(GUNICORN_BIND=f'127.0.0.1:{puerto}', GUNICORN_ACCESS_LOG='',
+                       GUNICORN_LOG_LEVEL='warning')
+    return entorno
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor de desarrollo contra gunicorn con gunicorn.conf.py')
+    parser.add_argument('--concurrencias', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duracion', type=float, default=10, help='segundos por concurrencia')
+    parser.add_argument('--latencia-ms', type=float, default=5, help='latencia simulada por sentencia')
+    parser.add_argument('--servidores', nargs='+', choices=['desarrollo', 'gunicorn'],
+                        default=['desarrollo', 'gunicorn'])
+    parser.add_argument('--escenarios', nargs='+', choices=sorted(MEZCLA), default=sorted(MEZCLA))
+    parser.add_argument('--clientes', type=int, default=2000)
+    parser.add_argument('--compras', type=int, default=20000)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp()
+    ruta = os.path.join(directorio, 'gunicorn.db')
+    sembrar(ruta, args.clientes, args.compras, args.semilla)
+    base = dict(os.environ, DB_MOTOR='sqlite', DB_SQLITE_RUTA=ruta,
+                DB_SQLITE_LATENCIA_MS=str(args.latencia_ms), TIEMPOS_RUTAS='0',
+                CARRITO_SQLITE_RUTA=os.path.join(directorio, 'carritos.db'),
+                CLIENTES_CACHE_COMPARTIDA=os.path.join(directorio, 'cache_clientes.db'))
+    os.environ.update(DB_MOTOR='sqlite', DB_SQLITE_RUTA=ruta)
+    from app import app
+    cookie = cookie_de_sesion(app)
+
+    resultados = {}
+    for servidor in args.servidores:
+        puerto = puerto_libre()
+        # Sesión propia: el recargador de Flask deja un proceso hijo que también hay que parar
+        proceso = subprocess.Popen(comando(servidor), cwd=RAIZ, env=entorno_de(servidor, puerto, base),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                   start_new_session=True)
+        try:
+            esperar_servidor(puerto, proceso)
+            for concurrencia in args.concurrencias:
+                resultado = medir(puerto, cookie, concurrencia, args)
+                resultados[(servidor, concurrencia)] = resultado
+                print(json.dumps(dict(servidor=servidor, concurrencia=concurrencia, **resultado)), flush=True)
+        finally:
+            os.killpg(proceso.pid, signal.SIGTERM)
+            proceso.wait()
+
+    if set(args.servidores) == {'desarrollo', 'gunicorn'}:
+        print(json.dumps({'resumen': [
+            {'concurrencia': c,
+             'desarrollo_por_segundo': resultados[('desarrollo', c)]['por_segundo'],
+             'gunicorn_por_segundo': resultados[('gunicorn', c)]['por_segundo'],
+             'mejora': round(resultados[('gunicorn', c)]['por_segundo']
+                             / max(resultados[('desarrollo', c)]['por_segundo'], 0.1), 2)}
+            for c in args.concurrencias
+        ]}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: logins por segundo y por núcleo con claves scrypt.
+
+Tres mediciones sobre el sustituto SQLite:
+- hash: verificaciones scrypt crudas con 1..--procesos procesos
+  (el costo que fija USUARIOS_SCRYPT_N y que limita todo lo demás);
+- login: POST /login con el cliente de pruebas de Flask, sin cache
+  (cada login verifica el hash) y con la cache de verificaciones caliente;
+- rafaga: muchos intentos fallidos desde una sola IP; el límite por IP
+  deja calcular sólo unos pocos hashes y rechaza el resto con 429.
+
+    python benchmarks/bench_login.py --duracion 5 --procesos 4
+
+Imprime una línea JSON por medición.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+CLAVE = 'clave-de-prueba-123'
+
+
+def verificar_durante(segundos):
+    from usuarios import hashear_clave, verificar_clave
+
+    clave_hash = hashear_clave(CLAVE)
+    hechas, fin = 0, time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        verificar_clave(CLAVE, clave_hash)
+        hechas += 1
+    return hechas
+
+
+def medir_hash(procesos, duracion):
+    with multiprocessing.Pool(procesos) as grupo:
+        inicio = time.perf_counter()
+        total = sum(grupo.map(verificar_durante, [duracion] * procesos))
+        transcurrido = time.perf_counter() - inicio
+    por_segundo = total / transcurrido
+    return {'medicion': 'hash', 'procesos': procesos, 'por_segundo': round(por_segundo, 1),
+            'por_segundo_por_proceso': round(por_segundo / procesos, 1)}
+
+
+def logins_durante(cliente, usuarios, duracion):
+    hechos, fallidos, fin = 0, 0, time.perf_counter() + duracion
+    inicio = time.perf_counter()
+    while time.perf_counter() < fin:
+        usuario = usuarios[hechos % len(usuarios)]
+        respuesta = cliente.post('/login', data={'usuario': usuario, 'contraseña': CLAVE})
+        fallidos += respuesta.status_code != 302
+        hechos += 1
+    return hechos / (time.perf_counter() - inicio), fallidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Logins por segundo y por núcleo')
+    parser.add_argument('--duracion', type=float, default=5, help='segundos por medición')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--usuarios', type=int, default=50)
+    parser.add_argument('--rafaga', type=int, default=200, help='intentos fallidos desde una IP')
+    parser.add_argument('--limite-rafaga', type=int, default=10, help='LOGIN_INTENTOS_RAFAGA')
+    parser.add_argument('--limite-por-minuto', type=float, default=10, help='LOGIN_INTENTOS_POR_MINUTO')
+    args = parser.parse_args()
+
+    for procesos in sorted({1, args.procesos}):
+        print(json.dumps(medir_hash(procesos, args.duracion)), flush=True)
+
+    ruta = os.path.join(tempfile.mkdtemp(), 'login.db')
+    # Sin límite por IP para las mediciones de rendimiento; la ráfaga usa uno propio
+    os.environ.update(DB_MOTOR='sqlite', DB_SQLITE_RUTA=ruta, TIEMPOS_RUTAS='0',
+                      LOGIN_INTENTOS_RAFAGA='1000000000')
+    from config import sqlite_local
+    sqlite_local.inicializar(ruta)
+    from app import app, usuarios
+    from usuarios import CacheVerificaciones, LimiteIntentos
+
+    nombres = [f'usuario{i}' for i in range(args.usuarios)]
+    for nombre in nombres:
+        usuarios.crear(nombre, CLAVE, 'comprador')
+    cliente = app.test_client()
+
+    # Sin cache: una cache de cero entradas no guarda nada y cada login calcula el hash
+    for modo, cache in (('sin_cache', CacheVerificaciones(max_entradas=0)),
+                        ('con_cache', CacheVerificaciones())):
+        usuarios.cache = cache
+        if modo == 'con_cache':
+            for nombre in nombres:
+                cliente.post('/login', data={'usuario': nombre, 'contraseña': CLAVE})
+        hashes = usuarios.hashes_calculados
+        por_segundo, fallidos = logins_durante(cliente, nombres, args.duracion)
+        print(json.dumps({'medicion': 'login', 'modo': modo, 'por_segundo': round(por_segundo, 1),
+                          'fallidos': fallidos, 'hashes': usuarios.hashes_calculados - hashes}),
+              flush=True)
+
+    usuarios.limite = LimiteIntentos(rafaga=args.limite_rafaga, por_minuto=args.limite_por_minuto)
+    hashes, estados = usuarios.hashes_calculados, {}
+    inicio = time.perf_counter()
+    for _ in range(args.rafaga):
+        estado = cliente.post('/login', data={'usuario': nombres[0], 'contraseña': 'equivocada'}).status_code
+        estados[estado] = estados.get(estado, 0) + 1
+    print(json.dumps({'medicion': 'rafaga', 'intentos': args.rafaga,
+                      'segundos': round(time.perf_counter() - inicio, 3),
+                      'hashes': usuarios.hashes_calculados - hashes,
+                      'estados': {str(k): v for k, v in sorted(estados.items())}}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
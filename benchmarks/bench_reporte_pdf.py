@@ -0,0 +1,84 @@
+"""
+Benchmark: reporte PDF completo en memoria (construir_pdf, como el camino
+original con fetchall) contra el modo streaming (generar_pdf_en_streaming).
+
+Cada medición corre en un proceso aparte para que el pico de RSS
+(ru_maxrss) sea el de ese modo y no el acumulado. Las filas se generan
+al vuelo, como las entregaría un cursor del servidor:
+
+    python benchmarks/bench_reporte_pdf.py --filas 10000 50000 200000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def filas(cantidad):
+    for i in range(cantidad):
+        yield {'producto': f'Álbum de prueba número {i} - Artista', 'cantidad': 1 + i % 5,
+               'costo': 9.99 + i % 30}
+
+
+def pico_rss_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KiB, macOS en bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def medir(modo, cantidad):
+    from reportes import construir_pdf, generar_pdf_en_streaming
+
+    rss_inicial = pico_rss_mb()
+    inicio = time.perf_counter()
+    primer_byte = None
+    total_bytes = 0
+    if modo == 'memoria':
+        # Como el camino original: todas las filas en una lista y el PDF entero en memoria
+        datos = list(filas(cantidad))
+        pdf = construir_pdf('Cliente de prueba', '1234567', datos)
+        primer_byte = time.perf_counter() - inicio
+        total_bytes = len(pdf)
+    else:
+        for trozo in generar_pdf_en_streaming('Cliente de prueba', '1234567', filas(cantidad)):
+            if primer_byte is None:
+                primer_byte = time.perf_counter() - inicio
+            total_bytes += len(trozo)
+    return {
+        'modo': modo,
+        'filas': cantidad,
+        'primer_byte_ms': round(primer_byte * 1000, 2),
+        'total_ms': round((time.perf_counter() - inicio) * 1000, 2),
+        'bytes': total_bytes,
+        'pico_rss_mb': pico_rss_mb(),
+        'rss_inicial_mb': rss_inicial,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--filas', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--modo', choices=['memoria', 'streaming'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(medir(args.modo, args.filas[0])))
+        return
+
+    for cantidad in args.filas:
+        for modo in ('memoria', 'streaming'):
+            salida = subprocess.run(
+                [sys.executable, __file__, '--modo', modo, '--filas', str(cantidad)],
+                check=True, capture_output=True, text=True
+            )
+            print(salida.stdout.strip(), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark de contención: muchos hilos reservando y comprando el mismo álbum.
+
+Cada intento usa un carrito nuevo: reserva una unidad y confirma la compra
+con reservas.descontar, como /agregar_carrito y /finalizar_compra. Al final
+se comprueba que las unidades vendidas no superan el stock inicial y que el
+stock no quedó negativo. Por defecto usa el sustituto SQLite en un archivo
+temporal; con --mysql usa la base de DB_* (NUNCA la de producción):
+
+    python benchmarks/bench_reservas.py --hilos 8 32 64 --stock 200 --intentos 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+ID_ALBUM = 1
+
+
+def preparar(args):
+    if not args.mysql:
+        os.environ['DB_MOTOR'] = 'sqlite'
+        os.environ['DB_SQLITE_RUTA'] = os.path.join(tempfile.mkdtemp(), 'bench_reservas.db')
+    os.environ['DB_POOL_SIZE'] = str(max(args.hilos))
+
+    from config import conexion
+    if not args.mysql:
+        from config import sqlite_local
+        sqlite_local.inicializar(conexion.SQLITE_RUTA)
+    return conexion
+
+
+def medir(conexion, hilos, stock, intentos, ttl):
+    from contextlib import contextmanager
+    from reservas import ReservasStock, StockInsuficiente
+
+    @contextmanager
+    def transaccion():
+        with conexion.obtener_conexion() as con:
+            con.start_transaction()
+            try:
+                with con.cursor(dictionary=True) as cursor:
+                    yield cursor
+                con.commit()
+            except Exception:
+                con.rollback()
+                raise
+
+    with transaccion() as cursor:
+        cursor.execute("DELETE FROM tbreserva WHERE id_album = %s", (ID_ALBUM,))
+        cursor.execute("UPDATE tbalbum SET stock = %s WHERE id_album = %s", (stock, ID_ALBUM))
+
+    reservas = ReservasStock(transaccion, ttl=ttl)
+    contadores = {'reservas': 0, 'rechazos_reserva': 0, 'vendidas': 0, 'rechazos_compra': 0,
+                  'errores': 0}
+    lock = threading.Lock()
+    salida = threading.Barrier(hilos)
+
+    def trabajar():
+        locales = dict.fromkeys(contadores, 0)
+        salida.wait()
+        for _ in range(intentos):
+            id_carrito = uuid.uuid4().hex
+            try:
+                reservas.reservar(id_carrito, ID_ALBUM, 1)
+                locales['reservas'] += 1
+            except StockInsuficiente:
+                locales['rechazos_reserva'] += 1
+                continue
+            except Exception:
+                locales['errores'] += 1
+                continue
+            try:
+                with transaccion() as cursor:
+                    reservas.descontar(cursor, id_carrito, {ID_ALBUM: 1})
+                locales['vendidas'] += 1
+            except StockInsuficiente:
+                locales['rechazos_compra'] += 1
+            except Exception:
+                locales['errores'] += 1
+        with lock:
+            for clave, valor in locales.items():
+                contadores[clave] += valor
+
+    trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+    inicio = time.perf_counter()
+    for hilo in trabajadores:
+        hilo.start()
+    for hilo in trabajadores:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    with conexion.obtener_conexion() as con:
+        with con.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT stock FROM tbalbum WHERE id_album = %s", (ID_ALBUM,))
+            stock_final = int(cursor.fetchone()['stock'])
+
+    operaciones = hilos * intentos
+    return dict(
+        contadores,
+        hilos=hilos,
+        intentos=operaciones,
+        stock_inicial=stock,
+        stock_final=stock_final,
+        sobreventa=max(0, contadores['vendidas'] - stock),
+        consistente=stock_final >= 0 and stock_final == stock - contadores['vendidas'],
+        segundos=round(duracion, 3),
+        operaciones_por_segundo=round(operaciones / duracion, 1),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Contención de reservas sobre un solo álbum')
+    parser.add_argument('--hilos', type=int, nargs='+', default=[8, 32])
+    parser.add_argument('--stock', type=int, default=100)
+    parser.add_argument('--intentos', type=int, default=20, help='intentos de compra por hilo')
+    parser.add_argument('--ttl', type=int, default=60)
+    parser.add_argument('--mysql', action='store_true', help='usar la base MySQL de DB_*')
+    args = parser.parse_args()
+
+    conexion = preparar(args)
+    fallos = 0
+    for hilos in args.hilos:
+        resultado = medir(conexion, hilos, args.stock, args.intentos, args.ttl)
+        fallos += resultado['sobreventa'] > 0 or not resultado['consistente']
+        print(json.dumps(resultado), flush=True)
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
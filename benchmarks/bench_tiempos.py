@@ -0,0 +1,97 @@
+"""
+Benchmark: costo de medir los tiempos por ruta (metricas_http.TiemposRutas).
+
+Mide el registro en el histograma por sí solo y el costo por petición de los
+hooks de Flask (before/after_request, señales de plantilla, Server-Timing)
+sobre una aplicación mínima, con y sin la medición instalada:
+
+    python benchmarks/bench_tiempos.py --peticiones 10000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, render_template_string
+
+from metricas_http import HistogramaHDR, TiemposRutas
+
+
+def medir_histograma(cantidad):
+    histograma = HistogramaHDR()
+    valores = [random.expovariate(1 / 0.02) for _ in range(cantidad)]
+    inicio = time.perf_counter()
+    for valor in valores:
+        histograma.registrar(valor)
+    registro = (time.perf_counter() - inicio) / cantidad
+
+    inicio = time.perf_counter()
+    HistogramaHDR.percentiles((histograma, HistogramaHDR()))
+    return {
+        'registrar_ns': round(registro * 1e9, 1),
+        'percentiles_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        'memoria_bytes': histograma.cuentas.itemsize * len(histograma.cuentas),
+    }
+
+
+def crear_app(con_medicion):
+    app = Flask(__name__)
+    if con_medicion:
+        tiempos = TiemposRutas()
+        tiempos.instalar(app)
+    else:
+        tiempos = None
+
+    @app.route('/pagina')
+    def pagina():
+        if tiempos:
+            # Lo que haría RegistroConsultas tras cada sentencia
+            TiemposRutas.sumar_db(0.0005)
+        return render_template_string('<ul>{% for i in filas %}<li>{{ i }}</li>{% endfor %}</ul>',
+                                      filas=range(20))
+
+    return app, tiempos
+
+
+def medir_peticiones(con_medicion, cantidad):
+    app, tiempos = crear_app(con_medicion)
+    cliente = app.test_client()
+    for _ in range(500):
+        cliente.get('/pagina')
+    inicio = time.perf_counter()
+    for _ in range(cantidad):
+        cliente.get('/pagina')
+    duracion = time.perf_counter() - inicio
+    resultado = {'medicion': con_medicion, 'us_por_peticion': round(duracion / cantidad * 1e6, 2)}
+    if tiempos:
+        resultado['p50_ms'] = round(tiempos.resumen()['pagina']['p50'] * 1000, 3)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Costo de la medición de tiempos por ruta')
+    parser.add_argument('--peticiones', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(json.dumps({'histograma': medir_histograma(200000)}), flush=True)
+    sin, con = [], []
+    for _ in range(args.repeticiones):
+        sin.append(medir_peticiones(False, args.peticiones)['us_por_peticion'])
+        con.append(medir_peticiones(True, args.peticiones)['us_por_peticion'])
+    base, medido = min(sin), min(con)
+    print(json.dumps({
+        'peticiones': args.peticiones,
+        'sin_medicion_us': base,
+        'con_medicion_us': medido,
+        'sobrecosto_us': round(medido - base, 2),
+        'sobrecosto_pct': round((medido - base) / base * 100, 1),
+    }), flush=True)
+
+
+if __name__ == '__main__':
+    main()
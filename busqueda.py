@@ -0,0 +1,112 @@
+"""
+Búsqueda de clientes.
+
+- NIT: coincidencia exacta y por prefijo sobre el índice de `nit`. Los NIT
+  se guardan normalizados (`normalizar_nit`, al insertar, actualizar e
+  importar), así "123.456" y "123456" son el mismo NIT.
+- Nombre: índice FULLTEXT de `nombre` en modo booleano, con prefijo por palabra.
+  Si sólo hay términos más cortos que el mínimo de FULLTEXT se resuelven con
+  `nombre LIKE 'x%'`, que sí usa el índice (nombre, id_cliente); mezclados
+  con términos largos, filtran por prefijo de palabra las filas de FULLTEXT.
+
+Nunca se usa LOWER(columna) ni comodín inicial: la colación *_ci ya
+compara sin distinguir mayúsculas y ambos anulan cualquier índice.
+"""
+import re
+
+LIMITE_RESULTADOS = 50
+# innodb_ft_min_token_size por defecto
+MIN_TOKEN_FULLTEXT = 3
+
+_PATRON_NIT = re.compile(r'^[0-9][0-9.\-]*[0-9kK]?$')
+# Operadores del modo booleano de FULLTEXT que no deben llegar desde el usuario
+_OPERADORES_FULLTEXT = re.compile(r'[+\-<>()~*"@]')
+
+
+def es_nit(texto):
+    """Un texto formado por dígitos (con puntos o guiones) se busca como NIT"""
+    return bool(_PATRON_NIT.match(texto))
+
+
+def escapar_like(texto):
+    """Escapar comodines para usar el texto como prefijo literal en LIKE"""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def normalizar_nit(texto):
+    """NIT sin puntos ni espacios: la forma en que se guarda y se busca"""
+    return texto.replace('.', '').replace(' ', '')
+
+
+def terminos_fulltext(texto):
+    """
+    Convertir el texto en una expresión booleana: cada palabra es obligatoria
+    y se busca por prefijo (`+pal*`). Devuelve (expresion, palabras_cortas)
+    """
+    palabras = _OPERADORES_FULLTEXT.sub(' ', texto).split()
+    largas = [p for p in palabras if len(p) >= MIN_TOKEN_FULLTEXT]
+    cortas = [p for p in palabras if len(p) < MIN_TOKEN_FULLTEXT]
+    expresion = ' '.join(f'+{p}*' for p in largas)
+    return expresion, cortas
+
+
+def consulta_por_nit(texto, limite):
+    nit = normalizar_nit(texto)
+    query = """
+        SELECT id_cliente, nombre, nit, 2 AS puntaje
+        FROM tbcliente
+        WHERE nit = %s
+        UNION ALL
+        SELECT id_cliente, nombre, nit, 1 AS puntaje
+        FROM tbcliente
+        WHERE nit LIKE %s AND nit <> %s
+        ORDER BY puntaje DESC, nit
+        LIMIT %s
+    """
+    return query, (nit, escapar_like(nit) + '%', nit, limite)
+
+
+def consulta_por_nombre(texto, limite):
+    expresion, cortas = terminos_fulltext(texto)
+    if expresion:
+        # Las palabras cortas no están en el índice FULLTEXT: se exigen como
+        # prefijo de alguna palabra del nombre, sólo sobre las filas que ya coinciden
+        filtros, params = '', [expresion, expresion]
+        for corta in cortas:
+            filtros += " AND (nombre LIKE %s OR nombre LIKE %s)"
+            params += [escapar_like(corta) + '%', '% ' + escapar_like(corta) + '%']
+        query = f"""
+            SELECT id_cliente, nombre, nit,
+                   MATCH(nombre) AGAINST (%s IN BOOLEAN MODE) AS puntaje
+            FROM tbcliente
+            WHERE MATCH(nombre) AGAINST (%s IN BOOLEAN MODE){filtros}
+            ORDER BY puntaje DESC, nombre, id_cliente
+            LIMIT %s
+        """
+        return query, (*params, limite)
+
+    # Sólo palabras cortas: prefijo sobre el índice (nombre, id_cliente)
+    prefijo = ' '.join(cortas)
+    query = """
+        SELECT id_cliente, nombre, nit, 1 AS puntaje
+        FROM tbcliente
+        WHERE nombre LIKE %s
+        ORDER BY nombre, id_cliente
+        LIMIT %s
+    """
+    return query, (escapar_like(prefijo) + '%', limite)
+
+
+def buscar_clientes(texto, ejecutar, limite=LIMITE_RESULTADOS):
+    """
+    Buscar clientes por NIT o nombre, ordenados por relevancia.
+    `ejecutar` es la función que corre la consulta (ejecutar_consulta).
+    """
+    texto = texto.strip()
+    if not texto:
+        return []
+    if es_nit(texto):
+        query, params = consulta_por_nit(texto, limite)
+    else:
+        query, params = consulta_por_nombre(texto, limite)
+    return ejecutar(query, params)
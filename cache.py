@@ -0,0 +1,87 @@
+"""
+Cache LRU en memoria, segura entre hilos, acotada por número de entradas,
+por tamaño total en bytes y, opcionalmente, por tiempo de vida (TTL).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_FALTA = object()
+
+
+class CacheLRU:
+
+    def __init__(self, max_entradas=1000, max_bytes=None, ttl=None, medir=None):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Función que da el tamaño en bytes de un valor (sólo si hay max_bytes)
+        self.medir = medir or len
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+        self._expulsiones = 0
+
+    def _quitar(self, clave):
+        valor, tamano, _ = self._datos.pop(clave)
+        self._bytes -= tamano
+        return valor
+
+    def obtener(self, clave, defecto=None):
+        with self._lock:
+            entrada = self._datos.get(clave, _FALTA)
+            if entrada is _FALTA:
+                self._fallos += 1
+                return defecto
+            valor, _, vence = entrada
+            if vence is not None and vence <= time.monotonic():
+                self._quitar(clave)
+                self._fallos += 1
+                return defecto
+            self._datos.move_to_end(clave)
+            self._aciertos += 1
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        tamano = self.medir(valor) if self.max_bytes else 0
+        if self.max_bytes and tamano > self.max_bytes:
+            # Un valor más grande que toda la cache no se guarda
+            self.invalidar(clave)
+            return valor
+        ttl = self.ttl if ttl is None else ttl
+        vence = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = (valor, tamano, vence)
+            self._bytes += tamano
+            while len(self._datos) > self.max_entradas or (
+                    self.max_bytes and self._bytes > self.max_bytes):
+                self._quitar(next(iter(self._datos)))
+                self._expulsiones += 1
+        return valor
+
+    def invalidar(self, clave):
+        with self._lock:
+            if clave in self._datos:
+                self._quitar(clave)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'entradas': len(self._datos),
+                'bytes': self._bytes,
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+                'expulsiones': self._expulsiones,
+            }
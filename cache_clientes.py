@@ -0,0 +1,172 @@
+"""
+Cache de lectura de las filas de `tbcliente` por id.
+
+Tres niveles: memo de la petición (flask.g), LRU del proceso con TTL y la
+base de datos. Las escrituras (insertar, actualizar_cliente, eliminar)
+invalidan el id. Con varios workers, CLIENTES_CACHE_COMPARTIDA apunta a un
+archivo SQLite donde cada invalidación queda anotada; cada worker lee las
+nuevas cada CLIENTES_CACHE_INTERVALO segundos, así que ninguna fila vieja
+sobrevive más que ese intervalo (y nunca más que el TTL).
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from flask import g, has_request_context
+
+from cache import CacheLRU
+
+MAX_CLIENTES = int(os.environ.get('CLIENTES_CACHE_MAX', 5000))
+TTL_CLIENTES = int(os.environ.get('CLIENTES_CACHE_TTL', 60))
+INTERVALO_INVALIDACIONES = float(os.environ.get('CLIENTES_CACHE_INTERVALO', 1))
+# Las invalidaciones anotadas se guardan este tiempo (más que cualquier TTL razonable)
+CONSERVAR_INVALIDACIONES = 3600
+
+
+class InvalidacionesSQLite:
+    """Registro de invalidaciones compartido por los workers de una máquina"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion = None
+        self._pid = None
+        self._ultima = None
+
+    def _conectar(self):
+        """Una conexión por proceso: la heredada de un fork no se puede usar"""
+        if self._pid == os.getpid():
+            return self._conexion
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False, isolation_level=None,
+                                         timeout=30)
+        self._pid = os.getpid()
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS invalidacion (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                clave TEXT NOT NULL,
+                momento REAL NOT NULL
+            )
+        """)
+        if self._ultima is None:
+            # Tras un fork se conserva la posición del padre, cuya cache hereda el hijo
+            self._ultima = self._conexion.execute(
+                'SELECT COALESCE(MAX(seq), 0) FROM invalidacion'
+            ).fetchone()[0]
+        return self._conexion
+
+    def publicar(self, clave):
+        ahora = time.time()
+        with self._lock:
+            conexion = self._conectar()
+            conexion.execute('INSERT INTO invalidacion (clave, momento) VALUES (?, ?)',
+                             (str(clave), ahora))
+            conexion.execute('DELETE FROM invalidacion WHERE momento < ?',
+                             (ahora - CONSERVAR_INVALIDACIONES,))
+
+    def nuevas(self):
+        """Claves invalidadas (por cualquier worker) desde la última lectura"""
+        with self._lock:
+            filas = self._conectar().execute(
+                'SELECT seq, clave FROM invalidacion WHERE seq > ? ORDER BY seq', (self._ultima,)
+            ).fetchall()
+            if filas:
+                self._ultima = filas[-1][0]
+        return [clave for _, clave in filas]
+
+
+class CacheClientes:
+
+    def __init__(self, cargar, max_entradas=MAX_CLIENTES, ttl=TTL_CLIENTES, compartida=None,
+                 intervalo=INTERVALO_INVALIDACIONES):
+        # `cargar(id_cliente)` devuelve la fila (dict) o None
+        self.cargar = cargar
+        self._cache = CacheLRU(max_entradas=max_entradas, ttl=ttl)
+        self.compartida = compartida
+        self.intervalo = intervalo
+        self._proxima_revision = 0.0
+        self._memo_aciertos = 0
+        # Sube con cada invalidación: una carga que empezó antes no guarda lo que leyó
+        self._generacion = 0
+        self._lock = threading.Lock()
+
+    def _memo(self):
+        if not has_request_context():
+            return None
+        if 'clientes_memo' not in g:
+            g.clientes_memo = {}
+        return g.clientes_memo
+
+    def _aplicar_invalidaciones(self):
+        if self.compartida is None:
+            return
+        ahora = time.monotonic()
+        if ahora < self._proxima_revision:
+            return
+        self._proxima_revision = ahora + self.intervalo
+        for clave in self.compartida.nuevas():
+            self._invalidar_local(int(clave))
+
+    def _invalidar_local(self, id_cliente):
+        with self._lock:
+            self._generacion += 1
+            self._cache.invalidar(id_cliente)
+
+    def obtener(self, id_cliente):
+        id_cliente = int(id_cliente)
+        memo = self._memo()
+        if memo is not None and id_cliente in memo:
+            with self._lock:
+                self._memo_aciertos += 1
+            cliente = memo[id_cliente]
+            return dict(cliente) if cliente is not None else None
+
+        self._aplicar_invalidaciones()
+        cliente = self._cache.obtener(id_cliente)
+        if cliente is None:
+            generacion = self._generacion
+            cliente = self.cargar(id_cliente)
+            # Un id inexistente no se guarda: puede crearse justo después. Si hubo
+            # una invalidación durante la carga, la fila leída puede ser la vieja
+            if cliente is not None:
+                with self._lock:
+                    if self._generacion == generacion:
+                        self._cache.guardar(id_cliente, cliente)
+        if memo is not None:
+            memo[id_cliente] = cliente
+        return dict(cliente) if cliente is not None else None
+
+    def invalidar(self, id_cliente):
+        id_cliente = int(id_cliente)
+        self._invalidar_local(id_cliente)
+        memo = self._memo()
+        if memo is not None:
+            memo.pop(id_cliente, None)
+        if self.compartida is not None:
+            self.compartida.publicar(id_cliente)
+
+    def estadisticas(self):
+        datos = self._cache.estadisticas()
+        with self._lock:
+            datos['memo_aciertos'] = self._memo_aciertos
+        return datos
+
+    def exportar_prometheus(self):
+        datos = self.estadisticas()
+        lineas = [
+            '# HELP cache_clientes_eventos_total Aciertos y fallos de la cache de clientes.',
+            '# TYPE cache_clientes_eventos_total counter',
+        ]
+        for evento in ('aciertos', 'fallos', 'memo_aciertos', 'expulsiones'):
+            lineas.append(f'cache_clientes_eventos_total{{evento="{evento}"}} {datos[evento]}')
+        lineas.append('# HELP cache_clientes_entradas Filas de clientes en la cache del proceso.')
+        lineas.append('# TYPE cache_clientes_entradas gauge')
+        lineas.append(f'cache_clientes_entradas {datos["entradas"]}')
+        return '\n'.join(lineas) + '\n'
+
+
+def crear_cache_clientes(cargar):
+    """Cache según el entorno: con CLIENTES_CACHE_COMPARTIDA las invalidaciones llegan a todos los workers"""
+    ruta = os.environ.get('CLIENTES_CACHE_COMPARTIDA')
+    return CacheClientes(cargar, compartida=InvalidacionesSQLite(ruta) if ruta else None)
@@ -0,0 +1,114 @@
+"""
+Carritos de compra guardados en el servidor.
+
+La cookie de sesión sólo lleva el id del carrito; las líneas se guardan
+aquí como pares (id_album, cantidad) y se resuelven contra el catálogo al
+mostrarlas. Hay dos almacenes intercambiables:
+
+- memoria: LRU con TTL, para desarrollo (cada proceso tiene el suyo)
+- sqlite: archivo local compartido por todos los workers de la máquina
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cache import CacheLRU
+
+TTL_CARRITO = int(os.environ.get('CARRITO_TTL', 24 * 3600))
+
+
+class AlmacenCarritoMemoria:
+
+    def __init__(self, max_carritos=10000, ttl=TTL_CARRITO):
+        self._cache = CacheLRU(max_entradas=max_carritos, ttl=ttl)
+
+    def obtener(self, id_carrito):
+        return list(self._cache.obtener(id_carrito, ()))
+
+    def guardar(self, id_carrito, lineas):
+        # Tupla inmutable: nadie modifica por accidente lo que está en la cache
+        self._cache.guardar(id_carrito, tuple((int(a), int(c)) for a, c in lineas))
+
+    def borrar(self, id_carrito):
+        self._cache.invalidar(id_carrito)
+
+
+class AlmacenCarritoSQLite:
+
+    def __init__(self, ruta, ttl=TTL_CARRITO):
+        self.ruta = ruta
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conexion = None
+        self._pid = None
+        self._conectar()
+
+    def _conectar(self):
+        """Una conexión por proceso: con preload de gunicorn el maestro la abre antes del fork"""
+        if self._pid == os.getpid():
+            return self._conexion
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False, isolation_level=None,
+                                         timeout=30)
+        self._pid = os.getpid()
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS carrito (
+                id_carrito TEXT PRIMARY KEY,
+                lineas TEXT NOT NULL,
+                vence REAL NOT NULL
+            )
+        """)
+        self._conexion.execute('CREATE INDEX IF NOT EXISTS idx_carrito_vence ON carrito (vence)')
+        return self._conexion
+
+    def obtener(self, id_carrito):
+        with self._lock:
+            fila = self._conectar().execute(
+                'SELECT lineas FROM carrito WHERE id_carrito = ? AND vence > ?',
+                (id_carrito, time.time())
+            ).fetchone()
+        return [tuple(linea) for linea in json.loads(fila[0])] if fila else []
+
+    def guardar(self, id_carrito, lineas):
+        datos = json.dumps([[int(a), int(c)] for a, c in lineas], separators=(',', ':'))
+        with self._lock:
+            self._conectar().execute(
+                'INSERT OR REPLACE INTO carrito (id_carrito, lineas, vence) VALUES (?, ?, ?)',
+                (id_carrito, datos, time.time() + self.ttl)
+            )
+
+    def borrar(self, id_carrito):
+        with self._lock:
+            self._conectar().execute('DELETE FROM carrito WHERE id_carrito = ?', (id_carrito,))
+
+    def purgar(self):
+        """Eliminar carritos vencidos"""
+        with self._lock:
+            self._conectar().execute('DELETE FROM carrito WHERE vence <= ?', (time.time(),))
+
+
+def crear_almacen():
+    """Almacén según CARRITO_ALMACEN (memoria | sqlite)"""
+    if os.environ.get('CARRITO_ALMACEN', 'memoria') == 'sqlite':
+        return AlmacenCarritoSQLite(os.environ.get('CARRITO_SQLITE_RUTA', 'carritos.db'))
+    return AlmacenCarritoMemoria()
+
+
+def sumar_linea(lineas, id_album, cantidad):
+    """Devolver las líneas con `cantidad` unidades más de `id_album`"""
+    nuevas = []
+    encontrada = False
+    for id_linea, cantidad_linea in lineas:
+        if id_linea == id_album:
+            cantidad_linea += cantidad
+            encontrada = True
+        nuevas.append((id_linea, cantidad_linea))
+    if not encontrada:
+        nuevas.append((id_album, cantidad))
+    return nuevas
+
+
+def quitar_linea(lineas, id_album):
+    return [(a, c) for a, c in lineas if a != id_album]
@@ -0,0 +1,127 @@
+"""
+Catálogo de álbumes cargado desde `tbalbum` e indexado en memoria.
+
+Las lecturas (por id, por artista, por tipo) no tocan la base de datos:
+consultan una instantánea inmutable que se reemplaza entera al recargar.
+La instantánea se recarga cuando vence su TTL o cuando cambia el número
+de versión de `tbcatalogo_version`, que se comprueba cada pocos segundos.
+Quien modifica nombres, artistas o precios en `tbalbum` sube la versión en
+la misma transacción:
+
+    UPDATE tbcatalogo_version SET version = version + 1 WHERE id = 1
+
+El stock no forma parte de la instantánea: cambia con cada compra y se lee
+siempre de la base, al reservar y al descontar (reservas.py).
+"""
+import threading
+import time
+
+SQL_CATALOGO = """
+    SELECT id_album, nombre, artista, tipo, precio
+    FROM tbalbum
+    ORDER BY id_album
+"""
+SQL_VERSION = "SELECT version FROM tbcatalogo_version WHERE id = 1"
+
+
+class _Instantanea:
+    __slots__ = ('albumes', 'por_id', 'por_artista', 'por_tipo', 'version', 'cargada')
+
+    def __init__(self, filas, version):
+        # Mismas claves que usaban las plantillas y el carrito ('id', 'precio' float)
+        self.albumes = tuple(
+            {'id': f['id_album'], 'nombre': f['nombre'], 'artista': f['artista'],
+             'tipo': f['tipo'], 'precio': float(f['precio'])}
+            for f in filas
+        )
+        self.por_id = {a['id']: a for a in self.albumes}
+        self.por_artista = {}
+        self.por_tipo = {}
+        for album in self.albumes:
+            self.por_artista.setdefault(album['artista'].lower(), []).append(album)
+            self.por_tipo.setdefault(album['tipo'].lower(), []).append(album)
+        self.version = version
+        self.cargada = time.monotonic()
+
+
+class CatalogoIndexado:
+
+    def __init__(self, ejecutar, ttl=300, intervalo_version=5, logger=None):
+        self.ejecutar = ejecutar
+        self.ttl = ttl
+        self.intervalo_version = intervalo_version
+        self.logger = logger
+        self._instantanea = None
+        self._ultima_verificacion = 0.0
+        self._lock = threading.Lock()
+
+    def _leer_version(self):
+        filas = self.ejecutar(SQL_VERSION)
+        return filas[0]['version'] if filas else 0
+
+    def _cargar(self):
+        version = self._leer_version()
+        self._instantanea = _Instantanea(self.ejecutar(SQL_CATALOGO), version)
+        self._ultima_verificacion = time.monotonic()
+        if self.logger:
+            self.logger.info(f"Catálogo cargado: {len(self._instantanea.albumes)} álbumes (versión {version})")
+
+    def _actual(self):
+        instantanea = self._instantanea
+        ahora = time.monotonic()
+        if instantanea is not None and ahora - self._ultima_verificacion < self.intervalo_version \
+                and ahora - instantanea.cargada < self.ttl:
+            return instantanea
+
+        # Sólo un hilo recarga; mientras tanto los demás siguen con la instantánea anterior
+        if not self._lock.acquire(blocking=False):
+            if instantanea is not None:
+                return instantanea
+            # Arranque en frío con otra carga en curso: se carga sin esperar el lock
+            # (en modo ASGI lo tiene otra petición del mismo hilo y esperarlo lo bloquearía)
+            self._cargar()
+            return self._instantanea
+        try:
+            instantanea = self._instantanea
+            ahora = time.monotonic()
+            if instantanea is None or ahora - instantanea.cargada >= self.ttl:
+                self._cargar()
+            elif ahora - self._ultima_verificacion >= self.intervalo_version:
+                self._ultima_verificacion = ahora
+                if self._leer_version() != instantanea.version:
+                    self._cargar()
+        except Exception as e:
+            if self._instantanea is None:
+                raise
+            # Si la base de datos falla se sigue sirviendo la última versión conocida
+            self._ultima_verificacion = time.monotonic()
+            if self.logger:
+                self.logger.error(f"No se pudo refrescar el catálogo: {e}")
+        finally:
+            self._lock.release()
+        return self._instantanea
+
+    def version(self):
+        return self._actual().version
+
+    def todos(self):
+        return self._actual().albumes
+
+    def obtener(self, id_album):
+        return self._actual().por_id.get(id_album)
+
+    def por_artista(self, artista):
+        return self._actual().por_artista.get(artista.lower(), [])
+
+    def por_tipo(self, tipo):
+        return self._actual().por_tipo.get(tipo.lower(), [])
+
+    def artistas(self):
+        return sorted({a['artista'] for a in self._actual().albumes})
+
+    def tipos(self):
+        return sorted({a['tipo'] for a in self._actual().albumes})
+
+    def invalidar(self):
+        """Forzar la recarga en la próxima lectura (sólo en este proceso)"""
+        self._instantanea = None
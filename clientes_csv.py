@@ -0,0 +1,275 @@
+"""
+Importación y exportación masiva de clientes en CSV.
+
+La importación lee el archivo fila por fila (nunca entero en memoria),
+valida cada fila igual que /insertar y trabaja por lotes: una consulta
+`nit IN (...)` para descartar los NIT que ya existen y un INSERT multi-fila
+por lote. Si un lote falla (p. ej. otro proceso insertó el mismo NIT
+entretanto) se reintenta fila por fila para saber qué línea falló.
+
+La exportación genera el CSV a medida que se leen las filas de la base.
+
+Desde la consola:
+
+    python clientes_csv.py importar clientes.csv
+    python clientes_csv.py exportar clientes > clientes.csv
+"""
+import csv
+import io
+import os
+from contextlib import contextmanager
+
+from busqueda import normalizar_nit
+from config.conexion import obtener_conexion, codigo_error, ER_DUP_ENTRY, ER_BAD_NULL_ERROR, ER_DATA_TOO_LONG
+from fragmentos import VersionClientes
+
+LOTE_IMPORTACION = int(os.environ.get('CSV_LOTE_IMPORTACION', 500))
+# Errores detallados que se devuelven como máximo (el total siempre se cuenta)
+MAX_ERRORES = 1000
+
+# Errores de la base que se explican al usuario en los formularios de clientes
+MENSAJES_ERROR_CLIENTE = {
+    ER_DUP_ENTRY: 'Ya existe un cliente con el NIT: {nit}',
+    ER_DATA_TOO_LONG: 'El nombre o el NIT es demasiado largo',
+    ER_BAD_NULL_ERROR: 'Nombre y NIT son obligatorios',
+}
+
+EXPORTACIONES = {
+    'clientes': (
+        ('id_cliente', 'nombre', 'nit'),
+        "SELECT id_cliente, nombre, nit FROM tbcliente ORDER BY id_cliente",
+    ),
+    'compras': (
+        ('id_compra', 'id_cliente', 'producto', 'cantidad', 'costo'),
+        "SELECT id_compra, id_cliente, producto, cantidad, costo FROM tbcompra ORDER BY id_compra",
+    ),
+}
+
+
+def validar_cliente(nombre, nit):
+    """Mensaje de error de validación, o None si el cliente es válido"""
+    if not nombre or not nit:
+        return 'Nombre y NIT son obligatorios'
+    if len(nombre) < 2:
+        return 'El nombre debe tener al menos 2 caracteres'
+    return None
+
+
+def mensaje_error_cliente(error, nit):
+    mensaje = MENSAJES_ERROR_CLIENTE.get(codigo_error(error))
+    return mensaje.format(nit=nit) if mensaje else None
+
+
+# ------------------ Importación ------------------
+
+def leer_filas(archivo):
+    """
+    Filas (línea, nombre, nit) de un CSV binario. Si la primera fila es una
+    cabecera con `nombre` y `nit` se usan esas columnas; si no, las dos primeras.
+    """
+    lector = csv.reader(io.TextIOWrapper(archivo, encoding='utf-8-sig', newline=''))
+    columnas = (0, 1)
+    for fila in lector:
+        if lector.line_num == 1:
+            cabecera = [c.strip().lower() for c in fila]
+            if 'nombre' in cabecera and 'nit' in cabecera:
+                columnas = (cabecera.index('nombre'), cabecera.index('nit'))
+                continue
+        if not any(c.strip() for c in fila):
+            continue
+        valores = [fila[i].strip() if i < len(fila) else '' for i in columnas]
+        yield lector.line_num, valores[0], valores[1]
+
+
+class Importacion:
+    """Estado de una importación: contadores y errores por línea"""
+
+    def __init__(self, transaccion, lote=LOTE_IMPORTACION, al_insertar=None, al_escribir=None):
+        self.transaccion = transaccion
+        self.lote = lote
+        # Recibe las filas insertadas (id_cliente, nombre, nit) de cada lote y lo que
+        # devolvió al_escribir en cada transacción confirmada
+        self.al_insertar = al_insertar
+        # Recibe el cursor dentro de cada transacción que inserta (p. ej. para subir la versión)
+        self.al_escribir = al_escribir
+        self.leidas = 0
+        self.insertados = 0
+        self.total_errores = 0
+        self.errores = []
+        self._nits_vistos = {}
+
+    def error(self, linea, nit, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({'linea': linea, 'nit': nit, 'error': mensaje})
+
+    def resultado(self):
+        return {
+            'leidas': self.leidas,
+            'insertados': self.insertados,
+            'total_errores': self.total_errores,
+            'errores': self.errores,
+        }
+
+    def importar(self, filas):
+        pendientes = []
+        for linea, nombre, nit in filas:
+            self.leidas += 1
+            # Como insertar(): "123.456" y "123456" son el mismo NIT
+            nit = normalizar_nit(nit)
+            problema = validar_cliente(nombre, nit)
+            if problema:
+                self.error(linea, nit, problema)
+                continue
+            if nit in self._nits_vistos:
+                self.error(linea, nit, f'NIT repetido en el archivo (línea {self._nits_vistos[nit]})')
+                continue
+            self._nits_vistos[nit] = linea
+            pendientes.append((linea, nombre, nit))
+            if len(pendientes) >= self.lote:
+                self._procesar_lote(pendientes)
+                pendientes = []
+        if pendientes:
+            self._procesar_lote(pendientes)
+        return self.resultado()
+
+    def _procesar_lote(self, pendientes):
+        marcadores = ', '.join(['%s'] * len(pendientes))
+        with self.transaccion() as cursor:
+            cursor.execute(
+                f"SELECT nit FROM tbcliente WHERE nit IN ({marcadores})",
+                [nit for _, _, nit in pendientes]
+            )
+            existentes = {fila['nit'] for fila in cursor.fetchall()}
+        nuevos = []
+        for linea, nombre, nit in pendientes:
+            if nit in existentes:
+                self.error(linea, nit, MENSAJES_ERROR_CLIENTE[ER_DUP_ENTRY].format(nit=nit))
+            else:
+                nuevos.append((linea, nombre, nit))
+        if not nuevos:
+            return
+
+        try:
+            with self.transaccion() as cursor:
+                valores = ', '.join(['(%s, %s)'] * len(nuevos))
+                parametros = [v for _, nombre, nit in nuevos for v in (nombre, nit)]
+                cursor.execute(f"INSERT INTO tbcliente (nombre, nit) VALUES {valores}", parametros)
+                insertadas = self._releer(cursor, nuevos)
+                marcas = [self._escrito(cursor)]
+        except Exception:
+            insertadas, marcas = self._insertar_fila_por_fila(nuevos)
+        self.insertados += len(insertadas)
+        if insertadas and self.al_insertar:
+            self.al_insertar(insertadas, marcas)
+
+    def _escrito(self, cursor):
+        return self.al_escribir(cursor) if self.al_escribir else None
+
+    def _releer(self, cursor, nuevos):
+        """Ids asignados (sólo si alguien los necesita, p. ej. el índice de autocompletar)"""
+        if not self.al_insertar:
+            return [(None, nombre, nit) for _, nombre, nit in nuevos]
+        marcadores = ', '.join(['%s'] * len(nuevos))
+        cursor.execute(
+            f"SELECT id_cliente, nombre, nit FROM tbcliente WHERE nit IN ({marcadores})",
+            [nit for _, _, nit in nuevos]
+        )
+        return [(f['id_cliente'], f['nombre'], f['nit']) for f in cursor.fetchall()]
+
+    def _insertar_fila_por_fila(self, nuevos):
+        insertadas, marcas = [], []
+        for linea, nombre, nit in nuevos:
+            try:
+                with self.transaccion() as cursor:
+                    cursor.execute("INSERT INTO tbcliente (nombre, nit) VALUES (%s, %s)", (nombre, nit))
+                    fila = (cursor.lastrowid, nombre, nit)
+                    marca = self._escrito(cursor)
+                insertadas.append(fila)
+                marcas.append(marca)
+            except Exception as e:
+                self.error(linea, nit, mensaje_error_cliente(e, nit) or str(e))
+        return insertadas, marcas
+
+
+def importar_clientes(archivo, transaccion, lote=LOTE_IMPORTACION, al_insertar=None, al_escribir=None):
+    """Importar un CSV (archivo binario) y devolver el resumen con los errores por línea"""
+    return Importacion(transaccion, lote, al_insertar, al_escribir).importar(leer_filas(archivo))
+
+
+# ------------------ Exportación ------------------
+
+def generar_csv(columnas, filas):
+    """Generador de trozos de texto CSV (con BOM para que Excel respete los acentos)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(columnas)
+    for i, fila in enumerate(filas, 1):
+        escritor.writerow([fila[c] for c in columnas])
+        if i % 500 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# ------------------ Consola ------------------
+
+@contextmanager
+def _transaccion():
+    with obtener_conexion() as conexion:
+        conexion.start_transaction()
+        try:
+            with conexion.cursor(dictionary=True) as cursor:
+                yield cursor
+            conexion.commit()
+        except Exception:
+            conexion.rollback()
+            raise
+
+
+def _iterar(query, lote=500):
+    with obtener_conexion() as conexion:
+        with conexion.cursor(dictionary=True) as cursor:
+            cursor.execute(query)
+            while True:
+                filas = cursor.fetchmany(lote)
+                if not filas:
+                    break
+                yield from filas
+
+
+def main():
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description='Importar o exportar clientes en CSV')
+    subparsers = parser.add_subparsers(dest='accion', required=True)
+    importar = subparsers.add_parser('importar')
+    importar.add_argument('archivo')
+    importar.add_argument('--lote', type=int, default=LOTE_IMPORTACION)
+    exportar = subparsers.add_parser('exportar')
+    exportar.add_argument('tabla', choices=sorted(EXPORTACIONES))
+    args = parser.parse_args()
+
+    if args.accion == 'importar':
+        # Como /importar: la versión sube en la transacción de cada lote, así los
+        # workers descartan el fragmento de "/" y rehacen el índice de autocompletar
+        version = VersionClientes(ejecutar=None)
+        with open(args.archivo, 'rb') as archivo:
+            resultado = importar_clientes(archivo, _transaccion, lote=args.lote,
+                                          al_escribir=version.incrementar)
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+        sys.exit(1 if resultado['total_errores'] else 0)
+
+    columnas, query = EXPORTACIONES[args.tabla]
+    salida = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='')
+    for trozo in generar_csv(columnas, _iterar(query)):
+        salida.write(trozo)
+    salida.flush()
+
+
+if __name__ == '__main__':
+    main()
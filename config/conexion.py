@@ -1,10 +1,313 @@
-import mysql.connector
-
-conexion=mysql.connector.connect(
-    host="bw6edd5vgbde6c1thfqc-mysql.services.clever-cloud.com",
-user="uhk2k7vwn1h9wkti",
-password="E6zMg7mODitydpDeRD27",
-database="bw6edd5vgbde6c1thfqc")
-
-if conexion.is_connected():
-    print("Conexion Exitosa")
\ No newline at end of file
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector.constants import ClientFlag
+
+logger = logging.getLogger(__name__)
+
+# 'mysql' (Clever Cloud) o 'sqlite' (sustituto local para pruebas y benchmarks)
+MOTOR = os.environ.get('DB_MOTOR', 'mysql')
+SQLITE_RUTA = os.environ.get('DB_SQLITE_RUTA', 'ventas_local.db')
+
+CONFIG_DB = {
+    'host': os.environ.get('DB_HOST', "bw6edd5vgbde6c1thfqc-mysql.services.clever-cloud.com"),
+    'user': os.environ.get('DB_USER', "uhk2k7vwn1h9wkti"),
+    'password': os.environ.get('DB_PASSWORD', "E6zMg7mODitydpDeRD27"),
+    'database': os.environ.get('DB_NAME', "bw6edd5vgbde6c1thfqc"),
+    'connection_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+}
+
+# Tamaño del pool y tiempos (segundos)
+TAMANO_POOL = int(os.environ.get('DB_POOL_SIZE', 5))
+ESPERA_MAXIMA = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+VERIFICAR_DESPUES = float(os.environ.get('DB_POOL_PING_AFTER', 30))
+# Conexiones a abrir en segundo plano al arrancar cada worker (0 = ninguna)
+CALENTAR_CONEXIONES = int(os.environ.get('DB_WARMUP', 0))
+
+# Códigos de error de MySQL que la aplicación interpreta
+ER_DUP_ENTRY = 1062
+ER_BAD_NULL_ERROR = 1048
+ER_DATA_TOO_LONG = 1406
+
+
+def codigo_error(error):
+    """errno de un error de mysql.connector (o del sustituto SQLite), o None"""
+    errno = getattr(error, 'errno', None)
+    if errno is None and type(error).__module__.startswith('pymysql') and error.args \
+            and isinstance(error.args[0], int):
+        # PyMySQL / aiomysql (modo ASGI) guardan el código en args[0]
+        return error.args[0]
+    return errno
+
+
+def es_duplicado(error):
+    """El error es una violación de clave única (PRIMARY KEY / UNIQUE)"""
+    return codigo_error(error) == ER_DUP_ENTRY
+
+
+def es_error_de_conexion(error):
+    """El error puede venir de una conexión caída (red, servidor, protocolo)"""
+    return isinstance(error, (mysql.connector.errors.InterfaceError,
+                              mysql.connector.errors.OperationalError, OSError))
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de espera"""
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones seguro entre hilos.
+    Cada petición toma una conexión, la usa y la devuelve al pool.
+    """
+
+    def __init__(self, crear_conexion, tamano=TAMANO_POOL, espera_maxima=ESPERA_MAXIMA,
+                 verificar_despues=VERIFICAR_DESPUES):
+        self.crear_conexion = crear_conexion
+        self.tamano = tamano
+        self.espera_maxima = espera_maxima
+        self.verificar_despues = verificar_despues
+        # LIFO (una lista): se reutilizan primero las conexiones más recientes (las más "calientes")
+        self._reiniciar_estado()
+
+    def _reiniciar_estado(self):
+        self._libres = []
+        self._creadas = 0
+        self._lock = threading.Lock()
+        # Se avisa al devolver una conexión y al descartarla (queda un cupo para crear otra)
+        self._disponible = threading.Condition(self._lock)
+        self._metricas = {
+            'prestamos': 0,
+            'esperas': 0,
+            'tiempo_espera_total': 0.0,
+            'tiempo_espera_max': 0.0,
+            'agotado': 0,
+            'verificaciones': 0,
+            'reconexiones': 0,
+            'descartadas': 0,
+        }
+
+    def _nueva_conexion(self):
+        conexion = self.crear_conexion()
+        return [conexion, time.monotonic()]
+
+    def _liberar_cupo(self):
+        with self._disponible:
+            self._creadas -= 1
+            self._disponible.notify()
+
+    def _tomar_libre(self, espera_maxima):
+        """Obtener una conexión libre, crear una nueva o esperar a que se devuelva o descarte una"""
+        limite = time.monotonic() + espera_maxima
+        espero = False
+        with self._disponible:
+            while True:
+                if self._libres:
+                    return self._libres.pop(), espero
+                if self._creadas < self.tamano:
+                    self._creadas += 1
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._metricas['agotado'] += 1
+                    raise PoolAgotado(
+                        f'Sin conexiones libres tras {espera_maxima}s (tamaño {self.tamano})'
+                    )
+                espero = True
+                self._disponible.wait(restante)
+        try:
+            return self._nueva_conexion(), espero
+        except Exception:
+            self._liberar_cupo()
+            raise
+
+    def _verificar(self, entrada):
+        """Hacer ping a conexiones que llevan tiempo inactivas y reconectar si están caídas"""
+        conexion, ultimo_uso = entrada
+        if time.monotonic() - ultimo_uso < self.verificar_despues:
+            return conexion
+        with self._lock:
+            self._metricas['verificaciones'] += 1
+        try:
+            conexion.ping(reconnect=True, attempts=2, delay=0)
+        except Exception as e:
+            logger.warning(f"Conexión inactiva descartada: {e}")
+            self._cerrar(conexion)
+            conexion = self.crear_conexion()
+            with self._lock:
+                self._metricas['reconexiones'] += 1
+        return conexion
+
+    def _cerrar(self, conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def tomar(self, espera_maxima=None):
+        if espera_maxima is None:
+            espera_maxima = self.espera_maxima
+        inicio = time.perf_counter()
+        entrada, espero = self._tomar_libre(espera_maxima)
+        try:
+            conexion = self._verificar(entrada)
+        except Exception:
+            self._liberar_cupo()
+            raise
+        espera = time.perf_counter() - inicio
+        with self._lock:
+            self._metricas['prestamos'] += 1
+            self._metricas['tiempo_espera_total'] += espera
+            if espera > self._metricas['tiempo_espera_max']:
+                self._metricas['tiempo_espera_max'] = espera
+            if espero:
+                self._metricas['esperas'] += 1
+        return conexion, espera
+
+    def devolver(self, conexion, descartar=False):
+        if descartar:
+            self._cerrar(conexion)
+            with self._disponible:
+                self._creadas -= 1
+                self._metricas['descartadas'] += 1
+                self._disponible.notify()
+            return
+        with self._disponible:
+            self._libres.append([conexion, time.monotonic()])
+            self._disponible.notify()
+
+    @contextmanager
+    def conexion(self, espera_maxima=None):
+        """Prestar una conexión durante un bloque `with`"""
+        conexion, _ = self.tomar(espera_maxima)
+        descartar = False
+        try:
+            yield conexion
+        except Exception as e:
+            # Una conexión rota no debe volver al pool; los errores de datos
+            # (duplicados, validaciones) no la dañan y no cuestan un chequeo
+            if es_error_de_conexion(e):
+                try:
+                    descartar = not conexion.is_connected()
+                except Exception:
+                    descartar = True
+            raise
+        finally:
+            self.devolver(conexion, descartar=descartar)
+
+    def metricas(self):
+        with self._lock:
+            datos = dict(self._metricas)
+            datos['creadas'] = self._creadas
+            datos['libres'] = len(self._libres)
+        datos['en_uso'] = datos['creadas'] - datos['libres']
+        datos['tamano'] = self.tamano
+        return datos
+
+    def calentar(self, cantidad):
+        """Abrir por adelantado hasta `cantidad` conexiones y dejarlas libres"""
+        prestadas = []
+        try:
+            for _ in range(min(cantidad, self.tamano)):
+                prestadas.append(self.tomar()[0])
+        finally:
+            for conexion in prestadas:
+                self.devolver(conexion)
+        return len(prestadas)
+
+    def reiniciar_tras_fork(self):
+        """
+        Olvidar las conexiones heredadas del proceso padre sin cerrarlas:
+        el socket es compartido y cerrarlo aquí cortaría la conexión del padre.
+        """
+        self._reiniciar_estado()
+
+    def cerrar_todas(self):
+        with self._disponible:
+            libres, self._libres = self._libres, []
+            self._creadas -= len(libres)
+            self._disponible.notify_all()
+        for conexion, _ in libres:
+            self._cerrar(conexion)
+
+
+def crear_conexion_mysql():
+    # autocommit: las lecturas no dejan transacciones (ni snapshots) abiertas en el pool
+    # consume_results: un cursor sin buffer abandonado a medias no bloquea la conexión
+    # FOUND_ROWS: rowcount de un UPDATE cuenta las filas encontradas, aunque no cambien
+    return mysql.connector.connect(autocommit=True, consume_results=True,
+                                   client_flags=[ClientFlag.FOUND_ROWS], **CONFIG_DB)
+
+
+def crear_conexion_sqlite():
+    from config import sqlite_local
+    return sqlite_local.conectar(SQLITE_RUTA)
+
+
+# Las conexiones se abren al primer uso: importar este módulo no toca la red
+pool = PoolConexiones(crear_conexion_sqlite if MOTOR == 'sqlite' else crear_conexion_mysql)
+
+
+def usar_pool_async():
+    """
+    Modo ASGI (asgi.py): el mismo pool, pero asíncrono y esperado desde el
+    greenlet de cada petición. Se llama antes de importar app. No es una
+    variable de entorno porque la heredarían los procesos hijos (reportes
+    masivos), que no tienen bucle y necesitan el pool síncrono.
+    """
+    global pool
+    from config.conexion_async import crear_pool_puente
+    pool = crear_pool_puente()
+    return pool
+
+
+def obtener_conexion():
+    """Prestar una conexión del pool: `with obtener_conexion() as conexion:`"""
+    return pool.conexion()
+
+
+def calentar_pool(cantidad=None):
+    """Abrir conexiones por adelantado; los errores se registran, no se propagan"""
+    cantidad = CALENTAR_CONEXIONES if cantidad is None else cantidad
+    if cantidad <= 0:
+        return 0
+    try:
+        abiertas = pool.calentar(cantidad)
+        logger.info(f"Pool calentado con {abiertas} conexiones")
+        return abiertas
+    except Exception as e:
+        logger.warning(f"No se pudo calentar el pool: {e}")
+        return 0
+
+
+def calentar_en_segundo_plano(cantidad=None):
+    """Hook para después del fork: calienta el pool sin bloquear el arranque"""
+    hilo = threading.Thread(target=calentar_pool, args=(cantidad,), daemon=True)
+    hilo.start()
+    return hilo
+
+
+def verificar_db(espera_maxima=2):
+    """Comprobar que la base de datos responde. Devuelve (ok, detalle)"""
+    try:
+        with pool.conexion(espera_maxima=espera_maxima) as conexion:
+            with conexion.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchall()
+        return True, 'ok'
+    except Exception as e:
+        return False, str(e)
+
+
+def _despues_del_fork():
+    pool.reiniciar_tras_fork()
+    if CALENTAR_CONEXIONES > 0:
+        calentar_en_segundo_plano()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_despues_del_fork)
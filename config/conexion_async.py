@@ -0,0 +1,487 @@
+"""
+Conexiones asíncronas para el modo ASGI (asgi.py).
+
+En modo ASGI las vistas de app.py siguen siendo síncronas, pero cada
+petición corre en su propio greenlet sobre el bucle de asyncio. Cuando una
+vista espera a la base de datos, `esperar()` cede el greenlet al bucle hasta
+que termina la corrutina del driver: un solo hilo puede tener cientos de
+peticiones esperando a MySQL a la vez (la misma técnica que usa SQLAlchemy
+para su modo asyncio).
+
+`PoolPuente` tiene la interfaz de PoolConexiones (conexion(), metricas(),
+calentar()...) sobre `PoolAsync`, con conexiones de aiomysql o del
+sustituto SQLite. En el sustituto, la latencia simulada se espera en el
+bucle; BEGIN y las escrituras fuera de una transacción, que pueden esperar
+el lock de escritura de SQLite, corren en un hilo aparte, y el resto
+(lecturas en WAL, sentencias de una transacción propia) en el mismo bucle.
+Los hilos que no son del bucle (índice de autocompletar, reportes masivos)
+envían sus consultas al bucle y esperan el resultado.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+import greenlet
+
+from config.conexion import (CONFIG_DB, ESPERA_MAXIMA, MOTOR, SQLITE_RUTA, VERIFICAR_DESPUES,
+                             PoolAgotado)
+
+logger = logging.getLogger(__name__)
+
+# Con el bucle, las conexiones (y no los hilos) limitan cuántas consultas hay en vuelo
+TAMANO_POOL_ASYNC = int(os.environ.get('DB_ASYNC_POOL_SIZE', 50))
+
+
+# ------------------ Greenlets ------------------
+
+class _GreenletPeticion(greenlet.greenlet):
+    """Greenlet de una petición; su padre es el del bucle de asyncio"""
+
+
+_bucle = None
+
+
+def fijar_bucle(bucle):
+    """Bucle al que los otros hilos envían sus consultas"""
+    global _bucle
+    _bucle = bucle
+
+
+def esperar(corrutina):
+    """Resultado de `corrutina` desde código síncrono"""
+    actual = greenlet.getcurrent()
+    if isinstance(actual, _GreenletPeticion):
+        return actual.parent.switch(corrutina)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        if _bucle is not None and _bucle.is_running():
+            return asyncio.run_coroutine_threadsafe(corrutina, _bucle).result()
+    corrutina.close()
+    raise RuntimeError('Consulta a la base de datos fuera de una petición ASGI')
+
+
+async def en_greenlet(funcion, *args):
+    """Ejecutar `funcion(*args)`, síncrona, atendiendo las corrutinas que pase a esperar()"""
+    hijo = _GreenletPeticion(funcion, greenlet.getcurrent())
+    resultado = hijo.switch(*args)
+    while not hijo.dead:
+        try:
+            valor = await resultado
+        except BaseException:
+            resultado = hijo.throw(*sys.exc_info())
+        else:
+            resultado = hijo.switch(valor)
+    return resultado
+
+
+async def _en_ejecutor(funcion, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, partial(funcion, *args))
+
+
+def fuera_del_bucle(funcion, *args):
+    """
+    `funcion(*args)` para trabajo de CPU que suelta el GIL (scrypt): desde el
+    greenlet de una petición corre en un hilo del ejecutor del bucle y el
+    bucle sigue atendiendo a las demás; fuera de una petición, aquí mismo
+    """
+    if isinstance(greenlet.getcurrent(), _GreenletPeticion):
+        return esperar(_en_ejecutor(funcion, *args))
+    return funcion(*args)
+
+
+# ------------------ Conexiones ------------------
+
+class ConexionMySQLAsync:
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+
+    async def cursor(self, dictionary=False, buffered=None):
+        import aiomysql
+
+        # Como en mysql.connector: buffered=False lee del servidor a medida que se consume
+        if buffered is False:
+            clase = aiomysql.SSDictCursor if dictionary else aiomysql.SSCursor
+        else:
+            clase = aiomysql.DictCursor if dictionary else aiomysql.Cursor
+        return await self._conexion.cursor(clase)
+
+    async def begin(self):
+        await self._conexion.begin()
+
+    async def commit(self):
+        await self._conexion.commit()
+
+    async def rollback(self):
+        await self._conexion.rollback()
+
+    async def ping(self):
+        await self._conexion.ping(reconnect=False)
+
+    @property
+    def abierta(self):
+        return not self._conexion.closed
+
+    async def cerrar(self):
+        self._conexion.close()
+
+
+_hilos_sqlite = None
+
+
+def _ejecutor_sqlite():
+    # Un hilo por conexión posible: una sentencia que espera el lock de SQLite no frena a las demás
+    global _hilos_sqlite
+    if _hilos_sqlite is None:
+        _hilos_sqlite = ThreadPoolExecutor(max_workers=TAMANO_POOL_ASYNC,
+                                           thread_name_prefix='sqlite-async')
+    return _hilos_sqlite
+
+
+async def _en_hilo(funcion, *args):
+    return await asyncio.get_running_loop().run_in_executor(_ejecutor_sqlite(),
+                                                            partial(funcion, *args))
+
+
+class _CursorSQLiteAsync:
+
+    def __init__(self, conexion, cursor):
+        self._conexion = conexion
+        self._cursor = cursor
+
+    async def execute(self, query, params=None):
+        await self._conexion.viaje()
+        if self._conexion.puede_bloquear(query):
+            await _en_hilo(self._cursor.execute, query, params)
+        else:
+            self._cursor.execute(query, params)
+
+    async def executemany(self, query, filas):
+        await self._conexion.viaje()
+        if self._conexion.puede_bloquear(query):
+            await _en_hilo(self._cursor.executemany, query, filas)
+        else:
+            self._cursor.executemany(query, filas)
+
+    async def fetchone(self):
+        return self._cursor.fetchone()
+
+    async def fetchmany(self, cantidad=1):
+        return self._cursor.fetchmany(cantidad)
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    async def close(self):
+        self._cursor.close()
+
+
+class ConexionSQLiteAsync:
+
+    def __init__(self, conexion, latencia):
+        # `conexion` es una ConexionSQLite sin latencia propia: aquí se espera en el bucle
+        self._conexion = conexion
+        self.latencia = latencia
+
+    async def viaje(self):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+    def puede_bloquear(self, query):
+        # Dentro de una transacción propia (BEGIN IMMEDIATE) el lock de escritura ya es nuestro
+        return not self._conexion.en_transaccion() and \
+            not query.lstrip().upper().startswith('SELECT')
+
+    async def cursor(self, dictionary=False, buffered=None):
+        return _CursorSQLiteAsync(self, self._conexion.cursor(dictionary=dictionary))
+
+    async def begin(self):
+        await self.viaje()
+        await _en_hilo(self._conexion.start_transaction)
+
+    async def commit(self):
+        if self._conexion.en_transaccion():
+            await self.viaje()
+        self._conexion.commit()
+
+    async def rollback(self):
+        self._conexion.rollback()
+
+    async def ping(self):
+        self._conexion.ping()
+
+    @property
+    def abierta(self):
+        return self._conexion.is_connected()
+
+    async def cerrar(self):
+        await _en_hilo(self._conexion.close)
+
+
+async def crear_conexion_mysql_async():
+    import aiomysql
+    from pymysql.constants import CLIENT
+
+    # Mismas opciones que crear_conexion_mysql: autocommit y rowcount de filas encontradas
+    conexion = await aiomysql.connect(
+        host=CONFIG_DB['host'], user=CONFIG_DB['user'], password=CONFIG_DB['password'],
+        db=CONFIG_DB['database'], connect_timeout=CONFIG_DB['connection_timeout'],
+        charset='utf8mb4', autocommit=True, client_flag=CLIENT.FOUND_ROWS
+    )
+    return ConexionMySQLAsync(conexion)
+
+
+async def crear_conexion_sqlite_async():
+    from config import sqlite_local
+
+    conexion = await _en_hilo(sqlite_local.conectar, SQLITE_RUTA, 0)
+    return ConexionSQLiteAsync(conexion, sqlite_local.LATENCIA)
+
+
+# ------------------ Pool ------------------
+
+class PoolAsync:
+    """Pool de conexiones para un bucle de asyncio (no se comparte entre hilos)"""
+
+    def __init__(self, crear_conexion, tamano=TAMANO_POOL_ASYNC, espera_maxima=ESPERA_MAXIMA,
+                 verificar_despues=VERIFICAR_DESPUES):
+        self.crear_conexion = crear_conexion
+        self.tamano = tamano
+        self.espera_maxima = espera_maxima
+        self.verificar_despues = verificar_despues
+        self._reiniciar_estado()
+
+    def _reiniciar_estado(self):
+        # LIFO, como PoolConexiones; el semáforo cuenta las conexiones prestadas
+        self._libres = []
+        self._cupos = asyncio.Semaphore(self.tamano)
+        self._creadas = 0
+        self._metricas = {
+            'prestamos': 0,
+            'esperas': 0,
+            'tiempo_espera_total': 0.0,
+            'tiempo_espera_max': 0.0,
+            'agotado': 0,
+            'verificaciones': 0,
+            'reconexiones': 0,
+            'descartadas': 0,
+        }
+
+    async def _nueva(self):
+        self._creadas += 1
+        try:
+            return await self.crear_conexion()
+        except BaseException:
+            self._creadas -= 1
+            raise
+
+    async def _cerrar(self, conexion):
+        try:
+            await conexion.cerrar()
+        except Exception:
+            pass
+
+    async def _verificar(self, entrada):
+        conexion, ultimo_uso = entrada
+        if time.monotonic() - ultimo_uso < self.verificar_despues:
+            return conexion
+        self._metricas['verificaciones'] += 1
+        try:
+            await conexion.ping()
+            return conexion
+        except Exception as e:
+            logger.warning(f"Conexión inactiva descartada: {e}")
+            await self._cerrar(conexion)
+            self._creadas -= 1
+            self._metricas['reconexiones'] += 1
+            return await self._nueva()
+
+    async def tomar(self, espera_maxima=None):
+        if espera_maxima is None:
+            espera_maxima = self.espera_maxima
+        inicio = time.perf_counter()
+        espero = self._cupos.locked()
+        try:
+            await asyncio.wait_for(self._cupos.acquire(), espera_maxima)
+        except asyncio.TimeoutError:
+            self._metricas['agotado'] += 1
+            raise PoolAgotado(
+                f'Sin conexiones libres tras {espera_maxima}s (tamaño {self.tamano})'
+            )
+        try:
+            conexion = await self._verificar(self._libres.pop()) if self._libres else await self._nueva()
+        except BaseException:
+            self._cupos.release()
+            raise
+        espera = time.perf_counter() - inicio
+        self._metricas['prestamos'] += 1
+        self._metricas['tiempo_espera_total'] += espera
+        if espera > self._metricas['tiempo_espera_max']:
+            self._metricas['tiempo_espera_max'] = espera
+        if espero:
+            self._metricas['esperas'] += 1
+        return conexion, espera
+
+    async def devolver(self, conexion, descartar=False):
+        try:
+            if descartar:
+                await self._cerrar(conexion)
+                self._creadas -= 1
+                self._metricas['descartadas'] += 1
+            else:
+                self._libres.append([conexion, time.monotonic()])
+        finally:
+            self._cupos.release()
+
+    async def calentar(self, cantidad):
+        prestadas = []
+        try:
+            for _ in range(min(cantidad, self.tamano)):
+                prestadas.append((await self.tomar())[0])
+        finally:
+            for conexion in prestadas:
+                await self.devolver(conexion)
+        return len(prestadas)
+
+    async def cerrar_todas(self):
+        while self._libres:
+            conexion, _ = self._libres.pop()
+            await self._cerrar(conexion)
+            self._creadas -= 1
+
+    def metricas(self):
+        datos = dict(self._metricas)
+        datos['creadas'] = self._creadas
+        datos['libres'] = len(self._libres)
+        datos['en_uso'] = datos['creadas'] - datos['libres']
+        datos['tamano'] = self.tamano
+        return datos
+
+
+# ------------------ Interfaz síncrona ------------------
+
+class CursorPuente:
+    """Cursor con la interfaz de mysql.connector que espera al driver asíncrono"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def execute(self, query, params=()):
+        # Sin parámetros no se interpola: un '%' literal en la consulta no es un marcador
+        esperar(self._cursor.execute(query, tuple(params) if params else None))
+
+    def executemany(self, query, filas):
+        esperar(self._cursor.executemany(query, [tuple(f) for f in filas]))
+
+    def fetchone(self):
+        return esperar(self._cursor.fetchone())
+
+    def fetchmany(self, cantidad=1):
+        return esperar(self._cursor.fetchmany(cantidad))
+
+    def fetchall(self):
+        return esperar(self._cursor.fetchall())
+
+    def __iter__(self):
+        while True:
+            fila = self.fetchone()
+            if fila is None:
+                return
+            yield fila
+
+    @property
+    def rowcount(self):
+        # Con cursores sin buffer PyMySQL informa 2**64 - 1 hasta leer todo
+        filas = self._cursor.rowcount
+        return -1 if filas is None or filas >= 2 ** 63 else filas
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        esperar(self._cursor.close())
+
+
+class ConexionPuente:
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+
+    def cursor(self, dictionary=False, buffered=None):
+        return CursorPuente(esperar(self._conexion.cursor(dictionary, buffered)))
+
+    def start_transaction(self):
+        esperar(self._conexion.begin())
+
+    def commit(self):
+        esperar(self._conexion.commit())
+
+    def rollback(self):
+        esperar(self._conexion.rollback())
+
+    def is_connected(self):
+        return self._conexion.abierta
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        esperar(self._conexion.ping())
+
+
+class PoolPuente:
+    """PoolConexiones para el modo ASGI: misma interfaz, conexiones asíncronas"""
+
+    def __init__(self, pool_async):
+        self.pool_async = pool_async
+
+    @property
+    def tamano(self):
+        return self.pool_async.tamano
+
+    @contextmanager
+    def conexion(self, espera_maxima=None):
+        conexion, _ = esperar(self.pool_async.tomar(espera_maxima))
+        descartar = False
+        try:
+            yield ConexionPuente(conexion)
+        except Exception:
+            descartar = not conexion.abierta
+            raise
+        finally:
+            esperar(self.pool_async.devolver(conexion, descartar))
+
+    def metricas(self):
+        return self.pool_async.metricas()
+
+    def calentar(self, cantidad):
+        return esperar(self.pool_async.calentar(cantidad))
+
+    def reiniciar_tras_fork(self):
+        self.pool_async._reiniciar_estado()
+
+    def cerrar_todas(self):
+        esperar(self.pool_async.cerrar_todas())
+
+
+def crear_pool_puente():
+    crear = crear_conexion_sqlite_async if MOTOR == 'sqlite' else crear_conexion_mysql_async
+    return PoolPuente(PoolAsync(crear))
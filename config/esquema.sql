@@ -0,0 +1,92 @@
+-- Esquema e índices de apoyo para las consultas de app.py.
+-- Se aplica a mano sobre la base existente (tbcliente, tbcompra).
+
+-- Listado paginado de clientes: ORDER BY nombre, id_cliente + búsqueda por clave
+CREATE INDEX idx_cliente_nombre_id ON tbcliente (nombre, id_cliente);
+
+-- Búsqueda (busqueda.py): NIT exacto/prefijo y FULLTEXT sobre el nombre.
+-- El NIT es único: insertar y actualizar_cliente dependen del error 1062.
+-- En una base que ya tenía idx_cliente_nit, antes de crearlo:
+--   SELECT nit, COUNT(*) FROM tbcliente GROUP BY nit HAVING COUNT(*) > 1;  -- debe salir vacío
+--   DROP INDEX idx_cliente_nit ON tbcliente;
+-- Los NIT se guardan sin puntos ni espacios (busqueda.normalizar_nit); los ya existentes:
+--   UPDATE tbcliente SET nit = REPLACE(REPLACE(nit, '.', ''), ' ', '');
+CREATE UNIQUE INDEX uq_cliente_nit ON tbcliente (nit);
+CREATE FULLTEXT INDEX ft_cliente_nombre ON tbcliente (nombre);
+
+-- Compras (finalizar_compra): token de idempotencia por pedido
+CREATE TABLE IF NOT EXISTS tbpedido (
+    token VARCHAR(64) PRIMARY KEY,
+    id_cliente INT NOT NULL,
+    creado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Catálogo de álbumes (catalogo.py) y stock que se descuenta al confirmar la compra
+CREATE TABLE IF NOT EXISTS tbalbum (
+    id_album INT PRIMARY KEY,
+    nombre VARCHAR(150) NOT NULL,
+    artista VARCHAR(100) NOT NULL,
+    tipo VARCHAR(20) NOT NULL,
+    precio DECIMAL(10, 2) NOT NULL,
+    stock INT NOT NULL DEFAULT 0,
+    CHECK (stock >= 0),
+    INDEX idx_album_artista (artista),
+    INDEX idx_album_tipo (tipo)
+);
+
+INSERT IGNORE INTO tbalbum (id_album, nombre, artista, tipo, precio, stock) VALUES
+    (1, 'Álbum: HAUTE COUTURE', 'MiSaMo', 'Álbum', 30.00, 10),
+    (2, 'Song: Baby Good Night', 'GD&TOP', 'Song', 14.99, 5),
+    (3, 'Álbum: Formula of Love', 'TWICE', 'Álbum', 25.00, 8),
+    (4, 'Song: Dynamite', 'BTS', 'Song', 12.99, 15),
+    (5, 'Álbum: The Album', 'BLACKPINK', 'Álbum', 28.00, 7),
+    (6, 'Song: FXXk IT', 'BIGBANG', 'Song', 20.00, 10),
+    (7, 'Song: LETS NOT FALL IN LOVE', 'BIGBANG', 'Song', 20.00, 2);
+
+-- Se incrementa al modificar nombres o precios de tbalbum (no con el stock, que cambia
+-- en cada compra); cada proceso recarga su índice del catálogo (catalogo.py)
+CREATE TABLE IF NOT EXISTS tbcatalogo_version (
+    id TINYINT PRIMARY KEY,
+    version INT NOT NULL
+);
+INSERT IGNORE INTO tbcatalogo_version (id, version) VALUES (1, 1);
+
+-- Se incrementa al modificar tbcliente; forma parte de la clave de los fragmentos
+-- HTML cacheados y del ETag de la lista de clientes (fragmentos.py)
+CREATE TABLE IF NOT EXISTS tbcliente_version (
+    id TINYINT PRIMARY KEY,
+    version INT NOT NULL
+);
+INSERT IGNORE INTO tbcliente_version (id, version) VALUES (1, 1);
+
+-- Reservas de stock de los carritos (reservas.py); vence en segundos epoch
+CREATE TABLE IF NOT EXISTS tbreserva (
+    id_carrito VARCHAR(32) NOT NULL,
+    id_album INT NOT NULL,
+    cantidad INT NOT NULL,
+    vence DOUBLE NOT NULL,
+    PRIMARY KEY (id_carrito, id_album),
+    INDEX idx_reserva_album_vence (id_album, vence)
+);
+
+-- Usuarios de la aplicación (usuarios.py): clave como hash scrypt
+CREATE TABLE IF NOT EXISTS tbusuario (
+    id_usuario INT AUTO_INCREMENT PRIMARY KEY,
+    usuario VARCHAR(50) NOT NULL,
+    clave_hash VARCHAR(255) NOT NULL,
+    rol VARCHAR(20) NOT NULL,
+    creado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE INDEX uq_usuario (usuario),
+    CHECK (rol IN ('cantante', 'productor', 'comprador', 'administrador'))
+);
+
+-- Se incrementa al cambiar el rol de un usuario; las sesiones con otra versión
+-- vuelven a leer su rol (permisos.py)
+CREATE TABLE IF NOT EXISTS tbusuario_version (
+    id TINYINT PRIMARY KEY,
+    version INT NOT NULL
+);
+INSERT IGNORE INTO tbusuario_version (id, version) VALUES (1, 1);
+
+-- Compras de un cliente (vercompras, reportes): filtro por cliente + orden por id_compra
+CREATE INDEX idx_compra_cliente_id ON tbcompra (id_cliente, id_compra);
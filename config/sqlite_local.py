@@ -0,0 +1,265 @@
+"""
+Sustituto local de MySQL sobre SQLite, para pruebas y benchmarks sin red.
+
+Imita la parte de mysql.connector que usa la aplicación: cursores con
+`dictionary=True`, marcadores `%s`, `start_transaction`, `ping`,
+`is_connected`, `lastrowid`/`rowcount` y el errno 1062 en claves duplicadas.
+`MATCH(col) AGAINST (%s IN BOOLEAN MODE)` se resuelve con una función de
+Python que recorre la tabla: sirve para probar, no para medir FULLTEXT.
+Se activa con DB_MOTOR=sqlite (y DB_SQLITE_RUTA para el archivo).
+DB_SQLITE_LATENCIA_MS simula la ida y vuelta por la red de cada sentencia.
+"""
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+
+LATENCIA = float(os.environ.get('DB_SQLITE_LATENCIA_MS', 0)) / 1000
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tbcliente (
+    id_cliente INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL COLLATE NOCASE,
+    nit TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cliente_nombre_id ON tbcliente (nombre, id_cliente);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_cliente_nit ON tbcliente (nit);
+
+CREATE TABLE IF NOT EXISTS tbcompra (
+    id_compra INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_cliente INTEGER NOT NULL,
+    producto TEXT NOT NULL,
+    cantidad INTEGER NOT NULL,
+    costo NUMERIC NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_compra_cliente_id ON tbcompra (id_cliente, id_compra);
+
+CREATE TABLE IF NOT EXISTS tbpedido (
+    token TEXT PRIMARY KEY,
+    id_cliente INTEGER NOT NULL,
+    creado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS tbalbum (
+    id_album INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    artista TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    precio NUMERIC NOT NULL,
+    stock INTEGER NOT NULL DEFAULT 0 CHECK (stock >= 0)
+);
+
+INSERT OR IGNORE INTO tbalbum (id_album, nombre, artista, tipo, precio, stock) VALUES
+    (1, 'Álbum: HAUTE COUTURE', 'MiSaMo', 'Álbum', 30.00, 10),
+    (2, 'Song: Baby Good Night', 'GD&TOP', 'Song', 14.99, 5),
+    (3, 'Álbum: Formula of Love', 'TWICE', 'Álbum', 25.00, 8),
+    (4, 'Song: Dynamite', 'BTS', 'Song', 12.99, 15),
+    (5, 'Álbum: The Album', 'BLACKPINK', 'Álbum', 28.00, 7),
+    (6, 'Song: FXXk IT', 'BIGBANG', 'Song', 20.00, 10),
+    (7, 'Song: LETS NOT FALL IN LOVE', 'BIGBANG', 'Song', 20.00, 2);
+
+CREATE TABLE IF NOT EXISTS tbcatalogo_version (
+    id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO tbcatalogo_version (id, version) VALUES (1, 1);
+
+CREATE TABLE IF NOT EXISTS tbcliente_version (
+    id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO tbcliente_version (id, version) VALUES (1, 1);
+
+CREATE TABLE IF NOT EXISTS tbreserva (
+    id_carrito TEXT NOT NULL,
+    id_album INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL,
+    vence REAL NOT NULL,
+    PRIMARY KEY (id_carrito, id_album)
+);
+CREATE INDEX IF NOT EXISTS idx_reserva_album_vence ON tbreserva (id_album, vence);
+
+CREATE TABLE IF NOT EXISTS tbusuario (
+    id_usuario INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario TEXT NOT NULL UNIQUE,
+    clave_hash TEXT NOT NULL,
+    rol TEXT NOT NULL,
+    creado TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS tbusuario_version (
+    id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO tbusuario_version (id, version) VALUES (1, 1);
+"""
+
+# Diferencias de dialecto que aparecen en las consultas de la aplicación
+_TRADUCCIONES = [
+    (re.compile(r'CAST\(([\w.]+) AS DECIMAL\(\d+, ?\d+\)\)', re.I), r'\1'),
+    # BEGIN IMMEDIATE ya bloquea la base entera para escribir
+    (re.compile(r'\s+FOR UPDATE\b', re.I), ''),
+    (re.compile(r'MATCH\((\w+)\) AGAINST \((%s) IN BOOLEAN MODE\)', re.I), r'coincide_fulltext(\1, \2)'),
+    # En MySQL la barra invertida ya escapa los comodines de LIKE; en SQLite hay que pedirlo
+    (re.compile(r'\bLIKE %s', re.I), r"LIKE %s ESCAPE '\\'"),
+]
+
+
+def traducir(query):
+    for patron, reemplazo in _TRADUCCIONES:
+        query = patron.sub(reemplazo, query)
+    return query.replace('%s', '?')
+
+
+def _sin_acentos(texto):
+    return ''.join(c for c in unicodedata.normalize('NFD', texto.casefold())
+                   if unicodedata.category(c) != 'Mn')
+
+
+def coincide_fulltext(texto, expresion):
+    """
+    Subconjunto del modo booleano de FULLTEXT que genera busqueda.py
+    (`+palabra*`): cuántos términos coinciden, o 0 si falta alguno obligatorio
+    """
+    palabras = _sin_acentos(texto or '').split()
+    puntaje = 0
+    for termino in (expresion or '').split():
+        obligatorio = termino.startswith('+')
+        termino = _sin_acentos(termino.lstrip('+'))
+        prefijo = termino.endswith('*')
+        termino = termino.rstrip('*')
+        if any(p.startswith(termino) if prefijo else p == termino for p in palabras):
+            puntaje += 1
+        elif obligatorio:
+            return 0
+    return puntaje
+
+
+class ErrorSQLite(Exception):
+    """Error con `errno` al estilo de mysql.connector"""
+
+    def __init__(self, mensaje, errno=None):
+        super().__init__(mensaje)
+        self.errno = errno
+
+
+def _convertir_error(e):
+    if isinstance(e, sqlite3.IntegrityError) and 'UNIQUE' in str(e):
+        return ErrorSQLite(str(e), errno=1062)
+    return ErrorSQLite(str(e))
+
+
+class CursorSQLite:
+
+    def __init__(self, conexion, dictionary=False, latencia=0):
+        self._conexion = conexion
+        self._cursor = conexion.cursor()
+        self._dictionary = dictionary
+        self._latencia = latencia
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _fila(self, fila):
+        if fila is None or not self._dictionary:
+            return fila
+        return {columna[0]: valor for columna, valor in zip(self._cursor.description, fila)}
+
+    def execute(self, query, params=()):
+        if self._latencia:
+            time.sleep(self._latencia)
+        try:
+            self._cursor.execute(traducir(query), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise _convertir_error(e) from e
+
+    def executemany(self, query, filas):
+        if self._latencia:
+            time.sleep(self._latencia)
+        try:
+            self._cursor.executemany(traducir(query), [tuple(f) for f in filas])
+        except sqlite3.Error as e:
+            raise _convertir_error(e) from e
+
+    def fetchone(self):
+        return self._fila(self._cursor.fetchone())
+
+    def fetchmany(self, cantidad=1):
+        return [self._fila(f) for f in self._cursor.fetchmany(cantidad)]
+
+    def fetchall(self):
+        return [self._fila(f) for f in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for fila in self._cursor:
+            yield self._fila(fila)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class ConexionSQLite:
+
+    def __init__(self, ruta, latencia=None):
+        self.latencia = LATENCIA if latencia is None else latencia
+        # isolation_level=None: autocommit, como las conexiones del pool MySQL
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None,
+                                         timeout=30)
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.execute('PRAGMA foreign_keys=ON')
+        self._conexion.create_function('coincide_fulltext', 2, coincide_fulltext, deterministic=True)
+        self._abierta = True
+
+    def cursor(self, dictionary=False, buffered=None):
+        return CursorSQLite(self._conexion, dictionary=dictionary, latencia=self.latencia)
+
+    def start_transaction(self):
+        if self.latencia:
+            time.sleep(self.latencia)
+        self._conexion.execute('BEGIN IMMEDIATE')
+
+    def commit(self):
+        if self._conexion.in_transaction:
+            if self.latencia:
+                time.sleep(self.latencia)
+            self._conexion.execute('COMMIT')
+
+    def en_transaccion(self):
+        return self._conexion.in_transaction
+
+    def rollback(self):
+        if self._conexion.in_transaction:
+            self._conexion.execute('ROLLBACK')
+
+    def is_connected(self):
+        return self._abierta
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self._conexion.execute('SELECT 1')
+
+    def close(self):
+        self._abierta = False
+        self._conexion.close()
+
+
+def conectar(ruta, latencia=None):
+    return ConexionSQLite(ruta, latencia)
+
+
+def inicializar(ruta):
+    """Crear las tablas de la aplicación en el archivo SQLite indicado"""
+    conexion = sqlite3.connect(ruta)
+    conexion.executescript(ESQUEMA)
+    conexion.close()
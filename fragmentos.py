@@ -0,0 +1,112 @@
+"""
+Cache de fragmentos HTML ya renderizados (tabla de clientes, lista de álbumes).
+
+La clave de cada fragmento incluye la versión de los datos que muestra: la
+de `tbcliente_version`, que se incrementa en cada escritura de clientes, o
+la de la instantánea del catálogo. Al cambiar la versión las entradas viejas
+dejan de usarse y salen por LRU; la cache está acotada por entradas y por
+bytes. La misma versión sirve para el ETag de las peticiones condicionales.
+"""
+import hashlib
+import os
+import time
+
+from flask import Response
+from markupsafe import Markup
+
+from cache import CacheLRU
+
+MAX_FRAGMENTOS = int(os.environ.get('FRAGMENTOS_MAX', 500))
+MAX_BYTES_FRAGMENTOS = int(os.environ.get('FRAGMENTOS_MAX_BYTES', 8 * 1024 * 1024))
+# Cada cuánto se relee la versión de clientes (lo que tarda en verse una escritura de otro worker)
+INTERVALO_VERSION = float(os.environ.get('FRAGMENTOS_VERIFICAR_VERSION', 1))
+
+SQL_VERSION_CLIENTES = "SELECT version FROM tbcliente_version WHERE id = 1"
+SQL_INCREMENTAR_CLIENTES = "UPDATE tbcliente_version SET version = version + 1 WHERE id = 1"
+
+
+class VersionClientes:
+    """Versión de los datos de clientes, releída de la base cada `intervalo` segundos"""
+
+    SQL_VERSION = SQL_VERSION_CLIENTES
+    SQL_INCREMENTAR = SQL_INCREMENTAR_CLIENTES
+
+    def __init__(self, ejecutar, intervalo=INTERVALO_VERSION):
+        self.ejecutar = ejecutar
+        self.intervalo = intervalo
+        self._version = None
+        self._leida = 0.0
+
+    def actual(self):
+        ahora = time.monotonic()
+        if self._version is None or ahora - self._leida >= self.intervalo:
+            filas = self.ejecutar(self.SQL_VERSION)
+            self._version = filas[0]['version'] if filas else 0
+            self._leida = ahora
+        return self._version
+
+    def incrementar(self, cursor=None):
+        """
+        Después de escribir en tbcliente (nunca antes: la versión nueva debe ver
+        los datos nuevos). Con `cursor` se incrementa dentro de la transacción de
+        la escritura, que confirma las dos cosas juntas, y se devuelve la versión nueva.
+        """
+        self._version = None
+        if cursor is None:
+            self.ejecutar(self.SQL_INCREMENTAR, fetch=False)
+            return None
+        cursor.execute(self.SQL_INCREMENTAR)
+        cursor.execute(self.SQL_VERSION)
+        fila = cursor.fetchone()
+        return fila['version'] if fila else None
+
+
+class CacheFragmentos:
+
+    def __init__(self, max_entradas=MAX_FRAGMENTOS, max_bytes=MAX_BYTES_FRAGMENTOS):
+        self._cache = CacheLRU(max_entradas=max_entradas, max_bytes=max_bytes,
+                               medir=lambda html: len(html.encode('utf-8')))
+
+    def obtener(self, clave, renderizar):
+        """Fragmento guardado bajo `clave`, o el resultado de `renderizar()`, que se guarda"""
+        html = self._cache.obtener(clave)
+        if html is None:
+            html = self._cache.guardar(clave, str(renderizar()))
+        return Markup(html)
+
+    def estadisticas(self):
+        return self._cache.estadisticas()
+
+    def exportar_prometheus(self):
+        datos = self.estadisticas()
+        lineas = [
+            '# HELP cache_fragmentos_eventos_total Aciertos y fallos de la cache de fragmentos HTML.',
+            '# TYPE cache_fragmentos_eventos_total counter',
+        ]
+        for evento in ('aciertos', 'fallos', 'expulsiones'):
+            lineas.append(f'cache_fragmentos_eventos_total{{evento="{evento}"}} {datos[evento]}')
+        lineas.append('# HELP cache_fragmentos_bytes Tamaño de los fragmentos guardados.')
+        lineas.append('# TYPE cache_fragmentos_bytes gauge')
+        lineas.append(f'cache_fragmentos_bytes {datos["bytes"]}')
+        return '\n'.join(lineas) + '\n'
+
+
+def huella_plantillas(app, *nombres):
+    """Resumen del código de las plantillas: al desplegar otras plantillas cambian los ETag"""
+    resumen = hashlib.sha1()
+    for nombre in nombres:
+        fuente, _, _ = app.jinja_loader.get_source(app.jinja_env, nombre)
+        resumen.update(fuente.encode('utf-8'))
+    return resumen.hexdigest()[:12]
+
+
+def calcular_etag(*partes):
+    return hashlib.sha1('|'.join(map(str, partes)).encode('utf-8')).hexdigest()[:24]
+
+
+def no_modificada(etag, debil=False):
+    """Respuesta 304 para un If-None-Match que coincide"""
+    respuesta = Response(status=304)
+    respuesta.set_etag(etag, weak=debil)
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
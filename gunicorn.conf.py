@@ -0,0 +1,84 @@
+"""
+Configuración de gunicorn para producción. gunicorn la lee sola desde el
+directorio de trabajo:
+
+    flask --app app construir-activos   # CSS con huella y precomprimido, al desplegar
+    gunicorn app:app
+
+Workers con hilos (gthread): las peticiones pasan casi todo su tiempo
+esperando a MySQL remoto, así que unos pocos procesos con varios hilos
+aprovechan la CPU sin multiplicar la memoria. Cada hilo tiene su conexión
+en el pool y sobran GUNICORN_POOL_MARGEN (2) para los hilos de fondo que
+no atienden peticiones (construcción del índice de autocompletar,
+despachador de reportes masivos): DB_POOL_SIZE = hilos + margen, y el total
+de conexiones, workers x (hilos + margen), tiene que caber en el
+max_connections de MySQL.
+
+Detrás del balanceador, PROXY_SALTOS (app.py) es la cantidad de proxies de
+confianza: la IP del cliente para el límite de login sale de X-Forwarded-For.
+
+La aplicación se carga una vez en el maestro (preload) y cada worker abre
+sus propias conexiones después del fork. Cada valor se puede cambiar con
+su variable GUNICORN_* o con la línea de comandos.
+"""
+import os
+
+NUCLEOS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+
+# 'sync' vuelve a un hilo por proceso (2 x núcleos + 1 procesos)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class == 'gthread':
+    workers = int(os.environ.get('GUNICORN_WORKERS', NUCLEOS + 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 8))
+else:
+    workers = int(os.environ.get('GUNICORN_WORKERS', 2 * NUCLEOS + 1))
+    threads = 1
+
+# Antes del preload: app y config.conexion leen estas variables al importarse
+margen_pool = int(os.environ.get('GUNICORN_POOL_MARGEN', 2))
+os.environ.setdefault('DB_POOL_SIZE', str(threads + margen_pool))
+# Con varios workers los carritos y las invalidaciones de clientes tienen que compartirse;
+# el índice de autocompletar de cada worker se pone al día solo, siguiendo tbcliente_version
+if workers > 1:
+    os.environ.setdefault('CARRITO_ALMACEN', 'sqlite')
+    os.environ.setdefault('CLIENTES_CACHE_COMPARTIDA', 'cache_clientes.db')
+
+preload_app = True
+
+# Reciclar cada worker tras ~2000 peticiones (con jitter, para que no se reinicien
+# todos a la vez) acota el crecimiento de memoria de caches y fragmentación
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+# /reporte con muchas compras genera el PDF en streaming y puede tardar minutos;
+# con gthread el timeout sólo vigila que el proceso siga vivo, con sync corta la petición
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 180))
+# Al reiniciar se deja terminar a los reportes en curso
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 60))
+# La navegación encadena / -> /comprar -> /vercompras; con gthread una conexión
+# inactiva no ocupa un hilo mientras espera
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# El latido de los workers en memoria: un disco lento no los hace parecer colgados
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# GUNICORN_ACCESS_LOG vacío lo desactiva
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """
+    El hook de config.conexion ya descartó las conexiones heredadas del
+    maestro; aquí se abren las del worker en segundo plano, para que las
+    primeras peticiones no paguen el handshake con MySQL
+    """
+    from config.conexion import CALENTAR_CONEXIONES, calentar_en_segundo_plano
+
+    # Con DB_WARMUP el propio hook de config.conexion ya calienta el pool
+    if CALENTAR_CONEXIONES <= 0:
+        calentar_en_segundo_plano(threads)
@@ -0,0 +1,234 @@
+"""
+Métricas de las consultas SQL y registro de consultas lentas.
+
+Cada sentencia que pasa por ejecutar_consulta / ejecutar_modificacion /
+transaccion se registra bajo (ruta de Flask, consulta normalizada): un
+histograma de latencia con los buckets de Prometheus, las filas devueltas
+o afectadas y los errores. También se mide la espera por una conexión del
+pool. `exportar_prometheus()` genera el formato de texto de /metrics.
+
+Las métricas son por proceso: con varios workers cada uno expone las suyas.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+# Límites superiores de los buckets (segundos), los mismos que usa el cliente de Prometheus
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Consultas distintas que se registran por separado; el resto se agrupa en 'otras'
+MAX_CONSULTAS = int(os.environ.get('METRICAS_MAX_CONSULTAS', 500))
+UMBRAL_LENTA = float(os.environ.get('DB_CONSULTA_LENTA_MS', 200)) / 1000
+
+logger_lentas = logging.getLogger('consultas_lentas')
+
+_ESPACIOS = re.compile(r'\s+')
+_CADENAS = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMEROS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTA_IN = re.compile(r'IN \((?:%s|\?)(?:, ?(?:%s|\?))+\)', re.I)
+_VALORES = re.compile(r'(VALUES \([^)]*\))(?:, ?\([^)]*\))+', re.I)
+
+
+@lru_cache(maxsize=1024)
+def normalizar_consulta(query):
+    """
+    Texto estable para agrupar: sin espacios repetidos, literales como `?`,
+    listas `IN (%s, %s, ...)` y VALUES multi-fila reducidos a una forma
+    """
+    texto = _ESPACIOS.sub(' ', query).strip()
+    texto = _CADENAS.sub('?', texto)
+    texto = _NUMEROS.sub('?', texto)
+    texto = _LISTA_IN.sub('IN (...)', texto)
+    return _VALORES.sub(r'\1, ...', texto)
+
+
+def redactar_parametros(params):
+    """Tipos y longitudes de los parámetros, nunca sus valores"""
+    if not params:
+        return '[]'
+    redactados = []
+    for valor in params:
+        if isinstance(valor, str):
+            redactados.append(f'<str:{len(valor)}>')
+        else:
+            redactados.append(f'<{type(valor).__name__}>')
+    return '[' + ', '.join(redactados) + ']'
+
+
+class Histograma:
+    __slots__ = ('cuentas', 'suma', 'total')
+
+    def __init__(self):
+        self.cuentas = [0] * len(BUCKETS)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self):
+        acumulado = 0
+        for limite, cuenta in zip(BUCKETS, self.cuentas):
+            acumulado += cuenta
+            yield limite, acumulado
+
+
+class _Serie:
+    __slots__ = ('latencia', 'filas', 'errores')
+
+    def __init__(self):
+        self.latencia = Histograma()
+        self.filas = 0
+        self.errores = 0
+
+
+class RegistroConsultas:
+
+    def __init__(self, umbral_lenta=UMBRAL_LENTA, max_consultas=MAX_CONSULTAS, al_registrar=None):
+        self.umbral_lenta = umbral_lenta
+        self.max_consultas = max_consultas
+        # Recibe la duración de cada sentencia (p. ej. para sumar el tiempo de DB de la petición)
+        self.al_registrar = al_registrar
+        self._series = {}
+        self._espera_pool = Histograma()
+        self._lentas = 0
+        self._lock = threading.Lock()
+
+    def registrar(self, query, params, duracion, filas=0, error=False, ruta=None):
+        consulta = normalizar_consulta(query)
+        clave = (ruta or '', consulta)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                if len(self._series) >= self.max_consultas:
+                    clave = (ruta or '', 'otras')
+                    serie = self._series.get(clave)
+                if serie is None:
+                    serie = self._series[clave] = _Serie()
+            serie.latencia.observar(duracion)
+            serie.filas += filas or 0
+            if error:
+                serie.errores += 1
+            lenta = duracion >= self.umbral_lenta
+            if lenta:
+                self._lentas += 1
+        if self.al_registrar:
+            self.al_registrar(duracion)
+        if lenta:
+            logger_lentas.warning(
+                f"Consulta lenta ({duracion * 1000:.1f} ms, ruta={ruta or '-'}): "
+                f"{consulta} params={redactar_parametros(params)}"
+            )
+
+    def registrar_espera_pool(self, espera):
+        with self._lock:
+            self._espera_pool.observar(espera)
+
+    def exportar_prometheus(self, metricas_pool=None):
+        """Texto en el formato de exposición de Prometheus"""
+        with self._lock:
+            series = [(clave, list(serie.latencia.acumulados()), serie.latencia.suma,
+                       serie.latencia.total, serie.filas, serie.errores)
+                      for clave, serie in self._series.items()]
+            espera = (list(self._espera_pool.acumulados()), self._espera_pool.suma,
+                      self._espera_pool.total)
+            lentas = self._lentas
+
+        lineas = [
+            '# HELP db_consulta_segundos Latencia de cada sentencia SQL por ruta y consulta normalizada.',
+            '# TYPE db_consulta_segundos histogram',
+        ]
+        for (ruta, consulta), acumulados, suma, total, _, _ in series:
+            etiquetas = f'ruta="{_escapar(ruta)}",consulta="{_escapar(consulta)}"'
+            for limite, acumulado in acumulados:
+                lineas.append(f'db_consulta_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'db_consulta_segundos_bucket{{{etiquetas},le="+Inf"}} {total}')
+            lineas.append(f'db_consulta_segundos_sum{{{etiquetas}}} {suma:.6f}')
+            lineas.append(f'db_consulta_segundos_count{{{etiquetas}}} {total}')
+
+        lineas.append('# HELP db_consulta_filas_total Filas devueltas o afectadas.')
+        lineas.append('# TYPE db_consulta_filas_total counter')
+        for (ruta, consulta), _, _, _, filas, _ in series:
+            lineas.append(f'db_consulta_filas_total{{ruta="{_escapar(ruta)}",'
+                          f'consulta="{_escapar(consulta)}"}} {filas}')
+
+        lineas.append('# HELP db_consulta_errores_total Sentencias que terminaron en error.')
+        lineas.append('# TYPE db_consulta_errores_total counter')
+        for (ruta, consulta), _, _, _, _, errores in series:
+            lineas.append(f'db_consulta_errores_total{{ruta="{_escapar(ruta)}",'
+                          f'consulta="{_escapar(consulta)}"}} {errores}')
+
+        lineas.append('# HELP db_consultas_lentas_total Sentencias por encima del umbral de consulta lenta.')
+        lineas.append('# TYPE db_consultas_lentas_total counter')
+        lineas.append(f'db_consultas_lentas_total {lentas}')
+
+        acumulados, suma, total = espera
+        lineas.append('# HELP db_pool_espera_segundos Espera por una conexión libre del pool.')
+        lineas.append('# TYPE db_pool_espera_segundos histogram')
+        for limite, acumulado in acumulados:
+            lineas.append(f'db_pool_espera_segundos_bucket{{le="{limite}"}} {acumulado}')
+        lineas.append(f'db_pool_espera_segundos_bucket{{le="+Inf"}} {total}')
+        lineas.append(f'db_pool_espera_segundos_sum {suma:.6f}')
+        lineas.append(f'db_pool_espera_segundos_count {total}')
+
+        if metricas_pool:
+            lineas.append('# HELP db_pool_conexiones Conexiones del pool por estado.')
+            lineas.append('# TYPE db_pool_conexiones gauge')
+            for estado in ('tamano', 'creadas', 'libres', 'en_uso'):
+                lineas.append(f'db_pool_conexiones{{estado="{estado}"}} {metricas_pool[estado]}')
+            lineas.append('# HELP db_pool_eventos_total Eventos del pool de conexiones.')
+            lineas.append('# TYPE db_pool_eventos_total counter')
+            for evento in ('prestamos', 'esperas', 'agotado', 'verificaciones', 'reconexiones',
+                           'descartadas'):
+                lineas.append(f'db_pool_eventos_total{{evento="{evento}"}} {metricas_pool[evento]}')
+        return '\n'.join(lineas) + '\n'
+
+    def limpiar(self):
+        with self._lock:
+            self._series.clear()
+            self._espera_pool = Histograma()
+            self._lentas = 0
+
+
+class CursorMedido:
+    """Envuelve un cursor y registra cada execute/executemany"""
+
+    def __init__(self, cursor, registro, ruta=None):
+        self._cursor = cursor
+        self._registro = registro
+        self._ruta = ruta
+
+    def _medir(self, metodo, query, params, params_registro):
+        inicio = time.perf_counter()
+        error = False
+        try:
+            return metodo(query, params)
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._registro.registrar(query, params_registro, time.perf_counter() - inicio,
+                                     max(self._cursor.rowcount or 0, 0), error, self._ruta)
+
+    def execute(self, query, params=()):
+        return self._medir(self._cursor.execute, query, params, params)
+
+    def executemany(self, query, filas):
+        return self._medir(self._cursor.executemany, query, filas, None)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
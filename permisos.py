@@ -0,0 +1,90 @@
+"""
+Permisos por rol, resueltos una vez y guardados en la sesión.
+
+Al iniciar sesión se guarda en la cookie (firmada por Flask) un reclamo
+compacto `[id_usuario, máscara de permisos, versión de roles]`. Cada
+petición compara la versión del reclamo con la de `tbusuario_version`,
+que el proceso relee como mucho cada PERMISOS_VERIFICAR_VERSION segundos:
+mientras coincidan, autorizar es una operación de bits sin ir a la base.
+Cambiar el rol de un usuario incrementa la versión y cada sesión vuelve a
+leer su rol una sola vez.
+"""
+import os
+
+from fragmentos import VersionClientes
+
+PERMISOS = ('ver_clientes', 'editar_clientes', 'comprar', 'ver_compras', 'reportes', 'usuarios')
+BITS = {permiso: 1 << i for i, permiso in enumerate(PERMISOS)}
+
+PERMISOS_POR_ROL = {
+    'administrador': PERMISOS,
+    'productor': ('ver_clientes', 'editar_clientes', 'comprar', 'ver_compras', 'reportes'),
+    'cantante': ('ver_clientes', 'ver_compras', 'reportes'),
+    'comprador': ('ver_clientes', 'comprar', 'ver_compras'),
+}
+
+# Lo que tarda un cambio de rol en llegar a las sesiones servidas por otro worker
+INTERVALO_VERSION = float(os.environ.get('PERMISOS_VERIFICAR_VERSION', 1))
+
+SQL_ROL = "SELECT usuario, rol FROM tbusuario WHERE id_usuario = %s"
+
+
+def mascara(rol):
+    bits = 0
+    for permiso in PERMISOS_POR_ROL.get(rol, ()):
+        bits |= BITS[permiso]
+    return bits
+
+
+def mascara_de(*permisos):
+    """Máscara de los permisos pedidos; un nombre desconocido falla al decorar la vista"""
+    bits = 0
+    for permiso in permisos:
+        bits |= BITS[permiso]
+    return bits
+
+
+class VersionRoles(VersionClientes):
+    """Versión de `tbusuario_version`: se incrementa al cambiar el rol de un usuario"""
+
+    SQL_VERSION = "SELECT version FROM tbusuario_version WHERE id = 1"
+    SQL_INCREMENTAR = "UPDATE tbusuario_version SET version = version + 1 WHERE id = 1"
+
+
+class Autorizacion:
+
+    def __init__(self, ejecutar, version=None):
+        self.ejecutar = ejecutar
+        self.version = version or VersionRoles(ejecutar, INTERVALO_VERSION)
+        self.refrescos = 0
+
+    def reclamo(self, id_usuario, rol):
+        """Lo que se guarda en session['permisos'] al iniciar sesión"""
+        return [id_usuario, mascara(rol), self.version.actual()]
+
+    def permisos(self, sesion):
+        """
+        Máscara vigente de la sesión, o None si no hay reclamo o el usuario ya
+        no existe. Si la versión de roles cambió, relee el rol y renueva el
+        reclamo en la sesión.
+        """
+        reclamo = sesion.get('permisos')
+        if not reclamo:
+            return None
+        id_usuario, bits, version = reclamo
+        actual = self.version.actual()
+        if version == actual:
+            return bits
+
+        self.refrescos += 1
+        filas = self.ejecutar(SQL_ROL, (id_usuario,))
+        if not filas:
+            return None
+        bits = mascara(filas[0]['rol'])
+        sesion['permisos'] = [id_usuario, bits, actual]
+        sesion['rol'] = filas[0]['rol']
+        return bits
+
+    def rol_cambiado(self):
+        """Después de modificar el rol de un usuario en tbusuario"""
+        self.version.incrementar()
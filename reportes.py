@@ -0,0 +1,286 @@
+"""
+Diseño de los reportes PDF de compras y su cache.
+"""
+import hashlib
+import zlib
+
+from fpdf import FPDF
+from fpdf.fonts import fpdf_charwidths
+
+from cache import CacheLRU
+
+
+# Filas del reporte de un cliente (también las usa el reporte masivo)
+SQL_REPORTE = """
+    SELECT c.nombre, c.nit, co.producto, co.cantidad, co.costo, co.id_compra
+    FROM tbcompra co
+    INNER JOIN tbcliente c ON co.id_cliente = c.id_cliente
+    WHERE co.id_cliente = %s
+    ORDER BY co.id_compra DESC
+"""
+
+
+def nombre_archivo(nombre_cliente):
+    return f'reporte_{nombre_cliente.replace(" ", "_")}.pdf'
+
+
+def etag_reporte(id_cliente, huella):
+    """
+    ETag (débil) de un reporte. Sale de la huella de los datos y no de los
+    bytes: FPDF escribe la fecha de creación en cada PDF, así que cada worker
+    y cada regeneración producen bytes distintos para el mismo reporte.
+    """
+    texto = ':'.join(str(parte) for parte in (id_cliente, *huella))
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:32]
+
+
+def dibujar_reporte(pdf, nombre_cliente, nit_cliente, compras):
+    """
+    Diseño del reporte, común a FPDF y a PDFEnStreaming.
+    Es un generador: cede el control después de cada fila para que el modo
+    streaming pueda enviar las páginas que ya se completaron.
+    """
+    pdf.add_page()
+
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 15, "REPORTE DE COMPRAS", ln=True, align="C")
+    pdf.ln(5)
+
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, f"Cliente: {nombre_cliente}", ln=True)
+    pdf.cell(0, 10, f"NIT: {nit_cliente}", ln=True)
+    pdf.ln(5)
+
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(10, 10, "#", 1, 0, 'C')
+    pdf.cell(80, 10, "Producto", 1, 0, 'C')
+    pdf.cell(25, 10, "Cantidad", 1, 0, 'C')
+    pdf.cell(25, 10, "Precio Unit.", 1, 0, 'C')
+    pdf.cell(25, 10, "Total", 1, 0, 'C')
+    pdf.ln()
+
+    pdf.set_font("Arial", '', 9)
+    total_general = 0
+
+    for i, compra in enumerate(compras, 1):
+        cantidad = float(compra['cantidad'])
+        costo = float(compra['costo'])
+        total_linea = cantidad * costo
+        total_general += total_linea
+
+        pdf.cell(10, 8, str(i), 1, 0, 'C')
+        pdf.cell(80, 8, str(compra['producto'])[:40], 1)
+        pdf.cell(25, 8, str(int(cantidad)), 1, 0, 'C')
+        pdf.cell(25, 8, f"${costo:.2f}", 1, 0, 'R')
+        pdf.cell(25, 8, f"${total_linea:.2f}", 1, 0, 'R')
+        pdf.ln()
+        yield
+
+    pdf.ln(2)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(140, 10, "TOTAL GENERAL:", 0, 0, 'R')
+    pdf.cell(25, 10, f"${total_general:.2f}", 1, 0, 'R')
+
+
+def construir_pdf(nombre_cliente, nit_cliente, compras):
+    """Generar el reporte de compras de un cliente y devolverlo como bytes"""
+    pdf = FPDF()
+    for _ in dibujar_reporte(pdf, nombre_cliente, nit_cliente, compras):
+        pass
+    # FPDF 1.7 devuelve el documento como str latin-1; se envía tal cual en bytes
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def generar_pdf_en_streaming(nombre_cliente, nit_cliente, compras, filas_por_envio=200):
+    """
+    Generar el mismo reporte como una secuencia de bytes. `compras` puede ser un
+    iterador de la base de datos: sólo la página en curso se guarda en memoria.
+    """
+    pdf = PDFEnStreaming()
+    yield pdf.vaciar()
+    for numero, _ in enumerate(dibujar_reporte(pdf, nombre_cliente, nit_cliente, compras), 1):
+        if numero % filas_por_envio == 0:
+            pendiente = pdf.vaciar()
+            if pendiente:
+                yield pendiente
+    yield pdf.output()
+
+
+def _escapar(texto):
+    texto = texto.encode('latin-1', 'replace')
+    return texto.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class PDFEnStreaming:
+    """
+    Escritor PDF mínimo con la misma interfaz que usa dibujar_reporte()
+    (add_page, set_font, cell, ln, output) y la misma geometría que FPDF
+    (A4 en mm, márgenes de 1 cm, salto automático a 2 cm del borde inferior).
+    Cada página se escribe en el búfer de salida en cuanto se completa;
+    `vaciar()` entrega lo escrito hasta el momento.
+    """
+
+    K = 72 / 25.4
+    ANCHO, ALTO = 210.0, 297.0
+    MARGEN = 10.0
+    MARGEN_CELDA = MARGEN / 10.0
+    LIMITE_SALTO = ALTO - 20.0
+    FUENTES = {'': ('F1', 'Helvetica', 'helvetica'), 'B': ('F2', 'Helvetica-Bold', 'helveticaB')}
+    # Objetos fijos: 1 árbol de páginas, 2 y 3 fuentes; el resto se numera al vuelo
+    OBJ_PAGINAS = 1
+
+    def __init__(self):
+        self._salida = [b'%PDF-1.3\n']
+        self._escritos = len(self._salida[0])
+        self._offsets = {}
+        self._siguiente = 4
+        self._paginas = []
+        self._contenido = None
+        self.x = self.y = self.MARGEN
+        self.alto_ultimo = 0
+        self.set_font('Arial', '', 12)
+
+    # ---- salida ----
+
+    def _escribir(self, datos):
+        self._salida.append(datos)
+        self._escritos += len(datos)
+
+    def _objeto(self, cuerpo, numero=None):
+        if numero is None:
+            numero = self._siguiente
+            self._siguiente += 1
+        self._offsets[numero] = self._escritos
+        self._escribir(b'%d 0 obj\n' % numero + cuerpo + b'\nendobj\n')
+        return numero
+
+    def vaciar(self):
+        datos = b''.join(self._salida)
+        self._salida = []
+        return datos
+
+    def _cerrar_pagina(self):
+        if self._contenido is None:
+            return
+        flujo = zlib.compress(b''.join(self._contenido))
+        contenido = self._objeto(b'<</Filter /FlateDecode /Length %d>>\nstream\n' % len(flujo)
+                                 + flujo + b'\nendstream')
+        pagina = self._objeto(
+            b'<</Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] '
+            b'/Resources <</Font <</F1 2 0 R /F2 3 0 R>>>> /Contents %d 0 R>>'
+            % (self.OBJ_PAGINAS, self.ANCHO * self.K, self.ALTO * self.K, contenido)
+        )
+        self._paginas.append(pagina)
+        self._contenido = None
+
+    def output(self):
+        """Terminar el documento y devolver los bytes pendientes"""
+        self._cerrar_pagina()
+        for numero, (estilo, (_, base, _)) in enumerate(sorted(self.FUENTES.items()), 2):
+            self._objeto(
+                b'<</Type /Font /BaseFont /%s /Subtype /Type1 /Encoding /WinAnsiEncoding>>'
+                % base.encode('ascii'), numero
+            )
+        hijos = b' '.join(b'%d 0 R' % pagina for pagina in self._paginas)
+        self._objeto(b'<</Type /Pages /Kids [%s] /Count %d>>' % (hijos, len(self._paginas)),
+                     self.OBJ_PAGINAS)
+        catalogo = self._objeto(b'<</Type /Catalog /Pages %d 0 R>>' % self.OBJ_PAGINAS)
+
+        inicio_xref = self._escritos
+        total = self._siguiente
+        lineas = [b'xref\n0 %d\n' % total, b'0000000000 65535 f \n']
+        for numero in range(1, total):
+            lineas.append(b'%010d 00000 n \n' % self._offsets[numero])
+        self._escribir(b''.join(lineas))
+        self._escribir(b'trailer\n<</Size %d /Root %d 0 R>>\nstartxref\n%d\n%%%%EOF\n'
+                       % (total, catalogo, inicio_xref))
+        return self.vaciar()
+
+    # ---- dibujo (subconjunto de FPDF) ----
+
+    def add_page(self):
+        self._cerrar_pagina()
+        self._contenido = [b'0.57 w\n']
+        self.x = self.y = self.MARGEN
+        self._usar_fuente()
+
+    def set_font(self, familia, estilo='', tamano=12):
+        self._fuente, _, nombre_anchos = self.FUENTES['B' if 'B' in estilo.upper() else '']
+        self._anchos = fpdf_charwidths[nombre_anchos]
+        self._tamano_pt = tamano
+        self._tamano = tamano / self.K
+        self._usar_fuente()
+
+    def _usar_fuente(self):
+        if self._contenido is not None:
+            self._contenido.append(b'BT /%s %.2f Tf ET\n' % (self._fuente.encode(), self._tamano_pt))
+
+    def ancho_texto(self, texto):
+        return sum(self._anchos.get(c, 500) for c in texto) * self._tamano / 1000.0
+
+    def cell(self, w, h=0, txt='', border=0, ln=0, align='', fill=0):
+        if self.y + h > self.LIMITE_SALTO:
+            x = self.x
+            self.add_page()
+            self.x = x
+        if w == 0:
+            w = self.ANCHO - self.MARGEN - self.x
+        k = self.K
+        if border == 1:
+            self._contenido.append(b'%.2f %.2f %.2f %.2f re S\n'
+                                   % (self.x * k, (self.ALTO - self.y) * k, w * k, -h * k))
+        if txt:
+            if align == 'R':
+                dx = w - self.MARGEN_CELDA - self.ancho_texto(txt)
+            elif align == 'C':
+                dx = (w - self.ancho_texto(txt)) / 2.0
+            else:
+                dx = self.MARGEN_CELDA
+            self._contenido.append(b'BT %.2f %.2f Td (%s) Tj ET\n' % (
+                (self.x + dx) * k,
+                (self.ALTO - (self.y + .5 * h + .3 * self._tamano)) * k,
+                _escapar(txt),
+            ))
+        self.alto_ultimo = h
+        if ln:
+            self.y += h
+            self.x = self.MARGEN
+        else:
+            self.x += w
+
+    def ln(self, h=None):
+        self.x = self.MARGEN
+        self.y += self.alto_ultimo if h is None else h
+
+
+class CacheReportes:
+    """
+    PDFs ya generados por cliente. Cada entrada guarda la huella con la que se
+    generó (número de compras, máximo id_compra, nombre y NIT del cliente): si
+    la huella actual es otra, el PDF está desactualizado y se vuelve a generar.
+    """
+
+    def __init__(self, max_entradas=256, max_bytes=64 * 1024 * 1024):
+        self._cache = CacheLRU(max_entradas=max_entradas, max_bytes=max_bytes,
+                               medir=lambda entrada: len(entrada['pdf']))
+
+    def obtener(self, id_cliente, huella):
+        entrada = self._cache.obtener(id_cliente)
+        if entrada is None or entrada['huella'] != huella:
+            return None
+        return entrada
+
+    def guardar(self, id_cliente, huella, pdf, nombre_cliente):
+        entrada = {
+            'huella': huella,
+            'pdf': pdf,
+            'etag': etag_reporte(id_cliente, huella),
+            'archivo': nombre_archivo(nombre_cliente),
+        }
+        return self._cache.guardar(id_cliente, entrada)
+
+    def invalidar(self, id_cliente):
+        self._cache.invalidar(id_cliente)
+
+    def estadisticas(self):
+        return self._cache.estadisticas()
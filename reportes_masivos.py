@@ -0,0 +1,209 @@
+"""
+Generación masiva de reportes PDF (cierre de mes) fuera de los workers web.
+
+Los trabajos se encolan en una cola local y un hilo despachador los reparte
+en lotes de clientes a un pool de procesos. Cada proceso abre sus propias
+conexiones, lee las compras y escribe los PDF con el mismo diseño que
+/reporte/<id> (reportes.construir_pdf). El estado de cada trabajo se guarda
+en `estado.json` dentro de su directorio, así cualquier worker de gunicorn
+puede responder a las consultas de progreso.
+
+También se puede usar desde la consola:
+
+    python reportes_masivos.py --procesos 4 --formato zip
+"""
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config.conexion import obtener_conexion
+from reportes import SQL_REPORTE, construir_pdf
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_BASE = os.environ.get('REPORTES_DIRECTORIO', 'reportes_generados')
+PROCESOS = int(os.environ.get('REPORTES_PROCESOS', os.cpu_count() or 2))
+CLIENTES_POR_LOTE = int(os.environ.get('REPORTES_CLIENTES_POR_LOTE', 25))
+FORMATOS = ('zip', 'directorio')
+
+
+def _generar_lote(ids_clientes, directorio):
+    """Se ejecuta en un proceso del pool: un PDF por cliente del lote"""
+    resultados = []
+    with obtener_conexion() as conexion:
+        with conexion.cursor(dictionary=True) as cursor:
+            for id_cliente in ids_clientes:
+                try:
+                    cursor.execute(SQL_REPORTE, (id_cliente,))
+                    datos = cursor.fetchall()
+                    if not datos:
+                        resultados.append((id_cliente, None, 'Sin compras'))
+                        continue
+                    pdf = construir_pdf(datos[0]['nombre'], datos[0]['nit'], datos)
+                    archivo = f'reporte_{id_cliente}.pdf'
+                    with open(os.path.join(directorio, archivo), 'wb') as f:
+                        f.write(pdf)
+                    resultados.append((id_cliente, archivo, None))
+                except Exception as e:
+                    resultados.append((id_cliente, None, str(e)))
+    return resultados
+
+
+def clientes_con_compras():
+    with obtener_conexion() as conexion:
+        with conexion.cursor() as cursor:
+            cursor.execute('SELECT DISTINCT id_cliente FROM tbcompra ORDER BY id_cliente')
+            return [fila[0] for fila in cursor.fetchall()]
+
+
+def _ruta_estado(directorio_base, id_trabajo):
+    return os.path.join(directorio_base, id_trabajo, 'estado.json')
+
+
+def leer_estado(id_trabajo, directorio_base=DIRECTORIO_BASE):
+    """Estado de un trabajo desde su estado.json, o None si no existe"""
+    if not id_trabajo.isalnum():
+        return None
+    try:
+        with open(_ruta_estado(directorio_base, id_trabajo), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ColaReportes:
+    """Cola local de trabajos de reportes masivos"""
+
+    def __init__(self, directorio_base=DIRECTORIO_BASE, procesos=PROCESOS,
+                 clientes_por_lote=CLIENTES_POR_LOTE):
+        self.directorio_base = directorio_base
+        self.procesos = procesos
+        self.clientes_por_lote = clientes_por_lote
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def crear_trabajo(self, formato='zip', procesos=None):
+        if formato not in FORMATOS:
+            raise ValueError(f'Formato no válido: {formato}')
+        id_trabajo = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.directorio_base, id_trabajo))
+        estado = {
+            'id': id_trabajo,
+            'estado': 'pendiente',
+            'formato': formato,
+            # Nunca más procesos que los configurados para la cola (REPORTES_PROCESOS)
+            'procesos': min(max(1, procesos or self.procesos), max(1, self.procesos)),
+            'total': None,
+            'generados': 0,
+            'errores': [],
+            'archivo': None,
+            'creado': time.time(),
+            'iniciado': None,
+            'terminado': None,
+        }
+        self._guardar_estado(estado)
+        return estado
+
+    def encolar(self, formato='zip', procesos=None, ids_clientes=None):
+        estado = self.crear_trabajo(formato, procesos)
+        self._cola.put((estado, ids_clientes))
+        self._asegurar_despachador()
+        return estado
+
+    def _asegurar_despachador(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._despachar, daemon=True)
+                self._hilo.start()
+
+    def _despachar(self):
+        while True:
+            estado, ids_clientes = self._cola.get()
+            try:
+                self.ejecutar(estado, ids_clientes)
+            except Exception as e:
+                logger.error(f"Trabajo de reportes {estado['id']} falló: {e}")
+                estado['estado'] = 'error'
+                estado['errores'].append({'id_cliente': None, 'error': str(e)})
+                estado['terminado'] = time.time()
+                self._guardar_estado(estado)
+            finally:
+                self._cola.task_done()
+
+    def _guardar_estado(self, estado):
+        ruta = _ruta_estado(self.directorio_base, estado['id'])
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(estado, f)
+        # Reemplazo atómico: quien lea nunca ve un JSON a medio escribir
+        os.replace(temporal, ruta)
+
+    def ejecutar(self, estado, ids_clientes=None):
+        """Procesar un trabajo en este hilo (el despachador o la consola)"""
+        directorio = os.path.join(self.directorio_base, estado['id'])
+        estado['estado'] = 'en_curso'
+        estado['iniciado'] = time.time()
+        ids = list(ids_clientes) if ids_clientes is not None else clientes_con_compras()
+        estado['total'] = len(ids)
+        self._guardar_estado(estado)
+
+        lotes = [ids[i:i + self.clientes_por_lote] for i in range(0, len(ids), self.clientes_por_lote)]
+        # spawn: no se hereda el estado de un worker web con hilos y conexiones abiertas
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=estado['procesos'], mp_context=contexto) as pool:
+            futuros = [pool.submit(_generar_lote, lote, directorio) for lote in lotes]
+            for futuro in as_completed(futuros):
+                for id_cliente, archivo, error in futuro.result():
+                    if error:
+                        estado['errores'].append({'id_cliente': id_cliente, 'error': error})
+                    else:
+                        estado['generados'] += 1
+                self._guardar_estado(estado)
+
+        if estado['formato'] == 'zip':
+            estado['archivo'] = self._comprimir(directorio, estado['id'])
+        else:
+            estado['archivo'] = directorio
+        estado['estado'] = 'terminado'
+        estado['terminado'] = time.time()
+        self._guardar_estado(estado)
+        return estado
+
+    def _comprimir(self, directorio, id_trabajo):
+        ruta_zip = os.path.join(self.directorio_base, f'{id_trabajo}.zip')
+        # Los PDF ya vienen comprimidos: se guardan sin volver a comprimir
+        with zipfile.ZipFile(ruta_zip, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+            for nombre in sorted(os.listdir(directorio)):
+                if nombre.endswith('.pdf'):
+                    archivo_zip.write(os.path.join(directorio, nombre), nombre)
+        for nombre in os.listdir(directorio):
+            if nombre.endswith('.pdf'):
+                os.remove(os.path.join(directorio, nombre))
+        return ruta_zip
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generar los reportes PDF de todos los clientes')
+    parser.add_argument('--procesos', type=int, default=PROCESOS)
+    parser.add_argument('--formato', choices=FORMATOS, default='zip')
+    parser.add_argument('--salida', default=DIRECTORIO_BASE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    cola = ColaReportes(directorio_base=args.salida, procesos=args.procesos)
+    estado = cola.ejecutar(cola.crear_trabajo(args.formato, args.procesos))
+    print(json.dumps(estado, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
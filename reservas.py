@@ -0,0 +1,114 @@
+"""
+Reservas de stock mientras un álbum está en un carrito.
+
+Cada carrito reserva unidades de un álbum en `tbreserva` hasta `vence`
+(RESERVA_TTL segundos). Las unidades disponibles para los demás son el
+stock de `tbalbum` menos las reservas vigentes de otros carritos; las
+reservas vencidas simplemente dejan de contar y se borran al pasar.
+
+Reservar bloquea antes la fila del álbum (SELECT ... FOR UPDATE), así dos
+compradores simultáneos no pueden quedarse con la última unidad. Al
+confirmar la compra el stock se descuenta con un UPDATE condicional dentro
+de la misma transacción que registra el pedido.
+"""
+import os
+import time
+
+TTL_RESERVA = int(os.environ.get('RESERVA_TTL', 15 * 60))
+
+SQL_BLOQUEAR_ALBUM = "SELECT stock FROM tbalbum WHERE id_album = %s FOR UPDATE"
+SQL_PURGAR_ALBUM = "DELETE FROM tbreserva WHERE id_album = %s AND vence <= %s"
+SQL_RESERVADO_POR_OTROS = """
+    SELECT COALESCE(SUM(cantidad), 0) AS reservado
+    FROM tbreserva
+    WHERE id_album = %s AND id_carrito <> %s AND vence > %s
+"""
+SQL_ACTUALIZAR_RESERVA = """
+    UPDATE tbreserva SET cantidad = %s, vence = %s
+    WHERE id_carrito = %s AND id_album = %s
+"""
+SQL_INSERTAR_RESERVA = """
+    INSERT INTO tbreserva (id_carrito, id_album, cantidad, vence)
+    VALUES (%s, %s, %s, %s)
+"""
+# El stock sólo baja si después de la compra siguen cubiertas las reservas de los demás
+SQL_DESCONTAR_STOCK = """
+    UPDATE tbalbum SET stock = stock - %s
+    WHERE id_album = %s
+      AND stock - %s >= (
+          SELECT COALESCE(SUM(cantidad), 0) FROM tbreserva
+          WHERE id_album = %s AND id_carrito <> %s AND vence > %s
+      )
+"""
+
+
+class StockInsuficiente(Exception):
+    """No quedan unidades suficientes de un álbum"""
+
+    def __init__(self, mensaje, id_album=None, disponible=None):
+        super().__init__(mensaje)
+        self.id_album = id_album
+        self.disponible = disponible
+
+
+class ReservasStock:
+
+    def __init__(self, transaccion, ttl=TTL_RESERVA):
+        # `transaccion` es un context manager que entrega un cursor y hace commit/rollback
+        self.transaccion = transaccion
+        self.ttl = ttl
+
+    def reservar(self, id_carrito, id_album, cantidad):
+        """
+        Dejar reservadas `cantidad` unidades (el total del carrito, no un
+        incremento) y renovar el vencimiento. Devuelve las unidades que
+        quedan libres para los demás o lanza StockInsuficiente.
+        """
+        if cantidad <= 0:
+            self.liberar(id_carrito, id_album)
+            return None
+        ahora = time.time()
+        with self.transaccion() as cursor:
+            cursor.execute(SQL_BLOQUEAR_ALBUM, (id_album,))
+            fila = cursor.fetchone()
+            if fila is None:
+                raise StockInsuficiente(f'El álbum {id_album} no existe', id_album, 0)
+            cursor.execute(SQL_PURGAR_ALBUM, (id_album, ahora))
+            cursor.execute(SQL_RESERVADO_POR_OTROS, (id_album, id_carrito, ahora))
+            disponible = int(fila['stock']) - int(cursor.fetchone()['reservado'])
+            if cantidad > disponible:
+                raise StockInsuficiente(
+                    f'Solo hay {max(disponible, 0)} unidades disponibles', id_album, max(disponible, 0)
+                )
+            cursor.execute(SQL_ACTUALIZAR_RESERVA, (cantidad, ahora + self.ttl, id_carrito, id_album))
+            if cursor.rowcount == 0:
+                cursor.execute(SQL_INSERTAR_RESERVA, (id_carrito, id_album, cantidad, ahora + self.ttl))
+        return disponible - cantidad
+
+    def liberar(self, id_carrito, id_album=None):
+        """Soltar la reserva de un álbum, o todas las del carrito"""
+        with self.transaccion() as cursor:
+            if id_album is None:
+                cursor.execute("DELETE FROM tbreserva WHERE id_carrito = %s", (id_carrito,))
+            else:
+                cursor.execute(
+                    "DELETE FROM tbreserva WHERE id_carrito = %s AND id_album = %s",
+                    (id_carrito, id_album)
+                )
+
+    def descontar(self, cursor, id_carrito, cantidades):
+        """
+        Dentro de la transacción de la compra: descontar el stock de cada
+        álbum y consumir las reservas del carrito. Si la reserva ya venció
+        la compra sigue siendo posible mientras no invada reservas ajenas.
+        """
+        ahora = time.time()
+        # Orden fijo de ids para que dos compras simultáneas no se bloqueen mutuamente
+        for id_album in sorted(cantidades):
+            cantidad = cantidades[id_album]
+            cursor.execute(SQL_DESCONTAR_STOCK,
+                           (cantidad, id_album, cantidad, id_album, id_carrito or '', ahora))
+            if cursor.rowcount != 1:
+                raise StockInsuficiente(f'Stock insuficiente para el álbum {id_album}', id_album)
+        if id_carrito:
+            cursor.execute("DELETE FROM tbreserva WHERE id_carrito = %s", (id_carrito,))
@@ -0,0 +1,88 @@
+"""
+Pruebas contra el sustituto SQLite (config/sqlite_local.py).
+
+El entorno se fija antes de importar app: la base, el pool y las caches se
+configuran al importar. Todas las pruebas comparten una base temporal, así
+que cada una crea sus propios clientes con NIT únicos.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+DIRECTORIO = tempfile.mkdtemp(prefix='ventas_pruebas_')
+os.environ.update(
+    DB_MOTOR='sqlite',
+    DB_SQLITE_RUTA=os.path.join(DIRECTORIO, 'ventas.db'),
+    TIEMPOS_RUTAS='0',
+    REPORTES_DIRECTORIO=os.path.join(DIRECTORIO, 'reportes'),
+    # Un hash barato: las pruebas verifican el flujo, no el costo
+    USUARIOS_SCRYPT_N='16',
+    USUARIOS_LARGO_MINIMO_CLAVE='4',
+    # Las versiones se releen en cada petición: lo que hace otro worker se ve al instante
+    PERMISOS_VERIFICAR_VERSION='0',
+    FRAGMENTOS_VERIFICAR_VERSION='0',
+    AUTOCOMPLETAR_RECONSTRUIR_CADA='0',
+    # Como detrás del balanceador: la IP del cliente llega en X-Forwarded-For
+    PROXY_SALTOS='1',
+)
+os.environ.pop('CLIENTES_CACHE_COMPARTIDA', None)
+
+from config import sqlite_local  # noqa: E402
+
+sqlite_local.inicializar(os.environ['DB_SQLITE_RUTA'])
+
+
+@pytest.fixture(scope='session')
+def aplicacion():
+    import app as modulo
+    modulo.app.config['TESTING'] = True
+    return modulo
+
+
+@pytest.fixture
+def cliente_http(aplicacion):
+    return aplicacion.app.test_client()
+
+
+@pytest.fixture
+def admin(aplicacion):
+    """Cliente de pruebas con la sesión de un administrador"""
+    cliente = aplicacion.app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['usuario'] = 'admin'
+        sesion['rol'] = 'administrador'
+        sesion['permisos'] = aplicacion.autorizacion.reclamo(1, 'administrador')
+    return cliente
+
+
+@pytest.fixture
+def nuevo_cliente(aplicacion):
+    """Crear un cliente con NIT único: nuevo_cliente('Nombre') -> id_cliente"""
+
+    def crear(nombre='Cliente de prueba', nit=None):
+        nit = nit or uuid.uuid4().hex[:12]
+        return aplicacion.ejecutar_consulta(
+            "INSERT INTO tbcliente (nombre, nit) VALUES (%s, %s)", (nombre, nit), fetch=False
+        )
+
+    return crear
+
+
+@pytest.fixture
+def nuevas_compras(aplicacion):
+    """Registrar `cantidad` compras directas de un cliente"""
+
+    def crear(id_cliente, cantidad=3, producto='Álbum de prueba - Artista', costo=10):
+        with aplicacion.transaccion() as cursor:
+            cursor.executemany(
+                "INSERT INTO tbcompra (id_cliente, producto, cantidad, costo) VALUES (%s, %s, %s, %s)",
+                [(id_cliente, f'{producto} {i}', 1, costo) for i in range(cantidad)]
+            )
+
+    return crear
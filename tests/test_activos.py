@@ -0,0 +1,61 @@
+import gzip
+import json
+
+from activos import MANIFIESTO, Activos
+
+CSS = 'body { color: #333; }\n' + ''.join(f'.fila-{i} {{ padding: {i}px; }}\n' for i in range(40))
+
+
+def construir(aplicacion, monkeypatch, tmp_path):
+    """Construir los activos de un static/ propio con el comando de la consola"""
+    fuente = tmp_path / 'static'
+    fuente.mkdir()
+    (fuente / 'estilos.css').write_text(CSS)
+    (fuente / 'chico.css').write_text('p { margin: 0; }\n')
+    activos = Activos(str(fuente))
+    monkeypatch.setattr(aplicacion, 'activos', activos)
+    resultado = aplicacion.app.test_cli_runner().invoke(args=['construir-activos'])
+    assert resultado.exit_code == 0, resultado.output
+    return activos
+
+
+def test_construir_con_huella_y_variantes(aplicacion, monkeypatch, tmp_path):
+    activos = construir(aplicacion, monkeypatch, tmp_path)
+    dist = tmp_path / 'static' / 'dist'
+    estilos = activos.manifiesto['estilos.css']
+    assert estilos.startswith('estilos.') and estilos.endswith('.css')
+    assert json.loads((dist / MANIFIESTO).read_text()) == activos.manifiesto
+    assert gzip.decompress((dist / f'{estilos}.gz').read_bytes()).decode() == CSS
+    # Los archivos chicos no se comprimen
+    assert not (dist / f"{activos.manifiesto['chico.css']}.gz").exists()
+
+    # Otro proceso lee el mismo manifiesto
+    otro = Activos(str(tmp_path / 'static'))
+    assert otro.cargar() == activos.manifiesto and otro.huella == activos.huella
+
+    (tmp_path / 'static' / 'estilos.css').write_text(CSS + 'a { color: red; }\n')
+    huella = activos.huella
+    activos.construir()
+    assert activos.manifiesto['estilos.css'] != estilos and activos.huella != huella
+
+
+def test_servir_inmutable_segun_accept_encoding(aplicacion, cliente_http, monkeypatch, tmp_path):
+    activos = construir(aplicacion, monkeypatch, tmp_path)
+    with aplicacion.app.test_request_context():
+        url = activos.url('estilos.css')
+        assert activos.url('logo.png') == '/static/logo.png'
+    assert url == f"/activos/{activos.manifiesto['estilos.css']}"
+
+    comprimida = cliente_http.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert comprimida.status_code == 200
+    assert comprimida.headers['Content-Encoding'] == 'gzip'
+    assert comprimida.mimetype == 'text/css'
+    assert 'immutable' in comprimida.headers['Cache-Control']
+    assert 'Accept-Encoding' in comprimida.headers['Vary']
+    assert gzip.decompress(comprimida.data).decode() == CSS
+
+    plana = cliente_http.get(url, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plana.headers and plana.get_data(as_text=True) == CSS
+
+    faltante = cliente_http.get('/activos/estilos.000000000000.css')
+    assert faltante.status_code == 404 and faltante.mimetype == 'text/plain'
@@ -0,0 +1,89 @@
+import time
+import uuid
+
+from autocompletar import IndiceTrigramas
+
+
+def filas(*clientes):
+    return [{'id_cliente': i, 'nombre': n, 'nit': nit} for i, n, nit in clientes]
+
+
+def test_prefijos_tildes_y_cambios():
+    indice = IndiceTrigramas()
+    indice.construir(filas((1, 'José Pérez', '1001'), (2, 'Josefina Ruiz', '1002'), (3, 'Ana Gómez', '2001')))
+    assert indice.listo
+    assert [c['id_cliente'] for c in indice.buscar('jose')] == [1, 2]
+    assert [c['id_cliente'] for c in indice.buscar('pe jo')] == [1]
+    assert [c['id_cliente'] for c in indice.buscar('200')] == [3]
+
+    indice.actualizar(3, 'Ana Pérez', '2001')
+    indice.quitar(2)
+    assert {c['id_cliente'] for c in indice.buscar('perez')} == {1, 3}
+    assert indice.buscar('josefina') == []
+
+
+def test_cambios_durante_la_construccion_no_se_pisan():
+    indice = IndiceTrigramas()
+    assert indice._empezar_construccion()
+    indice.actualizar(1, 'Nombre Nuevo', '1')
+    indice.quitar(2)
+    indice._recorrer(filas((1, 'Nombre Viejo', '1'), (2, 'Otro Cliente', '2')))
+    assert indice.buscar('viejo') == [] and indice.buscar('otro') == []
+    assert [c['id_cliente'] for c in indice.buscar('nuevo')] == [1]
+
+
+def test_versiones_propias_y_ajenas():
+    indice = IndiceTrigramas()
+    indice.construir(filas((1, 'Ana', '1')), version=5)
+    assert not indice.desactualizado(5)
+
+    # Escrituras propias, aunque lleguen desordenadas
+    indice.marcar_version(7)
+    assert indice.version == 5
+    indice.marcar_version(6)
+    assert indice.version == 7 and not indice.desactualizado(7)
+
+    # La 8 la hizo otro worker: el índice queda atrás hasta reconstruirse
+    indice.marcar_version(9)
+    assert indice.desactualizado(9)
+
+
+def test_otro_worker_cambia_clientes(aplicacion, admin, nuevo_cliente):
+    indice = aplicacion.indice_clientes
+    nombre = f'Remoto{uuid.uuid4().hex[:8]}'
+    admin.get('/autocompletar?q=zz')
+    esperar_construccion(indice)
+    construcciones = indice.construcciones
+
+    # Escritura propia: el índice se actualiza sin reconstruir
+    admin.post('/insertar', data={'txtnombre': f'Local {nombre}', 'txtnit': uuid.uuid4().hex[:12]})
+    admin.get('/autocompletar?q=zz')
+    esperar_construccion(indice)
+    assert indice.construcciones == construcciones
+
+    # Escritura de otro worker: sólo se entera por tbcliente_version
+    nuevo_cliente(f'Ajeno {nombre}')
+    aplicacion.ejecutar_consulta("UPDATE tbcliente_version SET version = version + 1 WHERE id = 1",
+                                 fetch=False)
+    admin.get('/autocompletar?q=zz')
+    esperar_construccion(indice)
+    assert indice.construcciones == construcciones + 1
+    encontrados = admin.get(f'/autocompletar?q={nombre}').get_json()['resultados']
+    assert sorted(c['nombre'] for c in encontrados) == [f'Ajeno {nombre}', f'Local {nombre}']
+
+
+def esperar_construccion(indice, segundos=5):
+    fin = time.monotonic() + segundos
+    while (indice._construyendo or not indice.listo) and time.monotonic() < fin:
+        time.sleep(0.01)
+
+
+def test_cada_palabra_es_prefijo_de_una_palabra():
+    indice = IndiceTrigramas()
+    indice.construir(filas((1, 'Juan Alberto', '11'), (2, 'Juana Salas', '12'),
+                           (3, 'Ana Pérez', '13'), (4, 'Pedro Martínez Díaz', '14')))
+    assert [c['id_cliente'] for c in indice.buscar('juan al')] == [1]
+    # "an" y "ez" están dentro de otras palabras, pero no al principio
+    assert [c['id_cliente'] for c in indice.buscar('juan an')] == []
+    assert indice.buscar('ez') == []
+    assert [c['id_cliente'] for c in indice.buscar('mart di')] == [4]
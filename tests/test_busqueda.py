@@ -0,0 +1,63 @@
+import random
+import uuid
+
+from busqueda import buscar_clientes, escapar_like, normalizar_nit
+
+
+def palabra():
+    return 'Zz' + uuid.uuid4().hex[:8]
+
+
+def ids(clientes):
+    return [c['id_cliente'] for c in clientes]
+
+
+def test_nit_se_guarda_normalizado_y_se_busca_por_prefijo(aplicacion, admin):
+    base = str(random.randint(10 ** 8, 10 ** 9 - 1))
+    formateado = f'{base[:3]}.{base[3:6]}.{base[6:]}-1'
+    admin.post('/insertar', data={'txtnombre': 'Con puntos', 'txtnit': formateado})
+    admin.post('/insertar', data={'txtnombre': 'Más largo', 'txtnit': f'{base}-12'})
+
+    guardado = aplicacion.ejecutar_consulta(
+        "SELECT nit FROM tbcliente WHERE nombre = %s AND nit LIKE %s", ('Con puntos', base + '%'))
+    assert [f['nit'] for f in guardado] == [f'{base}-1']
+
+    # Con o sin puntos es el mismo NIT: primero la coincidencia exacta, luego los prefijos
+    for texto in (formateado, f'{base}-1'):
+        encontrados = buscar_clientes(texto, aplicacion.ejecutar_consulta)
+        assert [c['nit'] for c in encontrados] == [f'{base}-1', f'{base}-12']
+
+    # El mismo NIT con otro formato es un duplicado
+    respuesta = admin.post('/insertar', data={'txtnombre': 'Copia', 'txtnit': f'{base}-1'},
+                           follow_redirects=True)
+    assert f'Ya existe un cliente con el NIT: {base}-1'.encode() in respuesta.data
+
+
+def test_palabras_cortas_junto_a_fulltext(aplicacion, nuevo_cliente):
+    comun = palabra()
+    alberto = nuevo_cliente(f'{comun} Al Ramos')
+    beto = nuevo_cliente(f'{comun} Beto Ramos')
+
+    assert set(ids(buscar_clientes(comun, aplicacion.ejecutar_consulta))) == {alberto, beto}
+    # "al" es más corto que el mínimo de FULLTEXT: antes se descartaba y salían los dos
+    assert ids(buscar_clientes(f'{comun.lower()} al', aplicacion.ejecutar_consulta)) == [alberto]
+    assert ids(buscar_clientes(f'ra {comun}', aplicacion.ejecutar_consulta)) == [alberto, beto]
+
+
+def test_comodines_de_like_son_literales(aplicacion, nuevo_cliente):
+    comun = palabra()
+    literal = nuevo_cliente(f'{comun} a_b')
+    nuevo_cliente(f'{comun} axb')
+    assert ids(buscar_clientes(f'{comun} a_', aplicacion.ejecutar_consulta)) == [literal]
+
+    # Sólo palabras cortas: prefijo del nombre completo
+    sufijo = uuid.uuid4().hex[:6]
+    porcentaje = nuevo_cliente(f'q% {sufijo}')
+    otro = nuevo_cliente(f'qx {sufijo}')
+    encontrados = ids(buscar_clientes('q%', aplicacion.ejecutar_consulta))
+    assert porcentaje in encontrados and otro not in encontrados
+
+
+def test_normalizar_y_escapar():
+    assert normalizar_nit('1.234 567-8') == '1234567-8'
+    assert escapar_like('50%_\\') == '50\\%\\_\\\\'
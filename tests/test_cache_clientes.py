@@ -0,0 +1,43 @@
+import threading
+
+from cache_clientes import CacheClientes
+
+
+def test_carga_anterior_a_una_invalidacion_no_se_guarda():
+    filas = {1: {'id_cliente': 1, 'nombre': 'Viejo'}}
+    leyendo, seguir = threading.Event(), threading.Event()
+
+    def cargar(id_cliente):
+        fila = dict(filas[id_cliente])
+        if not seguir.is_set():
+            leyendo.set()
+            seguir.wait(2)
+        return fila
+
+    cache = CacheClientes(cargar)
+    lector = threading.Thread(target=cache.obtener, args=(1,))
+    lector.start()
+    leyendo.wait(2)
+    # La escritura termina mientras el lector todavía tiene la fila vieja en la mano
+    filas[1] = {'id_cliente': 1, 'nombre': 'Nuevo'}
+    cache.invalidar(1)
+    seguir.set()
+    lector.join(2)
+
+    assert cache.obtener(1)['nombre'] == 'Nuevo'
+
+
+def test_fila_cargada_se_reutiliza():
+    cargas = []
+
+    def cargar(id_cliente):
+        cargas.append(id_cliente)
+        return {'id_cliente': id_cliente}
+
+    cache = CacheClientes(cargar)
+    cache.obtener(5)
+    cache.obtener(5)
+    assert cargas == [5]
+    cache.invalidar(5)
+    cache.obtener(5)
+    assert cargas == [5, 5]
@@ -0,0 +1,43 @@
+import random
+
+from catalogo import CatalogoIndexado
+
+
+def nuevo_album(aplicacion, precio):
+    id_album = random.randint(10 ** 6, 10 ** 9)
+    aplicacion.ejecutar_consulta(
+        "INSERT INTO tbalbum (id_album, nombre, artista, tipo, precio, stock) VALUES (%s, %s, %s, %s, %s, %s)",
+        (id_album, 'Álbum del catálogo', 'Artista', 'Álbum', precio, 5), fetch=False
+    )
+    return id_album
+
+
+def cambiar_precio(aplicacion, id_album, precio, subir_version):
+    with aplicacion.transaccion() as cursor:
+        cursor.execute("UPDATE tbalbum SET precio = %s WHERE id_album = %s", (precio, id_album))
+        if subir_version:
+            cursor.execute("UPDATE tbcatalogo_version SET version = version + 1 WHERE id = 1")
+
+
+def test_recarga_al_cambiar_la_version(aplicacion):
+    id_album = nuevo_album(aplicacion, 10)
+    catalogo = CatalogoIndexado(aplicacion.ejecutar_consulta, ttl=3600, intervalo_version=0)
+    assert catalogo.obtener(id_album)['precio'] == 10.0
+    assert 'stock' not in catalogo.obtener(id_album)
+
+    # Sin subir la versión la instantánea sigue sirviendo hasta el TTL
+    cambiar_precio(aplicacion, id_album, 12, subir_version=False)
+    assert catalogo.obtener(id_album)['precio'] == 10.0
+
+    version = catalogo.version()
+    cambiar_precio(aplicacion, id_album, 15, subir_version=True)
+    assert catalogo.obtener(id_album)['precio'] == 15.0
+    assert catalogo.version() == version + 1
+
+
+def test_recarga_al_vencer_el_ttl(aplicacion):
+    id_album = nuevo_album(aplicacion, 20)
+    catalogo = CatalogoIndexado(aplicacion.ejecutar_consulta, ttl=0, intervalo_version=3600)
+    assert catalogo.obtener(id_album)['precio'] == 20.0
+    cambiar_precio(aplicacion, id_album, 22, subir_version=False)
+    assert catalogo.obtener(id_album)['precio'] == 22.0
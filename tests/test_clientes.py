@@ -0,0 +1,68 @@
+import uuid
+
+
+def test_paginacion_por_clave(aplicacion, nuevo_cliente):
+    prefijo = 'Zzpag' + uuid.uuid4().hex[:6]
+    ids = [nuevo_cliente(f'{prefijo} {i:02d}') for i in range(7)]
+    # La clave (prefijo, 0) queda justo antes del primer cliente creado
+    vistos, despues = [], (prefijo, 0)
+    while True:
+        pagina, siguiente, _ = aplicacion.obtener_clientes(despues=despues, limite=3)
+        vistos += [c['id_cliente'] for c in pagina if c['nombre'].startswith(prefijo)]
+        if not siguiente or not all(c['nombre'].startswith(prefijo) for c in pagina):
+            break
+        despues = aplicacion.decodificar_cursor(siguiente)
+    assert vistos == ids
+
+    # Volver atrás desde la segunda página devuelve la primera
+    segunda, _, anterior = aplicacion.obtener_clientes(
+        despues=aplicacion.decodificar_cursor(aplicacion.codificar_cursor(f'{prefijo} 02', ids[2])),
+        limite=3)
+    primera, _, _ = aplicacion.obtener_clientes(antes=aplicacion.decodificar_cursor(anterior), limite=3)
+    assert [c['id_cliente'] for c in segunda] == ids[3:6]
+    assert [c['id_cliente'] for c in primera] == ids[:3]
+
+
+def test_cursor_no_valido():
+    import app
+    assert app.decodificar_cursor('no-es-un-cursor') is None
+    assert app.decodificar_cursor(app.codificar_cursor('José', 7)) == ('José', 7)
+
+
+def test_insertar_nit_duplicado(admin, nuevo_cliente):
+    nit = uuid.uuid4().hex[:12]
+    nuevo_cliente('Original', nit)
+    respuesta = admin.post('/insertar', data={'txtnombre': 'Copia', 'txtnit': nit},
+                           follow_redirects=True)
+    assert f'Ya existe un cliente con el NIT: {nit}'.encode() in respuesta.data
+
+
+def test_actualizar_invalida_la_cache(aplicacion, admin, nuevo_cliente):
+    id_cliente = nuevo_cliente('Antes')
+    assert aplicacion.cache_clientes.obtener(id_cliente)['nombre'] == 'Antes'
+    admin.post('/actualizar_cliente', data={'id_cliente': id_cliente, 'txtnombre': 'Después',
+                                            'txtnit': uuid.uuid4().hex[:12]})
+    assert aplicacion.cache_clientes.obtener(id_cliente)['nombre'] == 'Después'
+
+
+def version_en_base(aplicacion):
+    return aplicacion.ejecutar_consulta("SELECT version FROM tbcliente_version WHERE id = 1")[0]['version']
+
+
+def test_version_sube_en_la_transaccion_de_la_escritura(aplicacion, admin, nuevo_cliente):
+    nit = uuid.uuid4().hex[:12]
+    inicial = version_en_base(aplicacion)
+    admin.post('/insertar', data={'txtnombre': 'Versionado', 'txtnit': nit})
+    assert version_en_base(aplicacion) == inicial + 1
+
+    # Un NIT repetido deshace también el incremento
+    admin.post('/insertar', data={'txtnombre': 'Repetido', 'txtnit': nit})
+    assert version_en_base(aplicacion) == inicial + 1
+
+    # Actualizar un cliente que no existe no toca la versión
+    admin.post('/actualizar_cliente', data={'id_cliente': 10 ** 9, 'txtnombre': 'Nadie',
+                                            'txtnit': uuid.uuid4().hex[:12]})
+    assert version_en_base(aplicacion) == inicial + 1
+
+    admin.get(f'/eliminar/{nuevo_cliente()}')
+    assert version_en_base(aplicacion) == inicial + 2
@@ -0,0 +1,83 @@
+import io
+import sys
+import uuid
+
+import pytest
+
+import clientes_csv
+from clientes_csv import Importacion
+
+
+def test_importar_informa_errores_por_linea(aplicacion, admin, nuevo_cliente):
+    existente = uuid.uuid4().hex[:12]
+    nuevo_cliente('Ya registrado', existente)
+    nits = [uuid.uuid4().hex[:12] for _ in range(3)]
+    contenido = '\n'.join([
+        'nit,nombre',
+        f'{nits[0]},Ana Pérez',
+        f'{existente},Duplicado en la base',
+        f'{nits[1]},',
+        f'{nits[0]},Repetido en el archivo',
+        f'{nits[2]},X',
+        '',
+    ]).encode('utf-8')
+
+    respuesta = admin.post('/importar?formato=json',
+                           data={'archivo': (io.BytesIO(contenido), 'clientes.csv')})
+    resultado = respuesta.get_json()
+
+    assert resultado['leidas'] == 5 and resultado['insertados'] == 1
+    errores = {e['linea']: e['error'] for e in resultado['errores']}
+    assert errores == {
+        3: f'Ya existe un cliente con el NIT: {existente}',
+        4: 'Nombre y NIT son obligatorios',
+        5: 'NIT repetido en el archivo (línea 2)',
+        6: 'El nombre debe tener al menos 2 caracteres',
+    }
+    # El cliente importado ya aparece en el autocompletar
+    assert any(c['nit'] == nits[0] for c in aplicacion.indice_clientes.buscar(nits[0]))
+
+
+def test_lote_fallido_se_reintenta_fila_por_fila(aplicacion):
+    nits = [uuid.uuid4().hex[:12] for _ in range(3)]
+    llamadas = []
+
+    def transaccion_con_carrera():
+        # Otro proceso inserta el segundo NIT entre la consulta y el INSERT del lote
+        llamadas.append(1)
+        if len(llamadas) == 2:
+            aplicacion.ejecutar_consulta("INSERT INTO tbcliente (nombre, nit) VALUES (%s, %s)",
+                                         ('Concurrente', nits[1]), fetch=False)
+        return aplicacion.transaccion()
+
+    filas = [(i + 1, f'Cliente {i}', nit) for i, nit in enumerate(nits)]
+    resultado = Importacion(transaccion_con_carrera).importar(filas)
+    assert resultado['insertados'] == 2
+    assert [e['linea'] for e in resultado['errores']] == [2]
+
+
+def test_exportar_en_streaming(admin, nuevo_cliente):
+    nit = uuid.uuid4().hex[:12]
+    nuevo_cliente('Exportado Ñandú', nit)
+    respuesta = admin.get('/exportar/clientes.csv')
+    texto = respuesta.get_data().decode('utf-8')
+    assert texto.startswith('\ufeffid_cliente,nombre,nit')
+    assert f'Exportado Ñandú,{nit}' in texto
+
+
+def test_importar_desde_la_consola_sube_la_version(aplicacion, admin, tmp_path, monkeypatch):
+    # Sin mensajes pendientes "/" responde con ETag
+    admin.get('/')
+    etag = admin.get('/').headers['ETag']
+    version = aplicacion.version_clientes.actual()
+
+    nit = uuid.uuid4().hex[:12]
+    archivo = tmp_path / 'clientes.csv'
+    archivo.write_text(f'nombre,nit\nDesde Consola,{nit}\n', encoding='utf-8')
+    monkeypatch.setattr(sys, 'argv', ['clientes_csv.py', 'importar', str(archivo)])
+    with pytest.raises(SystemExit) as salida:
+        clientes_csv.main()
+    assert salida.value.code == 0
+
+    assert aplicacion.version_clientes.actual() == version + 1
+    assert admin.get('/', headers={'If-None-Match': etag}).status_code == 200
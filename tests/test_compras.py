@@ -0,0 +1,140 @@
+import random
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from reservas import StockInsuficiente
+
+
+@pytest.fixture
+def album(aplicacion):
+    """Álbum propio con 5 unidades: (id_album, item de carrito)"""
+    id_album = random.randint(10 ** 6, 10 ** 9)
+    aplicacion.ejecutar_consulta(
+        "INSERT INTO tbalbum (id_album, nombre, artista, tipo, precio, stock) VALUES (%s, %s, %s, %s, %s, %s)",
+        (id_album, 'Álbum de prueba', 'Artista', 'Álbum', 10, 5), fetch=False
+    )
+    return id_album, {'id': id_album, 'nombre': 'Álbum de prueba', 'artista': 'Artista', 'precio': 10}
+
+
+def stock(aplicacion, id_album):
+    return aplicacion.ejecutar_consulta("SELECT stock FROM tbalbum WHERE id_album = %s", (id_album,))[0]['stock']
+
+
+def compras_de(aplicacion, id_cliente):
+    return aplicacion.ejecutar_consulta(
+        "SELECT COUNT(*) AS n FROM tbcompra WHERE id_cliente = %s", (id_cliente,))[0]['n']
+
+
+def reservadas(aplicacion, id_carrito):
+    return aplicacion.ejecutar_consulta(
+        "SELECT COUNT(*) AS n FROM tbreserva WHERE id_carrito = %s", (id_carrito,))[0]['n']
+
+
+def test_token_repetido_no_duplica_la_compra(aplicacion, nuevo_cliente, album):
+    id_album, item = album
+    id_cliente = nuevo_cliente()
+    token = uuid.uuid4().hex
+    carrito = [dict(item, cantidad=2)]
+
+    assert aplicacion.registrar_compra(id_cliente, carrito, token) is True
+    assert aplicacion.registrar_compra(id_cliente, carrito, token) is False
+    assert compras_de(aplicacion, id_cliente) == 1
+    assert stock(aplicacion, id_album) == 3
+
+
+def test_stock_insuficiente_deshace_todo(aplicacion, nuevo_cliente, album):
+    id_album, item = album
+    id_cliente = nuevo_cliente()
+    with pytest.raises(StockInsuficiente):
+        aplicacion.registrar_compra(id_cliente, [dict(item, cantidad=6)], uuid.uuid4().hex)
+    assert compras_de(aplicacion, id_cliente) == 0
+    assert stock(aplicacion, id_album) == 5
+
+
+def test_reservas_de_otros_carritos_descuentan_disponible(aplicacion, album):
+    id_album, _ = album
+    reservas = aplicacion.reservas
+    assert reservas.reservar('carrito-a', id_album, 3) == 2
+    with pytest.raises(StockInsuficiente) as error:
+        reservas.reservar('carrito-b', id_album, 3)
+    assert error.value.disponible == 2
+
+    # La reserva es el total del carrito: volver a reservar no suma
+    assert reservas.reservar('carrito-a', id_album, 4) == 1
+    reservas.liberar('carrito-a')
+    assert reservas.reservar('carrito-b', id_album, 5) == 0
+
+
+def test_compra_consume_la_reserva_propia(aplicacion, nuevo_cliente, album):
+    id_album, item = album
+    id_cliente = nuevo_cliente()
+    aplicacion.reservas.reservar('carrito-c', id_album, 2)
+    aplicacion.reservas.reservar('carrito-d', id_album, 2)
+
+    # Sin la reserva de carrito-c no alcanza: 5 - 2 (carrito-d) = 3 < 4
+    with pytest.raises(StockInsuficiente):
+        aplicacion.registrar_compra(id_cliente, [dict(item, cantidad=4)], uuid.uuid4().hex, 'carrito-x')
+    assert aplicacion.registrar_compra(id_cliente, [dict(item, cantidad=2)], uuid.uuid4().hex, 'carrito-c')
+    assert stock(aplicacion, id_album) == 3
+    assert aplicacion.ejecutar_consulta(
+        "SELECT COUNT(*) AS n FROM tbreserva WHERE id_carrito = %s", ('carrito-c',))[0]['n'] == 0
+
+
+def test_doble_envio_libera_las_reservas(aplicacion, admin, nuevo_cliente, album):
+    id_album, _ = album
+    aplicacion.catalogo.invalidar()
+    id_cliente = nuevo_cliente()
+    token = uuid.uuid4().hex
+
+    admin.post('/agregar_carrito', data={'id': id_album, 'cantidad': 2})
+    admin.post(f'/finalizar_compra/{id_cliente}', data={'token_compra': token})
+    assert stock(aplicacion, id_album) == 3
+
+    # El formulario viejo se reenvía con otro carrito ya reservado
+    admin.post('/agregar_carrito', data={'id': id_album, 'cantidad': 3})
+    with admin.session_transaction() as sesion:
+        id_carrito = sesion['carrito_id']
+    assert reservadas(aplicacion, id_carrito) == 1
+    respuesta = admin.post(f'/finalizar_compra/{id_cliente}', data={'token_compra': token},
+                           follow_redirects=True)
+    assert 'Esta compra ya había sido registrada' in respuesta.get_data(as_text=True)
+    assert reservadas(aplicacion, id_carrito) == 0
+    assert stock(aplicacion, id_album) == 3 and compras_de(aplicacion, id_cliente) == 1
+
+
+def test_resumen_de_compras_paginado(aplicacion, nuevo_cliente, nuevas_compras):
+    id_cliente = nuevo_cliente()
+    nuevas_compras(id_cliente, 5, costo='12.50')
+    resumen, por_producto, pagina, siguiente = aplicacion.obtener_resumen_compras(id_cliente, limite=3)
+    assert resumen['num_compras'] == 5
+    assert float(resumen['total']) == 62.5
+    assert len(por_producto) == 5 and len(pagina) == 3
+    _, _, resto, fin = aplicacion.obtener_resumen_compras(id_cliente, antes=siguiente, limite=3)
+    assert len(resto) == 2 and fin is None
+
+
+def test_totales_en_decimal_exacto(aplicacion, nuevo_cliente):
+    id_cliente = nuevo_cliente()
+    with aplicacion.transaccion() as cursor:
+        cursor.executemany(
+            "INSERT INTO tbcompra (id_cliente, producto, cantidad, costo) VALUES (%s, %s, %s, %s)",
+            [(id_cliente, f'Producto {i}', 3, '9.99') for i in range(10)]
+        )
+    resumen, por_producto, pagina, _ = aplicacion.obtener_resumen_compras(id_cliente, limite=5)
+
+    # En float la suma sería 299.70000000000005
+    assert isinstance(resumen['total'], Decimal) and resumen['total'] == Decimal('299.70')
+    assert {f['subtotal'] for f in por_producto} == {Decimal('29.97')}
+    assert all(f['costo'] == Decimal('9.99') and f['subtotal'] == Decimal('29.97') for f in pagina)
+    assert str(pagina[0]['subtotal']) == '29.97'
+
+
+def test_stock_insuficiente_no_se_registra_como_error_de_base(aplicacion, album, caplog):
+    id_album, _ = album
+    aplicacion.reservas.reservar('carrito-e', id_album, 5)
+    with caplog.at_level('ERROR', logger=aplicacion.logger.name):
+        with pytest.raises(StockInsuficiente):
+            aplicacion.reservas.reservar('carrito-f', id_album, 1)
+    assert 'Error en transacción DB' not in caplog.text
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import mysql.connector
+import pytest
+
+from config.conexion import PoolAgotado, PoolConexiones
+
+
+class ConexionFalsa:
+
+    def __init__(self):
+        self.cerrada = False
+        self.chequeos = 0
+
+    def is_connected(self):
+        self.chequeos += 1
+        return not self.cerrada
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        pass
+
+    def close(self):
+        self.cerrada = True
+
+
+def test_reutiliza_la_ultima_conexion_devuelta():
+    pool = PoolConexiones(ConexionFalsa, tamano=2)
+    primera, _ = pool.tomar()
+    segunda, _ = pool.tomar()
+    pool.devolver(primera)
+    pool.devolver(segunda)
+    assert pool.tomar()[0] is segunda
+    assert pool.metricas()['creadas'] == 2
+
+
+def test_agotado_tras_la_espera():
+    pool = PoolConexiones(ConexionFalsa, tamano=1, espera_maxima=0.05)
+    pool.tomar()
+    with pytest.raises(PoolAgotado):
+        pool.tomar()
+    assert pool.metricas()['agotado'] == 1
+
+
+def test_descartar_despierta_a_quien_espera():
+    pool = PoolConexiones(ConexionFalsa, tamano=1, espera_maxima=5)
+    conexion, _ = pool.tomar()
+    resultado = {}
+
+    def esperar():
+        resultado['conexion'], resultado['espera'] = pool.tomar()
+
+    hilo = threading.Thread(target=esperar)
+    hilo.start()
+    time.sleep(0.1)
+    pool.devolver(conexion, descartar=True)
+    hilo.join(2)
+
+    assert not hilo.is_alive()
+    assert resultado['conexion'] is not conexion
+    assert resultado['espera'] < 2
+    metricas = pool.metricas()
+    assert metricas['descartadas'] == 1 and metricas['esperas'] == 1 and metricas['creadas'] == 1
+
+
+def test_solo_los_errores_de_conexion_comprueban_la_conexion():
+    pool = PoolConexiones(ConexionFalsa, tamano=1)
+    with pytest.raises(ValueError):
+        with pool.conexion() as conexion:
+            raise ValueError('dato no válido')
+    assert conexion.chequeos == 0
+    assert pool.metricas()['libres'] == 1
+
+    with pytest.raises(mysql.connector.errors.InterfaceError):
+        with pool.conexion() as conexion:
+            conexion.cerrada = True
+            raise mysql.connector.errors.InterfaceError('Lost connection')
+    assert conexion.chequeos == 1
+    metricas = pool.metricas()
+    assert metricas['descartadas'] == 1 and metricas['creadas'] == 0
@@ -0,0 +1,36 @@
+import os
+import runpy
+
+from conftest import RAIZ
+
+CONFIGURACION = os.path.join(RAIZ, 'gunicorn.conf.py')
+
+
+def cargar(monkeypatch, **variables):
+    """Leer gunicorn.conf.py con un entorno propio, sin tocar el de las pruebas"""
+    entorno = {k: v for k, v in os.environ.items()
+               if not k.startswith(('GUNICORN_', 'DB_POOL_SIZE', 'CARRITO_', 'CLIENTES_CACHE'))}
+    entorno.update(variables)
+    monkeypatch.setattr(os, 'environ', entorno)
+    return runpy.run_path(CONFIGURACION), entorno
+
+
+def test_pool_con_margen_sobre_los_hilos(monkeypatch):
+    config, entorno = cargar(monkeypatch, GUNICORN_WORKERS='3', GUNICORN_THREADS='4')
+    assert config['worker_class'] == 'gthread' and config['preload_app'] is True
+    assert (config['workers'], config['threads']) == (3, 4)
+    # Un hilo por petición más los hilos de fondo (índice, reportes masivos)
+    assert entorno['DB_POOL_SIZE'] == '6'
+    # Varios workers: carritos e invalidaciones compartidos
+    assert entorno['CARRITO_ALMACEN'] == 'sqlite'
+    assert entorno['CLIENTES_CACHE_COMPARTIDA'] == 'cache_clientes.db'
+
+
+def test_valores_explicitos_y_workers_sync(monkeypatch):
+    _, entorno = cargar(monkeypatch, GUNICORN_WORKER_CLASS='sync', GUNICORN_WORKERS='1',
+                        GUNICORN_POOL_MARGEN='1')
+    assert entorno['DB_POOL_SIZE'] == '2'
+    assert 'CARRITO_ALMACEN' not in entorno
+
+    _, entorno = cargar(monkeypatch, GUNICORN_THREADS='8', DB_POOL_SIZE='20')
+    assert entorno['DB_POOL_SIZE'] == '20'
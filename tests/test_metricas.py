@@ -0,0 +1,83 @@
+import logging
+
+from flask import Flask, redirect
+
+from metricas_db import RegistroConsultas
+from metricas_http import HistogramaHDR, TiemposRutas
+
+
+def test_metrics_solo_desde_la_maquina_o_con_token(aplicacion, cliente_http, monkeypatch):
+    monkeypatch.delenv('METRICAS_TOKEN', raising=False)
+    local = cliente_http.get('/metrics')
+    assert local.status_code == 200
+    assert '# TYPE db_consulta_segundos histogram' in local.get_data(as_text=True)
+
+    remota = cliente_http.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.9'})
+    # Un proxy en la misma máquina reenvía peticiones de afuera
+    reenviada = cliente_http.get('/metrics', headers={'X-Forwarded-For': '203.0.113.9'})
+    assert remota.status_code == 401 and reenviada.status_code == 401
+
+    monkeypatch.setenv('METRICAS_TOKEN', 'secreto')
+    assert cliente_http.get('/metrics').status_code == 401
+    con_token = cliente_http.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.9'},
+                                 headers={'Authorization': 'Bearer secreto'})
+    assert con_token.status_code == 200
+
+
+def test_listo_no_muestra_el_error_de_la_base(aplicacion, cliente_http, monkeypatch, caplog):
+    assert cliente_http.get('/listo').get_json() == {'estado': 'ok', 'db': 'ok'}
+
+    detalle = "Access denied for user 'ventas'@'10.0.0.5'"
+    monkeypatch.setattr(aplicacion, 'verificar_db', lambda: (False, detalle))
+    with caplog.at_level(logging.WARNING):
+        respuesta = cliente_http.get('/listo')
+    assert respuesta.status_code == 503
+    assert respuesta.get_json() == {'estado': 'error', 'db': 'error'}
+    assert detalle in caplog.text
+
+
+def test_consulta_lenta_sin_valores_de_parametros(caplog):
+    registro = RegistroConsultas(umbral_lenta=0)
+    with caplog.at_level(logging.WARNING, logger='consultas_lentas'):
+        registro.registrar("SELECT * FROM tbcliente WHERE nit = %s AND id_cliente IN (%s, %s)",
+                           ('123-4', 7, 8), 0.3, filas=1, ruta='buscar')
+    assert 'IN (...)' in caplog.text and '<str:5>' in caplog.text and '123-4' not in caplog.text
+
+    texto = registro.exportar_prometheus()
+    assert 'db_consultas_lentas_total 1' in texto
+    assert 'db_consulta_filas_total{ruta="buscar"' in texto
+
+
+def test_error_interno_cuenta_aunque_se_redirija():
+    app = Flask('prueba_tiempos')
+    tiempos = TiemposRutas()
+    tiempos.instalar(app)
+
+    @app.route('/falla')
+    def falla():
+        raise RuntimeError('sin base de datos')
+
+    @app.route('/bien')
+    def bien():
+        return 'ok'
+
+    # Como el manejador de app.py: el 500 se convierte en una redirección
+    app.register_error_handler(500, lambda e: redirect('/bien'))
+
+    cliente = app.test_client()
+    assert cliente.get('/falla').status_code == 302
+    respuesta = cliente.get('/bien')
+    assert 'total;dur=' in respuesta.headers['Server-Timing']
+
+    resumen = tiempos.resumen()
+    assert resumen['falla']['errores'] == 1 and resumen['bien']['errores'] == 0
+    assert 'http_errores_total{ruta="falla"} 1' in tiempos.exportar_prometheus()
+
+
+def test_percentiles_del_histograma():
+    histograma = HistogramaHDR()
+    for ms in range(1, 1001):
+        histograma.registrar(ms / 1000)
+    percentiles = HistogramaHDR.percentiles((histograma,))
+    for p, esperado in ((0.5, 0.5), (0.95, 0.95), (0.99, 0.99)):
+        assert abs(percentiles[p] - esperado) / esperado < 0.016
@@ -0,0 +1,87 @@
+import re
+
+from reportes import generar_pdf_en_streaming
+
+
+def test_etag_y_304(admin, nuevo_cliente, nuevas_compras):
+    id_cliente = nuevo_cliente('Cliente Reporte')
+    nuevas_compras(id_cliente, 3)
+
+    primera = admin.get(f'/reporte/{id_cliente}')
+    assert primera.status_code == 200 and primera.data.startswith(b'%PDF')
+    etag = primera.headers['ETag']
+
+    repetida = admin.get(f'/reporte/{id_cliente}', headers={'If-None-Match': etag})
+    assert repetida.status_code == 304 and repetida.data == b''
+
+    # Una compra nueva cambia la huella y por tanto el PDF
+    nuevas_compras(id_cliente, 1)
+    cambiada = admin.get(f'/reporte/{id_cliente}', headers={'If-None-Match': etag})
+    assert cambiada.status_code == 200 and cambiada.headers['ETag'] != etag
+
+
+def test_etag_no_cambia_al_regenerar_el_pdf(aplicacion, admin, nuevo_cliente, nuevas_compras,
+                                            monkeypatch):
+    id_cliente = nuevo_cliente('Cliente Regenerado')
+    nuevas_compras(id_cliente, 2)
+    original, generados = aplicacion.construir_pdf, []
+
+    def construir_pdf(*args):
+        # Como la fecha de creación de FPDF: cada generación da otros bytes
+        pdf = original(*args) + b'%% %d\n' % len(generados)
+        generados.append(pdf)
+        return pdf
+
+    monkeypatch.setattr(aplicacion, 'construir_pdf', construir_pdf)
+
+    primera = admin.get(f'/reporte/{id_cliente}')
+    # Otro worker, o la entrada expulsada de la cache: el PDF se vuelve a generar
+    aplicacion.cache_reportes.invalidar(id_cliente)
+    segunda = admin.get(f'/reporte/{id_cliente}')
+    assert len(generados) == 2 and generados[0] != generados[1]
+    assert primera.headers['ETag'] == segunda.headers['ETag']
+
+    aplicacion.cache_reportes.invalidar(id_cliente)
+    repetida = admin.get(f'/reporte/{id_cliente}', headers={'If-None-Match': primera.headers['ETag']})
+    assert repetida.status_code == 304 and len(generados) == 2
+
+
+def test_streaming_con_etag_debil(admin, nuevo_cliente, nuevas_compras):
+    id_cliente = nuevo_cliente('Cliente Streaming')
+    nuevas_compras(id_cliente, 5)
+    respuesta = admin.get(f'/reporte/{id_cliente}?modo=streaming')
+    assert respuesta.status_code == 200
+    etag = respuesta.headers['ETag']
+    assert etag.startswith('W/')
+    assert admin.get(f'/reporte/{id_cliente}?modo=streaming',
+                     headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_pdf_en_streaming_tiene_xref_valida():
+    compras = ({'producto': f'Producto {i}', 'cantidad': 1, 'costo': 2.5} for i in range(150))
+    pdf = b''.join(generar_pdf_en_streaming('Ana (Pérez)', '123', compras, filas_por_envio=20))
+
+    assert pdf.startswith(b'%PDF-1.3') and pdf.endswith(b'%%EOF\n')
+    inicio_xref = int(re.search(rb'startxref\n(\d+)\n', pdf).group(1))
+    assert pdf[inicio_xref:].startswith(b'xref\n')
+    total = int(re.search(rb'xref\n0 (\d+)\n', pdf).group(1))
+    entradas = pdf[inicio_xref:].split(b'\n')[3:3 + total - 1]
+    for numero, entrada in enumerate(entradas, 1):
+        offset = int(entrada[:10])
+        assert pdf[offset:].startswith(b'%d 0 obj' % numero)
+    # 150 filas no caben en una página
+    assert int(re.search(rb'/Count (\d+)', pdf).group(1)) > 1
+
+
+def test_cambio_de_nombre_en_otro_worker_invalida_el_pdf(aplicacion, admin, nuevo_cliente, nuevas_compras):
+    id_cliente = nuevo_cliente('Nombre Original')
+    nuevas_compras(id_cliente, 2)
+    etag = admin.get(f'/reporte/{id_cliente}').headers['ETag']
+
+    # Otro worker renombra al cliente: la cache de reportes de este proceso no se entera
+    aplicacion.ejecutar_consulta("UPDATE tbcliente SET nombre = %s WHERE id_cliente = %s",
+                                 ('Nombre Nuevo', id_cliente), fetch=False)
+    respuesta = admin.get(f'/reporte/{id_cliente}', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers['ETag'] != etag
+    assert 'Nombre_Nuevo' in respuesta.headers['Content-Disposition']
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import RAIZ
+from reportes_masivos import ColaReportes
+
+
+@pytest.mark.parametrize('procesos', ['abc', '0', '-3', '2.5'])
+def test_procesos_no_validos(admin, procesos):
+    respuesta = admin.post('/reportes/masivo', data={'formato': 'zip', 'procesos': procesos})
+    assert respuesta.status_code == 400
+
+
+def test_procesos_acotados_por_la_configuracion(tmp_path):
+    cola = ColaReportes(directorio_base=str(tmp_path), procesos=2)
+    assert cola.crear_trabajo(procesos=1000)['procesos'] == 2
+    assert cola.crear_trabajo(procesos=1)['procesos'] == 1
+    assert cola.crear_trabajo()['procesos'] == 2
+
+
+# Se ejecuta en un proceso aparte: importar asgi cambia el pool de todo el proceso
+GUION_ASGI = r"""
+import asyncio, json, sys, threading
+import asgi
+from config.conexion_async import fijar_bucle
+from reportes_masivos import ColaReportes
+
+bucle = asyncio.new_event_loop()
+threading.Thread(target=bucle.run_forever, daemon=True).start()
+fijar_bucle(bucle)
+cola = ColaReportes(directorio_base=sys.argv[1], procesos=1)
+estado = cola.ejecutar(cola.crear_trabajo('directorio'), [int(i) for i in sys.argv[2:]])
+print(json.dumps(estado))
+"""
+
+
+def test_reporte_masivo_en_modo_asgi(nuevo_cliente, nuevas_compras, tmp_path):
+    ids = [nuevo_cliente(f'Masivo ASGI {i}') for i in range(2)]
+    for id_cliente in ids:
+        nuevas_compras(id_cliente, 2)
+
+    resultado = subprocess.run(
+        [sys.executable, '-c', GUION_ASGI, str(tmp_path)] + [str(i) for i in ids],
+        cwd=RAIZ, capture_output=True, text=True, timeout=120
+    )
+    assert resultado.returncode == 0, resultado.stderr
+    estado = json.loads(resultado.stdout.strip().splitlines()[-1])
+    assert estado['errores'] == []
+    assert estado['generados'] == 2
+    assert sorted(os.listdir(estado['archivo'])) == ['estado.json'] + [f'reporte_{i}.pdf' for i in ids]
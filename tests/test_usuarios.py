@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import uuid
+
+from config.conexion_async import en_greenlet, fuera_del_bucle
+from usuarios import LimiteIntentos, Usuarios
+
+
+def iniciar_sesion(aplicacion, rol, clave='clave-123'):
+    usuario = f'u{uuid.uuid4().hex[:10]}'
+    aplicacion.usuarios.crear(usuario, clave, rol)
+    cliente = aplicacion.app.test_client()
+    respuesta = cliente.post('/login', data={'usuario': usuario, 'contraseña': clave})
+    assert respuesta.status_code == 302
+    return usuario, cliente
+
+
+def test_cambio_de_rol_llega_a_la_sesion_abierta(aplicacion, nuevo_cliente, nuevas_compras):
+    id_cliente = nuevo_cliente()
+    nuevas_compras(id_cliente, 1)
+    usuario, cliente = iniciar_sesion(aplicacion, 'comprador')
+    assert cliente.get(f'/reporte/{id_cliente}').status_code == 403
+
+    refrescos = aplicacion.autorizacion.refrescos
+    resultado = aplicacion.app.test_cli_runner().invoke(args=['cambiar-rol', usuario, 'productor'])
+    assert resultado.exit_code == 0, resultado.output
+
+    assert cliente.get(f'/reporte/{id_cliente}').status_code == 200
+    assert aplicacion.autorizacion.refrescos == refrescos + 1
+    # Con el reclamo renovado ya no se vuelve a leer el rol
+    cliente.get(f'/reporte/{id_cliente}')
+    assert aplicacion.autorizacion.refrescos == refrescos + 1
+
+
+def test_clave_incorrecta_y_limite_por_ip(aplicacion):
+    usuario, _ = iniciar_sesion(aplicacion, 'comprador')
+    limite_previo = aplicacion.usuarios.limite
+    aplicacion.usuarios.limite = LimiteIntentos(rafaga=2, por_minuto=1)
+    try:
+        cliente = aplicacion.app.test_client()
+        estados = [cliente.post('/login', data={'usuario': usuario, 'contraseña': 'mala'},
+                                environ_base={'REMOTE_ADDR': '203.0.113.7'}).status_code
+                   for _ in range(3)]
+    finally:
+        aplicacion.usuarios.limite = limite_previo
+    assert estados == [200, 200, 429]
+
+
+def test_limite_por_ip_usa_la_ip_del_proxy(aplicacion):
+    usuario, _ = iniciar_sesion(aplicacion, 'comprador')
+    limite_previo = aplicacion.usuarios.limite
+    aplicacion.usuarios.limite = LimiteIntentos(rafaga=1, por_minuto=1)
+    try:
+        cliente = aplicacion.app.test_client()
+
+        def intentar(ip_cliente):
+            return cliente.post('/login', data={'usuario': usuario, 'contraseña': 'mala'},
+                                environ_base={'REMOTE_ADDR': '10.0.0.1'},
+                                headers={'X-Forwarded-For': ip_cliente}).status_code
+
+        # Misma IP del balanceador, clientes distintos: cada uno tiene su cubeta
+        estados = [intentar('198.51.100.1'), intentar('198.51.100.2'), intentar('198.51.100.1')]
+    finally:
+        aplicacion.usuarios.limite = limite_previo
+    assert estados == [200, 200, 429]
+
+
+def test_hash_fuera_del_bucle():
+    hilos = []
+
+    def hash_lento(clave):
+        hilos.append(threading.get_ident())
+        return f'hash:{clave}'
+
+    usuarios = Usuarios(lambda *a, **k: None, ejecutor=fuera_del_bucle)
+
+    async def principal():
+        latidos = []
+
+        async def latir():
+            while True:
+                latidos.append(1)
+                await asyncio.sleep(0)
+
+        latido = asyncio.ensure_future(latir())
+        resultado = await en_greenlet(usuarios._calcular, hash_lento, 'x')
+        latido.cancel()
+        return resultado, latidos
+
+    resultado, latidos = asyncio.run(principal())
+    assert resultado == 'hash:x'
+    # Calculado en otro hilo mientras el bucle seguía atendiendo
+    assert hilos and hilos[0] != threading.get_ident()
+    assert latidos
+    assert usuarios.hashes_calculados == 1
+
+
+def test_enlace_de_usuarios_segun_permiso(aplicacion, admin):
+    _, comprador = iniciar_sesion(aplicacion, 'comprador')
+    comprador.get('/')  # muestra el mensaje de bienvenida; sin mensajes la página lleva ETag
+    pagina_comprador = comprador.get('/')
+    pagina_admin = admin.get('/')
+    assert 'Añadir Usuario' not in pagina_comprador.get_data(as_text=True)
+    assert 'Añadir Usuario' in pagina_admin.get_data(as_text=True)
+    # La página cambia con los permisos: un ETag de otro rol no sirve
+    assert pagina_comprador.headers['ETag'] != pagina_admin.headers['ETag']
+
+
+def test_largo_minimo_de_clave_en_el_formulario_y_la_consola(aplicacion, admin):
+    from usuarios import LARGO_MINIMO_CLAVE
+
+    pagina = admin.get('/usuarios').get_data(as_text=True)
+    assert f'minlength="{LARGO_MINIMO_CLAVE}"' in pagina
+
+    usuario = f'u{uuid.uuid4().hex[:10]}'
+    corta = 'x' * (LARGO_MINIMO_CLAVE - 1)
+    resultado = aplicacion.app.test_cli_runner().invoke(
+        args=['crear-usuario', usuario, 'comprador', '--clave', corta])
+    assert resultado.exit_code != 0
+    assert 'al menos' in resultado.output
+    assert aplicacion.usuarios.buscar(usuario) is None
+
+
+def test_hash_ficticio_con_el_mismo_limite():
+    llamadas = []
+
+    def ejecutor(funcion, *args):
+        llamadas.append(args[0].__name__)
+        return funcion(*args)
+
+    usuarios = Usuarios(lambda *a, **k: [], ejecutor=ejecutor)
+    assert usuarios.autenticar('nadie', 'clave-123', '198.51.100.3') is None
+    # El hash de comparación para usuarios inexistentes también pasa por el ejecutor
+    assert llamadas == ['hashear_clave', 'verificar_clave']
+    assert usuarios.hashes_calculados == 2
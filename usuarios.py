@@ -0,0 +1,255 @@
+"""
+Usuarios de la aplicación (`tbusuario`) con roles y claves guardadas como
+hash scrypt: resistente a GPU porque cada verificación necesita
+128 * n * r bytes de memoria (16 MiB con los valores por defecto).
+
+Ese costo es a propósito y por eso se protege de tres formas:
+- Cache de verificaciones: un acierto reciente con la misma clave y el
+  mismo hash guardado no vuelve a calcular scrypt. La clave de la cache es
+  un HMAC con un secreto del proceso, nunca la contraseña.
+- Límite por IP (cubeta de fichas): sólo consumen fichas los intentos que
+  llegan a calcular el hash, así una ráfaga de intentos desde una IP no
+  ocupa la CPU de todos.
+- Como mucho USUARIOS_HASHES_SIMULTANEOS hashes a la vez por proceso; el
+  resto espera un poco y, si no hay lugar, se rechaza.
+
+En modo ASGI (asgi.py) el hash se calcula en un hilo aparte (`ejecutor`)
+para no frenar el bucle de asyncio durante cada verificación.
+
+La cache y los límites son de cada proceso (cada worker de gunicorn).
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from cache import CacheLRU
+
+ROLES = ('cantante', 'productor', 'comprador', 'administrador')
+
+SCRYPT_N = int(os.environ.get('USUARIOS_SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.environ.get('USUARIOS_SCRYPT_R', 8))
+SCRYPT_P = int(os.environ.get('USUARIOS_SCRYPT_P', 1))
+
+LARGO_MINIMO_CLAVE = int(os.environ.get('USUARIOS_LARGO_MINIMO_CLAVE', 8))
+
+CACHE_MAX = int(os.environ.get('USUARIOS_CACHE_MAX', 10000))
+CACHE_TTL = float(os.environ.get('USUARIOS_CACHE_TTL', 300))
+
+# Ráfaga de intentos permitida por IP y fichas que recupera por minuto
+INTENTOS_RAFAGA = int(os.environ.get('LOGIN_INTENTOS_RAFAGA', 10))
+INTENTOS_POR_MINUTO = float(os.environ.get('LOGIN_INTENTOS_POR_MINUTO', 10))
+MAX_IPS = int(os.environ.get('LOGIN_MAX_IPS', 100000))
+
+HASHES_SIMULTANEOS = int(os.environ.get('USUARIOS_HASHES_SIMULTANEOS', os.cpu_count() or 1))
+ESPERA_HASH = float(os.environ.get('USUARIOS_ESPERA_HASH', 2))
+
+SQL_BUSCAR = "SELECT id_usuario, usuario, clave_hash, rol FROM tbusuario WHERE usuario = %s"
+SQL_INSERTAR = "INSERT INTO tbusuario (usuario, clave_hash, rol) VALUES (%s, %s, %s)"
+SQL_ACTUALIZAR_HASH = "UPDATE tbusuario SET clave_hash = %s WHERE id_usuario = %s"
+SQL_CAMBIAR_ROL = "UPDATE tbusuario SET rol = %s WHERE id_usuario = %s"
+
+
+class DemasiadosIntentos(Exception):
+    """La IP agotó sus intentos de login o no hay lugar para calcular el hash"""
+
+    def __init__(self, mensaje, reintentar=1):
+        super().__init__(mensaje)
+        self.reintentar = reintentar
+
+
+# ------------------ Hash de claves ------------------
+
+def _b64(datos):
+    return base64.b64encode(datos).decode('ascii').rstrip('=')
+
+
+def _desde_b64(texto):
+    return base64.b64decode(texto + '=' * (-len(texto) % 4))
+
+
+def _scrypt(clave, sal, n, r, p):
+    return hashlib.scrypt(clave.encode('utf-8'), salt=sal, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p, dklen=32)
+
+
+def hashear_clave(clave):
+    """Hash en formato `scrypt$n$r$p$sal$hash` (sal y hash en base64)"""
+    sal = os.urandom(16)
+    resumen = _scrypt(clave, sal, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f'scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(sal)}${_b64(resumen)}'
+
+
+def verificar_clave(clave, clave_hash):
+    try:
+        algoritmo, n, r, p, sal, resumen = clave_hash.split('$')
+        if algoritmo != 'scrypt':
+            return False
+        calculado = _scrypt(clave, _desde_b64(sal), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(calculado, _desde_b64(resumen))
+
+
+def necesita_rehash(clave_hash):
+    """El hash se hizo con otros parámetros: se rehace en el próximo login correcto"""
+    return not clave_hash.startswith(f'scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$')
+
+
+# ------------------ Cache y límites ------------------
+
+class CacheVerificaciones:
+    """Verificaciones correctas recientes; cambiar la clave cambia el hash y la entrada deja de servir"""
+
+    def __init__(self, max_entradas=CACHE_MAX, ttl=CACHE_TTL):
+        self._cache = CacheLRU(max_entradas=max_entradas, ttl=ttl)
+        self._secreto = os.urandom(32)
+
+    def _clave(self, usuario, clave, clave_hash):
+        mensaje = '\0'.join((usuario, clave_hash, clave)).encode('utf-8')
+        return hmac.new(self._secreto, mensaje, hashlib.sha256).digest()
+
+    def verificada(self, usuario, clave, clave_hash):
+        return self._cache.obtener(self._clave(usuario, clave, clave_hash), False)
+
+    def recordar(self, usuario, clave, clave_hash):
+        self._cache.guardar(self._clave(usuario, clave, clave_hash), True)
+
+    def estadisticas(self):
+        return self._cache.estadisticas()
+
+
+class LimiteIntentos:
+    """Cubeta de fichas por IP, acotada a las `max_ips` usadas más recientemente"""
+
+    def __init__(self, rafaga=INTENTOS_RAFAGA, por_minuto=INTENTOS_POR_MINUTO, max_ips=MAX_IPS):
+        self.rafaga = rafaga
+        self.por_segundo = por_minuto / 60
+        self.max_ips = max_ips
+        self._cubetas = OrderedDict()
+        self._lock = threading.Lock()
+        self.rechazados = 0
+
+    def consumir(self, ip):
+        """Gastar una ficha de `ip` o lanzar DemasiadosIntentos"""
+        ahora = time.monotonic()
+        with self._lock:
+            fichas, antes = self._cubetas.pop(ip, (self.rafaga, ahora))
+            fichas = min(self.rafaga, fichas + (ahora - antes) * self.por_segundo)
+            if fichas < 1:
+                self._cubetas[ip] = (fichas, ahora)
+                self.rechazados += 1
+                raise DemasiadosIntentos('Demasiados intentos de inicio de sesión',
+                                         int((1 - fichas) / self.por_segundo) + 1)
+            self._cubetas[ip] = (fichas - 1, ahora)
+            while len(self._cubetas) > self.max_ips:
+                self._cubetas.popitem(last=False)
+
+
+# ------------------ Usuarios ------------------
+
+class Usuarios:
+
+    def __init__(self, ejecutar, cache=None, limite=None, simultaneos=HASHES_SIMULTANEOS,
+                 ejecutor=None):
+        # `ejecutar(query, params, fetch=True)` como ejecutar_consulta de app.py
+        self.ejecutar = ejecutar
+        # `ejecutor(funcion, *args)` calcula los hashes en otro lado; None: en este hilo
+        self.ejecutor = ejecutor
+        self.cache = cache or CacheVerificaciones()
+        self.limite = limite or LimiteIntentos()
+        self._hashes = threading.BoundedSemaphore(simultaneos)
+        self._hash_ficticio = None
+        self.hashes_calculados = 0
+
+    def crear(self, usuario, clave, rol):
+        """Devuelve el id del usuario nuevo; un nombre repetido falla por el índice UNIQUE"""
+        if rol not in ROLES:
+            raise ValueError(f'Rol desconocido: {rol}')
+        if len(clave) < LARGO_MINIMO_CLAVE:
+            raise ValueError(f'La clave debe tener al menos {LARGO_MINIMO_CLAVE} caracteres')
+        return self.ejecutar(SQL_INSERTAR, (usuario, self._calcular(hashear_clave, clave), rol),
+                             fetch=False)
+
+    def cambiar_rol(self, usuario, rol):
+        """False si el usuario no existe; quien llama avisa a los permisos en sesión (permisos.py)"""
+        if rol not in ROLES:
+            raise ValueError(f'Rol desconocido: {rol}')
+        fila = self.buscar(usuario)
+        if fila is None:
+            return False
+        self.ejecutar(SQL_CAMBIAR_ROL, (rol, fila['id_usuario']), fetch=False)
+        return True
+
+    def buscar(self, usuario):
+        filas = self.ejecutar(SQL_BUSCAR, (usuario,))
+        return filas[0] if filas else None
+
+    def autenticar(self, usuario, clave, ip):
+        """
+        Fila del usuario ({id_usuario, usuario, rol}) si la clave es correcta,
+        o None. Lanza DemasiadosIntentos si hay que calcular el hash y la IP
+        no tiene fichas o no hay lugar para calcularlo.
+        """
+        fila = self.buscar(usuario)
+        if fila and self.cache.verificada(usuario, clave, fila['clave_hash']):
+            return self._publica(fila)
+
+        self.limite.consumir(ip)
+        if fila is None:
+            # Un usuario inexistente tarda lo mismo: no se puede averiguar quién existe
+            self._calcular(verificar_clave, clave, self._ficticio())
+            return None
+        if not self._calcular(verificar_clave, clave, fila['clave_hash']):
+            return None
+
+        clave_hash = fila['clave_hash']
+        if necesita_rehash(clave_hash):
+            clave_hash = self._calcular(hashear_clave, clave)
+            self.ejecutar(SQL_ACTUALIZAR_HASH, (clave_hash, fila['id_usuario']), fetch=False)
+        self.cache.recordar(usuario, clave, clave_hash)
+        return self._publica(fila)
+
+    def _calcular(self, funcion, *args):
+        if self.ejecutor is not None:
+            # La espera por un lugar también ocurre fuera: en el bucle de ASGI bloquearía a todos
+            return self.ejecutor(self._calcular_aqui, funcion, *args)
+        return self._calcular_aqui(funcion, *args)
+
+    def _calcular_aqui(self, funcion, *args):
+        if not self._hashes.acquire(timeout=ESPERA_HASH):
+            raise DemasiadosIntentos('El servidor está ocupado, intenta de nuevo', int(ESPERA_HASH) or 1)
+        try:
+            self.hashes_calculados += 1
+            return funcion(*args)
+        finally:
+            self._hashes.release()
+
+    def _ficticio(self):
+        # También con el límite de hashes simultáneos y, en ASGI, fuera del bucle
+        if self._hash_ficticio is None:
+            self._hash_ficticio = self._calcular(hashear_clave, _b64(os.urandom(16)))
+        return self._hash_ficticio
+
+    @staticmethod
+    def _publica(fila):
+        return {'id_usuario': fila['id_usuario'], 'usuario': fila['usuario'], 'rol': fila['rol']}
+
+    def exportar_prometheus(self):
+        datos = self.cache.estadisticas()
+        lineas = [
+            '# HELP login_cache_verificaciones_total Aciertos y fallos de la cache de verificaciones de clave.',
+            '# TYPE login_cache_verificaciones_total counter',
+            f'login_cache_verificaciones_total{{evento="aciertos"}} {datos["aciertos"]}',
+            f'login_cache_verificaciones_total{{evento="fallos"}} {datos["fallos"]}',
+            '# HELP login_hashes_total Hashes scrypt calculados por este proceso.',
+            '# TYPE login_hashes_total counter',
+            f'login_hashes_total {self.hashes_calculados}',
+            '# HELP login_rechazados_total Intentos de login rechazados por el límite por IP.',
+            '# TYPE login_rechazados_total counter',
+            f'login_rechazados_total {self.limite.rechazados}',
+        ]
+        return '\n'.join(lineas) + '\n'